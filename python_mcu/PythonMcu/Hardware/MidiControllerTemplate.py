@@ -30,12 +30,17 @@ if __name__ == "__main__":
     # allow "PythonMcu" package imports when executing this module
     sys.path.append('../../../')
 
-#from PythonMcu.Midi.MidiConnection import MidiConnection
+from PythonMcu.Midi.MidiConnection import MidiConnection
 
 import logging
 logger = logging.getLogger("MCU Controller")
 logging.basicConfig(level=logging.DEBUG)
 
+
+def log_to_logger(message, repaint=False):
+    logger.debug(message)
+
+
 class MidiControllerTemplate:
     MIDI_MANUFACTURER_ID = None
     MIDI_DEVICE_ID = None
@@ -51,8 +56,8 @@ class MidiControllerTemplate:
         0x7F: 'on'
     }
 
-    def __init__(self, midi_input_name, midi_output_name):
-        self.callback_log = logger.debug
+    def __init__(self, midi_input_name, midi_output_name, callback_log=log_to_logger, midi_transport=None):
+        self.callback_log = callback_log
 
         # LCD has 2 rows with 56 characters each, fill with spaces
         self._lcd_characters = [' '] * 2
@@ -69,8 +74,10 @@ class MidiControllerTemplate:
         self._log('Initialising MIDI ports...')
         self._midi_input_name = midi_input_name
         self._midi_output_name = midi_output_name
-        self.midi = {}
-        #self.midi = MidiConnection(self.callback_log, self.receive_midi)
+        # midi_transport: instance of "MidiTransport" (such as a
+        # loopback transport for testing), or None for the default
+        self.midi = MidiConnection(self.callback_log, self.receive_midi, transport=midi_transport)
+        self.midi.set_reconnect_callback(self.on_midi_reconnected)
 
         # Initialized by set_interconnector()
         self.interconnector = None
@@ -81,6 +88,11 @@ class MidiControllerTemplate:
         self.display_timecode_available = True
         self.meter_bridge_available = True
 
+        # if False, "set_led()" is never called with status 2
+        # (flashing) and flashing LEDs are toggled by the
+        # interconnector instead
+        self.flashing_leds_available = False
+
         self.display_7seg_characters = []
         for _ in range(4):
             self.display_7seg_characters.append(' ')
@@ -112,6 +124,15 @@ class MidiControllerTemplate:
         self.midi.disconnect()
         self._log('Disconnected.')
 
+    def on_midi_reconnected(self):
+        # override to restore the state of the hardware controller
+        # after its MIDI ports have been lost; the surface is resynced
+        # here, so call this method last
+        self._log('MIDI ports reconnected...')
+
+        if self.interconnector:
+            self.interconnector.resync_surface()
+
     def go_online(self):
         self._log('Mackie Host Control went online...')
 
@@ -134,9 +155,28 @@ class MidiControllerTemplate:
     def has_meter_bridge(self):
         return self.meter_bridge_available
 
+    def has_flashing_leds(self):
+        return self.flashing_leds_available
+
     # --- MIDI processing ---
+    def set_wakeup_callback(self, callback):
+        self.midi.set_wakeup_callback(callback)
+
+    def set_midi_input_mode(self, input_mode):
+        # call before "connect()"
+        self.midi.set_input_mode(input_mode)
+
+    def set_latency_monitor(self, latency_monitor):
+        self.midi.set_latency_monitor(latency_monitor)
+
     def process_midi_input(self):
-        self.midi.process_input_buffer()
+        return self.midi.process_input_buffer()
+
+    def begin_output_batch(self):
+        self.midi.begin_output_batch()
+
+    def flush_output(self):
+        self.midi.flush_output()
 
     def receive_midi(self, status, message):
         print(status, message)
@@ -199,6 +239,17 @@ class MidiControllerTemplate:
     def set_led(self, internal_id, led_status):
         pass
 
+    def set_leds(self, leds):
+        """
+        set several LEDs at once; "leds" is a list of (internal_id,
+        led_status) tuples
+
+        override if the hardware controller can set many LEDs with a
+        single message
+        """
+        for (internal_id, led_status) in leds:
+            self.set_led(internal_id, led_status)
+
     def set_display_7seg(self, position, character_code):
         character = self._decode_7seg_character(character_code)
         position = 23 - (position * 2)
@@ -237,13 +288,13 @@ class MidiControllerTemplate:
             string_timecode = ''.join(self.display_timecode_characters)
             self._log('timecode display NOT set to "%s".' % string_timecode)
 
-    def set_peak_level(self, meter_id, meter_level):
-        if meter_level == 0x0F:
-            self._log('Meter #%d overload NOT cleared.' % meter_id)
-        elif meter_level == 0x0F:
-            self._log('Meter #%d NOT set to overload.' % meter_id)
+    def set_meter(self, meter_id, meter_level, peak_level, overload):
+        # levels range from 0 to 12 segments; called once per frame
+        # for every meter that has changed
+        if overload:
+            self._log('Meter #%d NOT set to %d (peak %d, overload).' % (meter_id, meter_level, peak_level))
         else:
-            self._log('Meter #%d NOT set to %03d%%.' % (meter_id, meter_level * 10))
+            self._log('Meter #%d NOT set to %d (peak %d).' % (meter_id, meter_level, peak_level))
 
     def fader_moved(self, fader_id, fader_position):
         self._log('Hardware fader #%d NOT moved to position %04d.' % (fader_id, fader_position))
@@ -874,6 +874,10 @@ class NektarPanoramaTSeries(MidiControllerTemplate):
         pass
 
     # --- MIDI processing ---
+    def set_wakeup_callback(self, callback):
+        # MIDI input is handled directly by the RtMidi callback
+        pass
+
     def receive_midi(self, data, something):
         message, timestamp = data
         if message[0] == 0xF0 and message[-1] == 0xF7:
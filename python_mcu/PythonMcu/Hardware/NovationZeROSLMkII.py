@@ -93,8 +93,8 @@ class NovationZeROSLMkII(MidiControllerTemplate):
     _MODE_OTHER_GLOBAL_VIEW = 4
     _MODE_OTHER_UTILITY = 5
 
-    def __init__(self, midi_input, midi_output, callback_log):
-        MidiControllerTemplate.__init__(self, midi_input, midi_output, callback_log)
+    def __init__(self, midi_input, midi_output, callback_log, midi_transport=None):
+        MidiControllerTemplate.__init__(self, midi_input, midi_output, callback_log, midi_transport)
 
         self.display_lcd_available = True
         self.automated_faders_available = False
@@ -153,6 +153,13 @@ class NovationZeROSLMkII(MidiControllerTemplate):
         self._is_connected = False
         MidiControllerTemplate.disconnect(self)
 
+    def on_midi_reconnected(self):
+        # the controller may have been switched off in between
+        if self._is_connected:
+            self._restore_state()
+
+        MidiControllerTemplate.on_midi_reconnected(self)
+
     def go_online(self):
         MidiControllerTemplate.go_online(self)
 
@@ -184,30 +191,33 @@ class NovationZeROSLMkII(MidiControllerTemplate):
         self.send_midi_control_change(cc_number=self._MIDI_CC_CLEAR_ALL_LEDS, cc_value=0x00)
         self.send_midi_control_change(cc_number=self._MIDI_CC_BUTTON_MODE_TRANSPORT, cc_value=0x00)
 
+    def _restore_state(self):
+        self._enter_ableton_mode()
+
+        self._restore_previous_mode()
+        self._restore_vpots()
+
+        # force update of LCD
+        self._lcd_strings = ['', '']
+        self.update_lcd()
+
     # --- MIDI processing ---
     def receive_midi(self, status, message):
         if (message[0] == 0xF0) and (message[-1] == 0xF7):
-            if (message[1:4] == self.MIDI_MANUFACTURER_ID) and (message[4:10] == self.MIDI_DEVICE_ID):
+            if (message[1:4] == bytes(self.MIDI_MANUFACTURER_ID)) and (message[4:10] == bytes(self.MIDI_DEVICE_ID)):
                 sysex_message = message[10:-1]
 
-                if sysex_message == [1, 0]:
+                if sysex_message == b'\x01\x00':
                     self._leave_ableton_mode()
 
                     self._mode_automap = True
                     self._is_connected = False
-                elif sysex_message == [1, 1]:
+                elif sysex_message == b'\x01\x01':
                     if self._mode_automap:
                         self._mode_automap = False
                         self._is_connected = True
 
-                        self._enter_ableton_mode()
-
-                        self._restore_previous_mode()
-                        self._restore_vpots()
-
-                        # force update of LCD
-                        self._lcd_strings = ['', '']
-                        self.update_lcd()
+                        self._restore_state()
 
             # all MIDI SysEx messages handled (including invalid
             # ones), so quit processing here
@@ -393,6 +403,19 @@ class NovationZeROSLMkII(MidiControllerTemplate):
         else:
             self._log('controller type "%s" unknown.' % controller_type)
 
+    def set_leds(self, leds):
+        if not self._is_connected:
+            return
+
+        # the LEDs are sent as one burst of control changes together
+        # with all other output of this tick
+        midi = self.midi
+        for (internal_id, led_status) in leds:
+            if internal_id.startswith('cc'):
+                midi.send_control_change(self._MIDI_DEVICE_CHANNEL, int(internal_id[2:]), led_status)
+            else:
+                self._log('controller type "%s" unknown.' % internal_id[:2])
+
     def _set_led(self, led_id, led_status):
         if not self._is_connected:
             return
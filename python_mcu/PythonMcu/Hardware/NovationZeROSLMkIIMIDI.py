@@ -36,8 +36,8 @@ from PythonMcu.Midi.MidiConnection import MidiConnection
 
 class NovationZeROSLMkIIMIDI(NovationZeROSLMkII):
     FORMATTED_NAME = "Novation ZeRO SL MkII (MIDI)"
-    def __init__(self, midi_input, midi_output, callback_log):
-        NovationZeROSLMkII.__init__(self, midi_input, midi_output, callback_log)
+    def __init__(self, midi_input, midi_output, callback_log, midi_transport=None):
+        NovationZeROSLMkII.__init__(self, midi_input, midi_output, callback_log, midi_transport)
 
     @staticmethod
     def get_usage_hint():
@@ -51,8 +51,8 @@ class NovationZeROSLMkIIMIDI(NovationZeROSLMkII):
     # --- MIDI processing ---
     @staticmethod
     def get_preferred_midi_input():
-        return MidiConnection.get_default_midi_input().decode('utf-8')
+        return MidiConnection.get_default_midi_input()
 
     @staticmethod
     def get_preferred_midi_output():
-        return MidiConnection.get_default_midi_output().decode('utf-8')
+        return MidiConnection.get_default_midi_output()
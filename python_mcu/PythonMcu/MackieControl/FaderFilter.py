@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import threading
+import time
+
+
+class FaderFilter:
+    __module__ = __name__
+    __doc__ = 'Drops redundant fader movements before they are sent to the host'
+
+    # one slot per MIDI channel (Mackie Control uses channels 0 - 8)
+    NUMBER_OF_FADERS = 16
+
+    # fader values have 14 bits; moving a fader against its last
+    # direction has to exceed this difference, which covers jitter of
+    # one step on faders with a resolution of 7 bits
+    DEFAULT_HYSTERESIS = 192
+
+    # maximum number of messages per second and fader
+    DEFAULT_MAXIMUM_RATE = 100.0
+
+    def __init__(self, callback_send, hysteresis=DEFAULT_HYSTERESIS, maximum_rate=DEFAULT_MAXIMUM_RATE):
+        # "callback_send" is called with fader ID and 14-bit value
+        self._callback_send = callback_send
+        self._callback_wakeup = None
+        self._wakeup_timer = None
+
+        self._hysteresis = hysteresis
+        self._minimum_interval = 0.0
+        self.set_maximum_rate(maximum_rate)
+
+        self._dropped_messages = [0] * self.NUMBER_OF_FADERS
+        self.reset()
+
+    def reset(self):
+        """
+        forget all fader positions (e.g. after the host has gone
+        online); dropped messages are still counted
+        """
+        self._last_values = [None] * self.NUMBER_OF_FADERS
+        self._last_directions = [0] * self.NUMBER_OF_FADERS
+        self._last_times = [0.0] * self.NUMBER_OF_FADERS
+        self._pending_values = [None] * self.NUMBER_OF_FADERS
+        self._pending_faders = set()
+
+    # --- settings ---
+    def set_hysteresis(self, hysteresis):
+        self._hysteresis = hysteresis
+
+    def set_maximum_rate(self, maximum_rate):
+        # a rate of zero turns off rate limiting
+        if maximum_rate:
+            self._minimum_interval = 1.0 / maximum_rate
+        else:
+            self._minimum_interval = 0.0
+
+    def set_wakeup_callback(self, callback):
+        """
+        "callback" is called from a timer thread when held back fader
+        values are due; it should trigger a call of "process()" (not
+        needed when "process()" is called regularly anyway)
+        """
+        self._callback_wakeup = callback
+
+    # --- fader movements ---
+    def move(self, fader_id, value, timestamp=None):
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        # compare with the value the host will end up with
+        target_value = self._pending_values[fader_id]
+        if target_value is None:
+            target_value = self._last_values[fader_id]
+
+        if target_value is not None:
+            difference = value - target_value
+            if difference > 0:
+                direction = 1
+            elif difference < 0:
+                direction = -1
+            else:
+                self._dropped_messages[fader_id] += 1
+                return
+
+            # only reversals are filtered, so that small steps are
+            # sent when there is no direction yet (such as after the
+            # host has moved the fader)
+            last_direction = self._last_directions[fader_id]
+            if last_direction and (direction != last_direction) and (abs(difference) <= self._hysteresis):
+                self._dropped_messages[fader_id] += 1
+                return
+
+            self._last_directions[fader_id] = direction
+
+        # superseded values are never sent
+        if self._pending_values[fader_id] is not None:
+            self._dropped_messages[fader_id] += 1
+
+        if timestamp - self._last_times[fader_id] < self._minimum_interval:
+            # hold back value until the fader may send again, so that
+            # its resting position always gets through
+            self._pending_values[fader_id] = value
+            self._pending_faders.add(fader_id)
+            self._schedule_wakeup(self._last_times[fader_id] + self._minimum_interval - timestamp)
+        else:
+            self._pending_values[fader_id] = None
+            self._pending_faders.discard(fader_id)
+            self._send(fader_id, value, timestamp)
+
+    def _send(self, fader_id, value, timestamp):
+        # fader has returned to the position that was sent last
+        if value == self._last_values[fader_id]:
+            self._dropped_messages[fader_id] += 1
+            return
+
+        self._last_values[fader_id] = value
+        self._last_times[fader_id] = timestamp
+        self._callback_send(fader_id, value)
+
+    def set_host_value(self, fader_id, value):
+        """
+        update fader position after the host has moved a fader
+        """
+        self._last_values[fader_id] = value
+        self._last_directions[fader_id] = 0
+
+    def process(self, timestamp=None):
+        """
+        send held back fader values that are due
+        """
+        if not self._pending_faders:
+            return
+
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        for fader_id in list(self._pending_faders):
+            due_time = self._last_times[fader_id] + self._minimum_interval
+
+            if timestamp >= due_time:
+                value = self._pending_values[fader_id]
+                self._pending_values[fader_id] = None
+                self._pending_faders.discard(fader_id)
+
+                self._send(fader_id, value, timestamp)
+            else:
+                self._schedule_wakeup(due_time - timestamp)
+
+    def _schedule_wakeup(self, delay):
+        if not self._callback_wakeup:
+            return
+
+        if self._wakeup_timer and self._wakeup_timer.is_alive():
+            return
+
+        self._wakeup_timer = threading.Timer(delay, self._callback_wakeup)
+        self._wakeup_timer.daemon = True
+        self._wakeup_timer.start()
+
+    # --- statistics ---
+    def get_dropped_messages(self, fader_id=None):
+        """
+        return number of dropped messages of a fader, or a list
+        holding these numbers for all faders
+        """
+        if fader_id is None:
+            return list(self._dropped_messages)
+
+        return self._dropped_messages[fader_id]
+
+    def reset_statistics(self):
+        self._dropped_messages = [0] * self.NUMBER_OF_FADERS
@@ -26,12 +26,14 @@ Thank you for using free software!
 
 import os
 import sys
-import time
 
 if __name__ == "__main__":
     # allow "PythonMcu" package imports when executing this module
     sys.path.append('../../')
 
+from PythonMcu.MackieControl.FaderFilter import FaderFilter
+from PythonMcu.MackieControl.MeterEngine import MeterEngine
+from PythonMcu.MackieControl.SurfaceState import SurfaceState
 from PythonMcu.Midi.MidiConnection import MidiConnection
 
 
@@ -43,6 +45,20 @@ class MackieHostControl:
     CHALLENGE_RESPONSE = 'Challenge / Response'
     WAIT_FOR_MIDI_DATA = 'Wait for MIDI data'
 
+    # connection states; "connect()" leaves the offline state, and
+    # the host's MIDI input completes the connection
+    STATE_OFFLINE = 'Offline'
+    STATE_AWAITING_MIDI_DATA = 'Awaiting MIDI data'
+    STATE_AWAITING_CONNECTION_REPLY = 'Awaiting "Host Connection Reply"'
+    STATE_ONLINE = 'Online'
+
+    # the LCD has 2 rows of 56 characters, each row is divided into 8
+    # cells of 7 characters (one per channel strip)
+    LCD_SIZE = 112
+    LCD_ROW_LENGTH = 56
+    LCD_CELL_WIDTH = 7
+    LCD_CELLS_PER_ROW = 8
+
     SWITCH_RELEASED = 0
     SWITCH_PRESSED = 1
     SWITCH_PRESSED_RELEASED = 2
@@ -124,15 +140,142 @@ class MackieHostControl:
     _LED_RUDE_SOLO = 0x73
     _LED_RELAY_CLICK = 0x76
 
-    def __init__(self, mcu_model_id, mcu_connection, version_number, midi_input_name, midi_output_name, callback_log):
+    # maps names of "keypress_*()" methods (e.g. "play" for
+    # "keypress_play()") to MCU switch IDs
+    _SWITCH_IDS = {
+        'record_ready_channel_1': _LED_SWITCH_CHANNEL_RECORD_READY,
+        'record_ready_channel_2': _LED_SWITCH_CHANNEL_RECORD_READY + 1,
+        'record_ready_channel_3': _LED_SWITCH_CHANNEL_RECORD_READY + 2,
+        'record_ready_channel_4': _LED_SWITCH_CHANNEL_RECORD_READY + 3,
+        'record_ready_channel_5': _LED_SWITCH_CHANNEL_RECORD_READY + 4,
+        'record_ready_channel_6': _LED_SWITCH_CHANNEL_RECORD_READY + 5,
+        'record_ready_channel_7': _LED_SWITCH_CHANNEL_RECORD_READY + 6,
+        'record_ready_channel_8': _LED_SWITCH_CHANNEL_RECORD_READY + 7,
+        'solo_channel_1': _LED_SWITCH_CHANNEL_SOLO,
+        'solo_channel_2': _LED_SWITCH_CHANNEL_SOLO + 1,
+        'solo_channel_3': _LED_SWITCH_CHANNEL_SOLO + 2,
+        'solo_channel_4': _LED_SWITCH_CHANNEL_SOLO + 3,
+        'solo_channel_5': _LED_SWITCH_CHANNEL_SOLO + 4,
+        'solo_channel_6': _LED_SWITCH_CHANNEL_SOLO + 5,
+        'solo_channel_7': _LED_SWITCH_CHANNEL_SOLO + 6,
+        'solo_channel_8': _LED_SWITCH_CHANNEL_SOLO + 7,
+        'mute_channel_1': _LED_SWITCH_CHANNEL_MUTE,
+        'mute_channel_2': _LED_SWITCH_CHANNEL_MUTE + 1,
+        'mute_channel_3': _LED_SWITCH_CHANNEL_MUTE + 2,
+        'mute_channel_4': _LED_SWITCH_CHANNEL_MUTE + 3,
+        'mute_channel_5': _LED_SWITCH_CHANNEL_MUTE + 4,
+        'mute_channel_6': _LED_SWITCH_CHANNEL_MUTE + 5,
+        'mute_channel_7': _LED_SWITCH_CHANNEL_MUTE + 6,
+        'mute_channel_8': _LED_SWITCH_CHANNEL_MUTE + 7,
+        'select_channel_1': _LED_SWITCH_CHANNEL_SELECT,
+        'select_channel_2': _LED_SWITCH_CHANNEL_SELECT + 1,
+        'select_channel_3': _LED_SWITCH_CHANNEL_SELECT + 2,
+        'select_channel_4': _LED_SWITCH_CHANNEL_SELECT + 3,
+        'select_channel_5': _LED_SWITCH_CHANNEL_SELECT + 4,
+        'select_channel_6': _LED_SWITCH_CHANNEL_SELECT + 5,
+        'select_channel_7': _LED_SWITCH_CHANNEL_SELECT + 6,
+        'select_channel_8': _LED_SWITCH_CHANNEL_SELECT + 7,
+        'vselect_channel_1': _LED_SWITCH_CHANNEL_VSELECT,
+        'vselect_channel_2': _LED_SWITCH_CHANNEL_VSELECT + 1,
+        'vselect_channel_3': _LED_SWITCH_CHANNEL_VSELECT + 2,
+        'vselect_channel_4': _LED_SWITCH_CHANNEL_VSELECT + 3,
+        'vselect_channel_5': _LED_SWITCH_CHANNEL_VSELECT + 4,
+        'vselect_channel_6': _LED_SWITCH_CHANNEL_VSELECT + 5,
+        'vselect_channel_7': _LED_SWITCH_CHANNEL_VSELECT + 6,
+        'vselect_channel_8': _LED_SWITCH_CHANNEL_VSELECT + 7,
+        'function_channel_1': _SWITCH_CHANNEL_FUNCTION,
+        'function_channel_2': _SWITCH_CHANNEL_FUNCTION + 1,
+        'function_channel_3': _SWITCH_CHANNEL_FUNCTION + 2,
+        'function_channel_4': _SWITCH_CHANNEL_FUNCTION + 3,
+        'function_channel_5': _SWITCH_CHANNEL_FUNCTION + 4,
+        'function_channel_6': _SWITCH_CHANNEL_FUNCTION + 5,
+        'function_channel_7': _SWITCH_CHANNEL_FUNCTION + 6,
+        'function_channel_8': _SWITCH_CHANNEL_FUNCTION + 7,
+        'assignment_track': _LED_SWITCH_ASSIGNMENT_TRACK,
+        'assignment_send': _LED_SWITCH_ASSIGNMENT_SEND,
+        'assignment_pan_surround': _LED_SWITCH_ASSIGNMENT_PAN_SURROUND,
+        'assignment_plug_in': _LED_SWITCH_ASSIGNMENT_PLUG_IN,
+        'assignment_eq': _LED_SWITCH_ASSIGNMENT_EQ,
+        'assignment_instrument': _LED_SWITCH_ASSIGNMENT_INSTRUMENT,
+        'fader_banks_bank_left': _SWITCH_FADER_BANKS_BANK_LEFT,
+        'fader_banks_bank_right': _SWITCH_FADER_BANKS_BANK_RIGHT,
+        'fader_banks_channel_left': _SWITCH_FADER_BANKS_CHANNEL_LEFT,
+        'fader_banks_channel_right': _SWITCH_FADER_BANKS_CHANNEL_RIGHT,
+        'flip': _LED_SWITCH_FLIP,
+        'global_view': _LED_SWITCH_GLOBAL_VIEW,
+        'name_value': _SWITCH_NAME_VALUE,
+        'smpte_beats': _SWITCH_SMPTE_BEATS,
+        'global_view_midi_tracks': _SWITCH_GLOBAL_VIEW_MIDI_TRACKS,
+        'global_view_inputs': _SWITCH_GLOBAL_VIEW_INPUTS,
+        'global_view_audio_tracks': _SWITCH_GLOBAL_VIEW_AUDIO_TRACKS,
+        'global_view_audio_instruments': _SWITCH_GLOBAL_VIEW_AUDIO_INSTRUMENTS,
+        'global_view_aux': _SWITCH_GLOBAL_VIEW_AUX,
+        'global_view_busses': _SWITCH_GLOBAL_VIEW_BUSSES,
+        'global_view_outputs': _SWITCH_GLOBAL_VIEW_OUTPUTS,
+        'global_view_user': _SWITCH_GLOBAL_VIEW_USER,
+        'shift': _SWITCH_SHIFT,
+        'option': _SWITCH_OPTION,
+        'control': _SWITCH_CONTROL,
+        'command_alt': _SWITCH_COMMAND_ALT,
+        'automation_read_off': _LED_SWITCH_AUTOMATION_READ_OFF,
+        'automation_write': _LED_SWITCH_AUTOMATION_WRITE,
+        'automation_trim': _LED_SWITCH_AUTOMATION_TRIM,
+        'automation_touch': _LED_SWITCH_AUTOMATION_TOUCH,
+        'automation_latch': _LED_SWITCH_AUTOMATION_LATCH,
+        'group': _LED_SWITCH_GROUP,
+        'utilities_save': _LED_SWITCH_UTILITIES_SAVE,
+        'utilities_undo': _LED_SWITCH_UTILITIES_UNDO,
+        'utilities_cancel': _SWITCH_UTILITIES_CANCEL,
+        'utilities_enter': _SWITCH_UTILITIES_ENTER,
+        'marker': _LED_SWITCH_MARKER,
+        'nudge': _LED_SWITCH_NUDGE,
+        'cycle': _LED_SWITCH_CYCLE,
+        'drop': _LED_SWITCH_DROP,
+        'replace': _LED_SWITCH_REPLACE,
+        'click': _LED_SWITCH_CLICK,
+        'solo': _LED_SWITCH_SOLO,
+        'rewind': _LED_SWITCH_REWIND,
+        'fast_forward': _LED_SWITCH_FAST_FORWARD,
+        'stop': _LED_SWITCH_STOP,
+        'play': _LED_SWITCH_PLAY,
+        'record': _LED_SWITCH_RECORD,
+        'cursor_up': _SWITCH_CURSOR_UP,
+        'cursor_down': _SWITCH_CURSOR_DOWN,
+        'cursor_left': _SWITCH_CURSOR_LEFT,
+        'cursor_right': _SWITCH_CURSOR_RIGHT,
+        'zoom': _LED_SWITCH_ZOOM,
+        'scrub': _LED_SWITCH_SCRUB,
+        'user_switch_1': _SWITCH_USER_SWITCH_A,
+        'user_switch_2': _SWITCH_USER_SWITCH_B,
+        'fader_touch_channel_1': _SWITCH_CHANNEL_FADER_TOUCH,
+        'fader_touch_channel_2': _SWITCH_CHANNEL_FADER_TOUCH + 1,
+        'fader_touch_channel_3': _SWITCH_CHANNEL_FADER_TOUCH + 2,
+        'fader_touch_channel_4': _SWITCH_CHANNEL_FADER_TOUCH + 3,
+        'fader_touch_channel_5': _SWITCH_CHANNEL_FADER_TOUCH + 4,
+        'fader_touch_channel_6': _SWITCH_CHANNEL_FADER_TOUCH + 5,
+        'fader_touch_channel_7': _SWITCH_CHANNEL_FADER_TOUCH + 6,
+        'fader_touch_channel_8': _SWITCH_CHANNEL_FADER_TOUCH + 7,
+        'fader_touch_master': _SWITCH_MASTER_FADER_TOUCH
+    }
+
+    def __init__(self, mcu_model_id, mcu_connection, version_number, midi_input_name, midi_output_name, callback_log,
+                 midi_input_mode=MidiConnection.INPUT_MODE_POLLING, midi_transport=None):
         self._callback_log = callback_log
 
         self._log('Initialising MIDI ports...', True)
         self._midi_input_name = midi_input_name
         self._midi_output_name = midi_output_name
-        self._midi = MidiConnection(callback_log, self.receive_midi)
+        self._midi = MidiConnection(callback_log, self.receive_midi, input_mode=midi_input_mode,
+                                    transport=midi_transport)
+        self._midi.set_reconnect_callback(self._midi_reconnected)
         self._midi_channel = 0
 
+        # drops jitter and limits the rate of fader movements
+        self._fader_filter = FaderFilter(self._midi.send_pitch_wheel_change)
+
+        # renders level meters with decay and peak hold
+        self._meter_engine = MeterEngine(self._update_meter)
+
         # Initialized by set_hardware_controller()
         self._hardware_controller = None
         self._display_lcd_available = False
@@ -141,7 +284,19 @@ class MackieHostControl:
         self._display_timecode_available = False
         self._meter_bridge_available = False
 
-        self._offline = True
+        # maps LED IDs to methods of the hardware controller
+        self._led_dispatch_table = [None] * 128
+
+        # complete picture of the surface, used to bring hardware
+        # controllers up to date (see "resync_hardware_controller()")
+        self._surface_state = SurfaceState()
+
+        # characters sent to the LCD by the host, and a bit mask of LCD
+        # cells that have changed since (bit "row * 8 + cell")
+        self._lcd_shadow = self._surface_state.lcd
+        self._lcd_dirty_mask = 0
+
+        self._state = self.STATE_OFFLINE
 
         # Mackie Control model IDs:
         # * 0x10: Logic Control
@@ -150,6 +305,22 @@ class MackieHostControl:
         # * 0x15: Mackie Control XT
         self._mcu_model_id = mcu_model_id
 
+        # MIDI SysEx messages are received as "bytes"
+        self._sysex_header = bytes([0xF0, 0x00, 0x00, 0x66, self._mcu_model_id])
+
+        # maps command byte of MIDI SysEx messages (the one following
+        # the header) to their handlers
+        self._sysex_handlers = {
+            0x00: self._sysex_device_query,
+            0x02: self._sysex_host_connection_reply,
+            0x0F: self._sysex_go_offline,
+            0x12: self._sysex_update_lcd,
+            0x13: self._sysex_version_request,
+            0x61: self._sysex_faders_to_minimum,
+            0x62: self._sysex_all_leds_off,
+            0x63: self._sysex_reset
+        }
+
         # define connection type (among others, challenge-response)
         self._mcu_connection = mcu_connection
 
@@ -165,6 +336,10 @@ class MackieHostControl:
 
         self._response_bytes = self._calculate_response_from_challenge(self._challenge_bytes)
 
+        # used to compare against incoming MIDI SysEx messages
+        self._serial_number = bytes(self._serial_number_bytes)
+        self._response = bytes(self._response_bytes)
+
         # make sure that the version number consists of exactly 5
         # characters
         version_number = version_number.ljust(5)[0:5]
@@ -186,6 +361,12 @@ class MackieHostControl:
         self._display_timecode_available = self._hardware_controller.has_display_timecode()
         self._meter_bridge_available = self._hardware_controller.has_meter_bridge()
 
+        self._led_dispatch_table = self._create_led_dispatch_table(controller)
+
+        # hardware controllers start with a blank surface
+        self._surface_state.reset()
+        self._lcd_dirty_mask = 0
+
     def unset_hardware_controller(self):
         self._hardware_controller = None
 
@@ -195,30 +376,81 @@ class MackieHostControl:
         self._display_timecode_available = False
         self._meter_bridge_available = False
 
+        self._led_dispatch_table = [None] * 128
+
+    def _create_led_dispatch_table(self, controller):
+        """
+        return list that maps all 128 LED IDs to a function taking the
+        LED status (or None for LEDs that are not implemented)
+        """
+        def channel_led(method, channel):
+            return lambda status: method(channel, status)
+
+        table = [None] * 128
+
+        for channel in range(8):
+            table[self._LED_SWITCH_CHANNEL_RECORD_READY + channel] = channel_led(
+                controller.set_led_channel_record_ready, channel)
+            table[self._LED_SWITCH_CHANNEL_SOLO + channel] = channel_led(controller.set_led_channel_solo, channel)
+            table[self._LED_SWITCH_CHANNEL_MUTE + channel] = channel_led(controller.set_led_channel_mute, channel)
+            table[self._LED_SWITCH_CHANNEL_SELECT + channel] = channel_led(controller.set_led_channel_select, channel)
+            table[self._LED_SWITCH_CHANNEL_VSELECT + channel] = channel_led(
+                controller.set_led_channel_vselect, channel)
+
+        table[self._LED_SWITCH_ASSIGNMENT_TRACK] = controller.set_led_assignment_track
+        table[self._LED_SWITCH_ASSIGNMENT_SEND] = controller.set_led_assignment_send
+        table[self._LED_SWITCH_ASSIGNMENT_PAN_SURROUND] = controller.set_led_assignment_pan_surround
+        table[self._LED_SWITCH_ASSIGNMENT_PLUG_IN] = controller.set_led_assignment_plug_in
+        table[self._LED_SWITCH_ASSIGNMENT_EQ] = controller.set_led_assignment_eq
+        table[self._LED_SWITCH_ASSIGNMENT_INSTRUMENT] = controller.set_led_assignment_instrument
+        table[self._LED_SWITCH_FLIP] = controller.set_led_flip
+        table[self._LED_SWITCH_GLOBAL_VIEW] = controller.set_led_global_view
+        table[self._LED_SWITCH_AUTOMATION_READ_OFF] = controller.set_led_automation_read_off
+        table[self._LED_SWITCH_AUTOMATION_WRITE] = controller.set_led_automation_write
+        table[self._LED_SWITCH_AUTOMATION_TRIM] = controller.set_led_automation_trim
+        table[self._LED_SWITCH_AUTOMATION_TOUCH] = controller.set_led_automation_touch
+        table[self._LED_SWITCH_AUTOMATION_LATCH] = controller.set_led_automation_latch
+        table[self._LED_SWITCH_GROUP] = controller.set_led_group
+        table[self._LED_SWITCH_UTILITIES_SAVE] = controller.set_led_utilities_save
+        table[self._LED_SWITCH_UTILITIES_UNDO] = controller.set_led_utilities_undo
+        table[self._LED_SWITCH_MARKER] = controller.set_led_marker
+        table[self._LED_SWITCH_NUDGE] = controller.set_led_nudge
+        table[self._LED_SWITCH_CYCLE] = controller.set_led_cycle
+        table[self._LED_SWITCH_DROP] = controller.set_led_drop
+        table[self._LED_SWITCH_REPLACE] = controller.set_led_replace
+        table[self._LED_SWITCH_CLICK] = controller.set_led_click
+        table[self._LED_SWITCH_SOLO] = controller.set_led_solo
+        table[self._LED_SWITCH_REWIND] = controller.set_led_rewind
+        table[self._LED_SWITCH_FAST_FORWARD] = controller.set_led_fast_forward
+        table[self._LED_SWITCH_STOP] = controller.set_led_stop
+        table[self._LED_SWITCH_PLAY] = controller.set_led_play
+        table[self._LED_SWITCH_RECORD] = controller.set_led_record
+        table[self._LED_SWITCH_ZOOM] = controller.set_led_zoom
+        table[self._LED_SWITCH_SCRUB] = controller.set_led_scrub
+        table[self._LED_SMPTE] = controller.set_led_smpte
+        table[self._LED_BEATS] = controller.set_led_beats
+        table[self._LED_RUDE_SOLO] = controller.set_led_rude_solo
+        table[self._LED_RELAY_CLICK] = controller.set_led_relay_click
+
+        return table
+
     def connect(self):
         self._log('Opening MIDI ports...')
         self._midi.connect(self._midi_input_name, self._midi_output_name)
 
+        # the following states are left from "receive_midi()", so
+        # this method returns immediately
         if self._mcu_connection == self.CHALLENGE_RESPONSE:
-            self._log('Sending "Host Connection Query"...', True)
-
-            sysex_message = [0x01]
-            sysex_message.extend(self._serial_number_bytes)
-            sysex_message.extend(self._challenge_bytes)
-            self.send_midi_sysex(sysex_message)
-
+            self._send_host_connection_query()
             return
 
         # let's make sure the MIDI input buffer is empty
-        self._midi.process_input_buffer(use_callback=False)
+        self._midi.process_input_buffer(use_callback=False, max_events=sys.maxsize)
 
         if self._mcu_connection == self.WAIT_FOR_MIDI_DATA:
             self._log('Waiting for MIDI input from host...', True)
-
-            # wait for some MIDI input from the host (all data are
-            # left in the MIDI input buffer!)
-            while self._midi.buffer_is_empty():
-                time.sleep(0.1)
+            self._state = self.STATE_AWAITING_MIDI_DATA
+            return
 
         self.go_online()
 
@@ -226,11 +458,36 @@ class MackieHostControl:
         self._log('Disconnecting...', True)
         self.go_offline()
 
+        dropped_messages = self._fader_filter.get_dropped_messages()
+        if any(dropped_messages):
+            self._log('Dropped fader messages: %s' % ' '.join(str(number) for number in dropped_messages[:9]))
+
         self._log('Closing MIDI ports...', True)
         self._midi.disconnect()
 
+    def _midi_reconnected(self):
+        # the host has probably lost track of us, so repeat the
+        # handshake
+        if self._mcu_connection == self.CHALLENGE_RESPONSE:
+            self._send_host_connection_query()
+
+    def _send_host_connection_query(self):
+        self._log('Sending "Host Connection Query"...', True)
+
+        sysex_message = [0x01]
+        sysex_message.extend(self._serial_number_bytes)
+        sysex_message.extend(self._challenge_bytes)
+        self.send_midi_sysex(sysex_message)
+
+        # after MIDI ports have been reconnected, stay online while
+        # waiting for the reply
+        if self._state == self.STATE_OFFLINE:
+            self._state = self.STATE_AWAITING_CONNECTION_REPLY
+
     def go_online(self):
-        self._offline = False
+        self._state = self.STATE_ONLINE
+        self._fader_filter.reset()
+        self._meter_engine.reset()
 
         if self._hardware_controller:
             self._hardware_controller.go_online()
@@ -238,7 +495,7 @@ class MackieHostControl:
         self._log('Online.', True)
 
     def go_offline(self):
-        self._offline = True
+        self._state = self.STATE_OFFLINE
 
         if self._hardware_controller:
             self._hardware_controller.go_offline()
@@ -253,7 +510,10 @@ class MackieHostControl:
         self._log('Offline.', True)
 
     def is_offline(self):
-        return self._offline
+        return self._state != self.STATE_ONLINE
+
+    def get_connection_state(self):
+        return self._state
 
     # --- static methods ---
     @staticmethod
@@ -291,6 +551,23 @@ class MackieHostControl:
             return 0x15
         return None
 
+    @staticmethod
+    def get_extender_model_id(model_id):
+        # extenders ("XT") have the model ID of their main unit plus
+        # one (e.g. 0x15 for Mackie Control)
+        return model_id | 0x01
+
+    @staticmethod
+    def is_channel_strip_switch(switch_id):
+        """
+        return True for switches that extenders have as well (channel
+        strips and fader touch)
+        """
+        if switch_id < MackieHostControl._LED_SWITCH_ASSIGNMENT_TRACK:
+            return True
+
+        return MackieHostControl._SWITCH_CHANNEL_FADER_TOUCH <= switch_id < MackieHostControl._SWITCH_MASTER_FADER_TOUCH
+
     @staticmethod
     def get_preferred_mcu_model():
         return 'Mackie Control'
@@ -314,89 +591,175 @@ class MackieHostControl:
         return 'mcu'
 
     # --- MIDI processing ---
+    def set_wakeup_callback(self, callback):
+        self._midi.set_wakeup_callback(callback)
+        self._fader_filter.set_wakeup_callback(callback)
+        self._meter_engine.set_wakeup_callback(callback)
+
+    def set_latency_monitor(self, latency_monitor):
+        self._midi.set_latency_monitor(latency_monitor)
+
     def process_midi_input(self):
-        self._midi.process_input_buffer()
+        backlog_size = self._midi.process_input_buffer()
 
-    def receive_midi(self, status, message):
-        if status == MidiConnection.SYSTEM_MESSAGE and message[0:5] == [0xF0, 0x00, 0x00, 0x66, self._mcu_model_id]:
-            if message[5:] == [0x00, 0xF7]:
-                self._log('Received "Device Query".')
-                self._log('Sending "Host Connection Query"...', True)
+        # send fader positions that have been held back
+        if not self.is_offline():
+            self._fader_filter.process()
 
-                sysex_message = [0x01]
-                sysex_message.extend(self._serial_number_bytes)
-                sysex_message.extend(self._challenge_bytes)
-                self.send_midi_sysex(sysex_message)
+            if self._meter_bridge_available:
+                self._meter_engine.process()
 
-                return
-            if message[5] == 0x02:
-                self._log('Received "Host Connection Reply".')
-                if (message[6:13] == self._serial_number_bytes) and (message[13:17] == self._response_bytes):
-                    self._log('Sending "Host Connection Confirmation"...', True)
+        return backlog_size
 
-                    sysex_message = [0x03]
-                    sysex_message.extend(self._serial_number_bytes)
-                    self.send_midi_sysex(sysex_message)
+    def begin_output_batch(self):
+        self._midi.begin_output_batch()
 
-                    self.go_online()
-                else:
-                    self._log('Sending "Host Connection Error"...')
+    def flush_output(self):
+        self._midi.flush_output()
 
-                    sysex_message = [0x04]
-                    sysex_message.extend(self._serial_number_bytes)
-                    self.send_midi_sysex(sysex_message)
+    # --- MIDI SysEx commands from Mackie Control host ---
+    #
+    # "payload" is a memoryview of the whole SysEx message, so that
+    # slicing does not copy any data
 
-                    self._log('Sending "Host Connection Query"...', True)
+    def _sysex_device_query(self, payload):
+        if payload[6:] == b'\xF7':
+            self._log('Received "Device Query".')
+            self._send_host_connection_query()
 
-                    sysex_message = [0x01]
-                    sysex_message.extend(self._serial_number_bytes)
-                    sysex_message.extend(self._challenge_bytes)
-                    self.send_midi_sysex(sysex_message)
+    def _sysex_host_connection_reply(self, payload):
+        self._log('Received "Host Connection Reply".')
+        if (payload[6:13] == self._serial_number) and (payload[13:17] == self._response):
+            self._log('Sending "Host Connection Confirmation"...', True)
 
-                return
-            if message[5:] == [0x13, 0x00, 0x0F7]:
-                self._log('Received "Version Request".')
-                self._log('Sending "Version Reply"...', True)
+            sysex_message = [0x03]
+            sysex_message.extend(self._serial_number_bytes)
+            self.send_midi_sysex(sysex_message)
 
-                sysex_message = [0x14]
-                sysex_message.extend(self._version_number_bytes)
-                self.send_midi_sysex(sysex_message)
+            self.go_online()
+        else:
+            self._log('Sending "Host Connection Error"...')
 
-                return
-            if message[5:] == [0x0F, 0x7F, 0x0F7]:
-                self._log('Received "Go Offline".', True)
-                self.go_offline()
+            sysex_message = [0x04]
+            sysex_message.extend(self._serial_number_bytes)
+            self.send_midi_sysex(sysex_message)
 
-                return
-            if message[5:] == [0x61, 0x0F7]:
-                self._log('Received "Faders To Minimum".', True)
-                self.faders_to_minimum()
+            self._send_host_connection_query()
 
-                return
-            if message[5:] == [0x62, 0x0F7]:
-                self._log('Received "All LEDs Off".', True)
-                self.all_leds_off()
+    def _sysex_version_request(self, payload):
+        if payload[6:] == b'\x00\xF7':
+            self._log('Received "Version Request".')
+            self._log('Sending "Version Reply"...', True)
 
-                return
-            if message[5:] == [0x63, 0x0F7]:
-                self._log('Received "Reset".', True)
-                self.reset()
+            sysex_message = [0x14]
+            sysex_message.extend(self._version_number_bytes)
+            self.send_midi_sysex(sysex_message)
+
+    def _sysex_go_offline(self, payload):
+        if payload[6:] == b'\x7F\xF7':
+            self._log('Received "Go Offline".', True)
+            self.go_offline()
+
+    def _sysex_faders_to_minimum(self, payload):
+        if payload[6:] == b'\xF7':
+            self._log('Received "Faders To Minimum".', True)
+            self.faders_to_minimum()
+
+    def _sysex_all_leds_off(self, payload):
+        if payload[6:] == b'\xF7':
+            self._log('Received "All LEDs Off".', True)
+            self.all_leds_off()
+
+    def _sysex_reset(self, payload):
+        if payload[6:] == b'\xF7':
+            self._log('Received "Reset".', True)
+            self.reset()
 
+    def _sysex_update_lcd(self, payload):
+        if not self.is_offline():
+            position = payload[6]
+            hex_codes = payload[7:-1]
+
+            # hosts often re-send unchanged text
+            if self._lcd_shadow[position:position + len(hex_codes)] == hex_codes:
                 return
 
-        # do not make this an "elif" clause, otherwise some MIDI SysEx
-        # messages won't get processed!
+            self._update_lcd_shadow(position, hex_codes)
+
+    def _update_lcd_shadow(self, position, hex_codes):
+        """
+        forward those ranges of "hex_codes" to the hardware controller
+        that differ from the LCD shadow
+        """
+        changed_ranges = []
+        range_start = None
+
+        for index, hex_code in enumerate(hex_codes):
+            # wrap display
+            lcd_position = (position + index) % self.LCD_SIZE
+
+            if self._lcd_shadow[lcd_position] != hex_code:
+                self._lcd_shadow[lcd_position] = hex_code
+
+                (row, column) = divmod(lcd_position, self.LCD_ROW_LENGTH)
+                self._lcd_dirty_mask |= 1 << (row * self.LCD_CELLS_PER_ROW + column // self.LCD_CELL_WIDTH)
+
+                if range_start is None:
+                    range_start = index
+            elif range_start is not None:
+                changed_ranges.append((range_start, index))
+                range_start = None
+
+        if range_start is not None:
+            changed_ranges.append((range_start, len(hex_codes)))
+
+        if not self._display_lcd_available:
+            return
+
+        # repaint the hardware controller's LCD only once
+        for (range_index, (start, end)) in enumerate(changed_ranges):
+            self._hardware_controller.set_lcd(
+                (position + start) % self.LCD_SIZE, hex_codes[start:end].tobytes(),
+                range_index == len(changed_ranges) - 1)
+
+    def get_lcd_dirty_mask(self):
+        """
+        return bit mask of LCD cells changed by the host since the
+        last call of "clear_lcd_dirty_mask()"; bit "row * 8 + cell"
+        stands for cell 0 - 7 in row 0 - 1
+        """
+        return self._lcd_dirty_mask
+
+    def clear_lcd_dirty_mask(self):
+        self._lcd_dirty_mask = 0
+
+    def receive_midi(self, status, message):
+        # any MIDI input shows that the host is running
+        if self._state == self.STATE_AWAITING_MIDI_DATA:
+            self.go_online()
+
+        # system real-time messages (such as MIDI clock) arrive as
+        # "ShortMessage" and are logged below
+        if (status == MidiConnection.SYSTEM_MESSAGE) and (message[0] == 0xF0):
+            payload = memoryview(message)
+
+            if (len(payload) > 6) and (payload[0:5] == self._sysex_header):
+                handler = self._sysex_handlers.get(payload[5])
+
+                if handler:
+                    handler(payload)
+                    return
+
+        # unknown messages are logged below
         if not self.is_offline():
-            if status == MidiConnection.SYSTEM_MESSAGE and message[0:5] == [0xF0, 0x00, 0x00, 0x66, self._mcu_model_id]:
-                if message[5] == 0x12:
-                    if self._display_lcd_available:
-                        position = message[6]
-                        hex_codes = message[7:-1]
-
-                        self._hardware_controller.set_lcd(position, hex_codes)
-            elif status == MidiConnection.PITCH_WHEEL_CHANGE:
+            if status == MidiConnection.PITCH_WHEEL_CHANGE:
+                fader_id = message[0] & 0x0F
+                self._fader_filter.set_host_value(fader_id, message[1] + (message[2] << 7))
+
+                if fader_id < SurfaceState.NUMBER_OF_FADERS:
+                    self._surface_state.faders[fader_id] = message[1] + (message[2] << 7)
+
                 if self._automated_faders_available:
-                    fader_id = message[0] & 0x0F
                     fader_position = (message[1] + (message[2] << 7)) >> 4
                     self._hardware_controller.fader_moved(fader_id, fader_position)
             elif status == MidiConnection.NOTE_ON_EVENT:
@@ -411,14 +774,18 @@ class MackieHostControl:
                 self._set_led(led_id, led_status)
             elif (status == MidiConnection.CONTROL_CHANGE) and ((message[1] & 0xF0) == 0x30):
                 vpot_id = message[1] & 0x0F
-                vpot_center_led = (message[2] & 0x40) >> 7
-                vpot_mode = (message[2] & 0x30) >> 4
-                vpot_position = message[2] & 0x0F
+                if vpot_id < SurfaceState.NUMBER_OF_VPOTS:
+                    self._surface_state.vpot_rings[vpot_id] = message[2]
+
+                (vpot_center_led, vpot_mode, vpot_position) = SurfaceState.decode_vpot_ring(message[2])
                 self._hardware_controller.set_vpot_led_ring(vpot_id, vpot_center_led, vpot_mode, vpot_position)
             elif (status == MidiConnection.CONTROL_CHANGE) and ((message[1] & 0xF0) == 0x40):
                 position = message[1] & 0x0F
                 character_code = message[2]
 
+                if position < SurfaceState.NUMBER_OF_DIGITS:
+                    self._surface_state.digits[position] = character_code
+
                 if position < 10:
                     if self._display_timecode_available:
                         self._hardware_controller.set_display_timecode(position, character_code)
@@ -428,7 +795,7 @@ class MackieHostControl:
                 if self._meter_bridge_available:
                     meter_id = (message[1] & 0x70) >> 4
                     meter_level = message[1] & 0x0F
-                    self._hardware_controller.set_peak_level(meter_id, meter_level)
+                    self._meter_engine.set_level(meter_id, meter_level)
             else:
                 output = 'status %02X: ' % status
                 for byte in message:
@@ -442,6 +809,9 @@ class MackieHostControl:
 
             self._log(output.strip())
 
+    def _update_meter(self, meter_id, meter_level, peak_level, overload):
+        self._hardware_controller.set_meter(meter_id, meter_level, peak_level, overload)
+
     def send_midi_sysex(self, data):
         assert isinstance(data, list)
 
@@ -472,13 +842,38 @@ class MackieHostControl:
         if self.is_offline():
             return
 
-        self._midi.send_pitch_wheel_change(fader_id, fader_value)
+        self._fader_filter.move(fader_id, fader_value)
 
     def move_fader_7bit(self, fader_id, fader_value):
         if self.is_offline():
             return
 
-        self._midi.send_pitch_wheel_change_7bit(fader_id, fader_value)
+        # send 7-bit value in both data bytes (same as
+        # "MidiConnection.send_pitch_wheel_change_7bit()")
+        self._fader_filter.move(fader_id, fader_value + (fader_value << 7))
+
+    def set_fader_hysteresis(self, hysteresis):
+        # hysteresis is given in steps of 14-bit fader values
+        self._fader_filter.set_hysteresis(hysteresis)
+
+    def set_fader_maximum_rate(self, maximum_rate):
+        # messages per second and fader; zero turns off rate limiting
+        self._fader_filter.set_maximum_rate(maximum_rate)
+
+    def get_dropped_fader_messages(self):
+        return self._fader_filter.get_dropped_messages()
+
+    @staticmethod
+    def get_switch_id(mcu_command):
+        """
+        return MCU switch ID pressed by "keypress_<mcu_command>()", or
+        None if there is no such switch
+        """
+        return MackieHostControl._SWITCH_IDS.get(mcu_command)
+
+    def keypress_switch(self, status, switch_id):
+        # switch IDs can be looked up once using "get_switch_id()"
+        self._key_pressed(status, switch_id)
 
     def _key_pressed(self, status, switch_id):
         if self.is_offline():
@@ -873,93 +1268,12 @@ class MackieHostControl:
         if self.is_offline():
             return
 
-        selector = {
-            self._LED_SWITCH_CHANNEL_RECORD_READY: 'self._hardware_controller.set_led_channel_record_ready(0, status)',
-            self._LED_SWITCH_CHANNEL_RECORD_READY + 1:
-                'self._hardware_controller.set_led_channel_record_ready(1, status)',
-            self._LED_SWITCH_CHANNEL_RECORD_READY + 2:
-                'self._hardware_controller.set_led_channel_record_ready(2, status)',
-            self._LED_SWITCH_CHANNEL_RECORD_READY + 3:
-                'self._hardware_controller.set_led_channel_record_ready(3, status)',
-            self._LED_SWITCH_CHANNEL_RECORD_READY + 4:
-                'self._hardware_controller.set_led_channel_record_ready(4, status)',
-            self._LED_SWITCH_CHANNEL_RECORD_READY + 5:
-                'self._hardware_controller.set_led_channel_record_ready(5, status)',
-            self._LED_SWITCH_CHANNEL_RECORD_READY + 6:
-                'self._hardware_controller.set_led_channel_record_ready(6, status)',
-            self._LED_SWITCH_CHANNEL_RECORD_READY + 7:
-                'self._hardware_controller.set_led_channel_record_ready(7, status)',
-            self._LED_SWITCH_CHANNEL_SOLO: 'self._hardware_controller.set_led_channel_solo(0, status)',
-            self._LED_SWITCH_CHANNEL_SOLO + 1: 'self._hardware_controller.set_led_channel_solo(1, status)',
-            self._LED_SWITCH_CHANNEL_SOLO + 2: 'self._hardware_controller.set_led_channel_solo(2, status)',
-            self._LED_SWITCH_CHANNEL_SOLO + 3: 'self._hardware_controller.set_led_channel_solo(3, status)',
-            self._LED_SWITCH_CHANNEL_SOLO + 4: 'self._hardware_controller.set_led_channel_solo(4, status)',
-            self._LED_SWITCH_CHANNEL_SOLO + 5: 'self._hardware_controller.set_led_channel_solo(5, status)',
-            self._LED_SWITCH_CHANNEL_SOLO + 6: 'self._hardware_controller.set_led_channel_solo(6, status)',
-            self._LED_SWITCH_CHANNEL_SOLO + 7: 'self._hardware_controller.set_led_channel_solo(7, status)',
-            self._LED_SWITCH_CHANNEL_MUTE: 'self._hardware_controller.set_led_channel_mute(0, status)',
-            self._LED_SWITCH_CHANNEL_MUTE + 1: 'self._hardware_controller.set_led_channel_mute(1, status)',
-            self._LED_SWITCH_CHANNEL_MUTE + 2: 'self._hardware_controller.set_led_channel_mute(2, status)',
-            self._LED_SWITCH_CHANNEL_MUTE + 3: 'self._hardware_controller.set_led_channel_mute(3, status)',
-            self._LED_SWITCH_CHANNEL_MUTE + 4: 'self._hardware_controller.set_led_channel_mute(4, status)',
-            self._LED_SWITCH_CHANNEL_MUTE + 5: 'self._hardware_controller.set_led_channel_mute(5, status)',
-            self._LED_SWITCH_CHANNEL_MUTE + 6: 'self._hardware_controller.set_led_channel_mute(6, status)',
-            self._LED_SWITCH_CHANNEL_MUTE + 7: 'self._hardware_controller.set_led_channel_mute(7, status)',
-            self._LED_SWITCH_CHANNEL_SELECT: 'self._hardware_controller.set_led_channel_select(0, status)',
-            self._LED_SWITCH_CHANNEL_SELECT + 1: 'self._hardware_controller.set_led_channel_select(1, status)',
-            self._LED_SWITCH_CHANNEL_SELECT + 2: 'self._hardware_controller.set_led_channel_select(2, status)',
-            self._LED_SWITCH_CHANNEL_SELECT + 3: 'self._hardware_controller.set_led_channel_select(3, status)',
-            self._LED_SWITCH_CHANNEL_SELECT + 4: 'self._hardware_controller.set_led_channel_select(4, status)',
-            self._LED_SWITCH_CHANNEL_SELECT + 5: 'self._hardware_controller.set_led_channel_select(5, status)',
-            self._LED_SWITCH_CHANNEL_SELECT + 6: 'self._hardware_controller.set_led_channel_select(6, status)',
-            self._LED_SWITCH_CHANNEL_SELECT + 7: 'self._hardware_controller.set_led_channel_select(7, status)',
-            self._LED_SWITCH_CHANNEL_VSELECT: 'self._hardware_controller.set_led_channel_vselect(0, status)',
-            self._LED_SWITCH_CHANNEL_VSELECT + 1: 'self._hardware_controller.set_led_channel_vselect(1, status)',
-            self._LED_SWITCH_CHANNEL_VSELECT + 2: 'self._hardware_controller.set_led_channel_vselect(2, status)',
-            self._LED_SWITCH_CHANNEL_VSELECT + 3: 'self._hardware_controller.set_led_channel_vselect(3, status)',
-            self._LED_SWITCH_CHANNEL_VSELECT + 4: 'self._hardware_controller.set_led_channel_vselect(4, status)',
-            self._LED_SWITCH_CHANNEL_VSELECT + 5: 'self._hardware_controller.set_led_channel_vselect(5, status)',
-            self._LED_SWITCH_CHANNEL_VSELECT + 6: 'self._hardware_controller.set_led_channel_vselect(6, status)',
-            self._LED_SWITCH_CHANNEL_VSELECT + 7: 'self._hardware_controller.set_led_channel_vselect(7, status)',
-            self._LED_SWITCH_ASSIGNMENT_TRACK: 'self._hardware_controller.set_led_assignment_track(status)',
-            self._LED_SWITCH_ASSIGNMENT_SEND: 'self._hardware_controller.set_led_assignment_send(status)',
-            self._LED_SWITCH_ASSIGNMENT_PAN_SURROUND:
-                'self._hardware_controller.set_led_assignment_pan_surround(status)',
-            self._LED_SWITCH_ASSIGNMENT_PLUG_IN: 'self._hardware_controller.set_led_assignment_plug_in(status)',
-            self._LED_SWITCH_ASSIGNMENT_EQ: 'self._hardware_controller.set_led_assignment_eq(status)',
-            self._LED_SWITCH_ASSIGNMENT_INSTRUMENT: 'self._hardware_controller.set_led_assignment_instrument(status)',
-            self._LED_SWITCH_FLIP: 'self._hardware_controller.set_led_flip(status)',
-            self._LED_SWITCH_GLOBAL_VIEW: 'self._hardware_controller.set_led_global_view(status)',
-            self._LED_SWITCH_AUTOMATION_READ_OFF: 'self._hardware_controller.set_led_automation_read_off(status)',
-            self._LED_SWITCH_AUTOMATION_WRITE: 'self._hardware_controller.set_led_automation_write(status)',
-            self._LED_SWITCH_AUTOMATION_TRIM: 'self._hardware_controller.set_led_automation_trim(status)',
-            self._LED_SWITCH_AUTOMATION_TOUCH: 'self._hardware_controller.set_led_automation_touch(status)',
-            self._LED_SWITCH_AUTOMATION_LATCH: 'self._hardware_controller.set_led_automation_latch(status)',
-            self._LED_SWITCH_GROUP: 'self._hardware_controller.set_led_group(status)',
-            self._LED_SWITCH_UTILITIES_SAVE: 'self._hardware_controller.set_led_utilities_save(status)',
-            self._LED_SWITCH_UTILITIES_UNDO: 'self._hardware_controller.set_led_utilities_undo(status)',
-            self._LED_SWITCH_MARKER: 'self._hardware_controller.set_led_marker(status)',
-            self._LED_SWITCH_NUDGE: 'self._hardware_controller.set_led_nudge(status)',
-            self._LED_SWITCH_CYCLE: 'self._hardware_controller.set_led_cycle(status)',
-            self._LED_SWITCH_DROP: 'self._hardware_controller.set_led_drop(status)',
-            self._LED_SWITCH_REPLACE: 'self._hardware_controller.set_led_replace(status)',
-            self._LED_SWITCH_CLICK: 'self._hardware_controller.set_led_click(status)',
-            self._LED_SWITCH_SOLO: 'self._hardware_controller.set_led_solo(status)',
-            self._LED_SWITCH_REWIND: 'self._hardware_controller.set_led_rewind(status)',
-            self._LED_SWITCH_FAST_FORWARD: 'self._hardware_controller.set_led_fast_forward(status)',
-            self._LED_SWITCH_STOP: 'self._hardware_controller.set_led_stop(status)',
-            self._LED_SWITCH_PLAY: 'self._hardware_controller.set_led_play(status)',
-            self._LED_SWITCH_RECORD: 'self._hardware_controller.set_led_record(status)',
-            self._LED_SWITCH_ZOOM: 'self._hardware_controller.set_led_zoom(status)',
-            self._LED_SWITCH_SCRUB: 'self._hardware_controller.set_led_scrub(status)',
-            self._LED_SMPTE: 'self._hardware_controller.set_led_smpte(status)',
-            self._LED_BEATS: 'self._hardware_controller.set_led_beats(status)',
-            self._LED_RUDE_SOLO: 'self._hardware_controller.set_led_rude_solo(status)',
-            self._LED_RELAY_CLICK: 'self._hardware_controller.set_led_relay_click(status)'
-        }
+        self._surface_state.leds[led_id] = status
+
+        handler = self._led_dispatch_table[led_id]
 
-        if led_id in selector:
-            eval(selector[led_id])
+        if handler:
+            handler(status)
         else:
             led_status = 'off'
             if status == 1:
@@ -969,6 +1283,38 @@ class MackieHostControl:
 
             self._log('LED 0x%02X NOT implemented (%s).' % (led_id, led_status))
 
+    def resync_hardware_controller(self):
+        """
+        send complete state of the surface to the hardware controller
+        (e.g. after it has been reconnected)
+        """
+        if self.is_offline() or not self._hardware_controller:
+            return
+
+        state = self._surface_state
+
+        for (led_id, handler) in enumerate(self._led_dispatch_table):
+            if handler:
+                handler(state.leds[led_id])
+
+        for (vpot_id, value) in enumerate(state.vpot_rings):
+            (vpot_center_led, vpot_mode, vpot_position) = SurfaceState.decode_vpot_ring(value)
+            self._hardware_controller.set_vpot_led_ring(vpot_id, vpot_center_led, vpot_mode, vpot_position)
+
+        if self._automated_faders_available:
+            for (fader_id, fader_position) in enumerate(state.faders):
+                self._hardware_controller.fader_moved(fader_id, fader_position >> 4)
+
+        if self._display_lcd_available:
+            self._hardware_controller.set_lcd(0, bytes(state.lcd))
+
+        for (position, character_code) in enumerate(state.digits):
+            if position < 10:
+                if self._display_timecode_available:
+                    self._hardware_controller.set_display_timecode(position, character_code)
+            elif self._display_7seg_available:
+                self._hardware_controller.set_display_7seg(position, character_code)
+
     def faders_to_minimum(self):
         if self._hardware_controller:
             self._hardware_controller.faders_to_minimum()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import threading
+import time
+
+
+class MeterEngine:
+    __module__ = __name__
+    __doc__ = 'Renders the level meters of all channels with decay and peak hold'
+
+    NUMBER_OF_METERS = 8
+
+    # meter levels sent by the host (channel pressure, lower nibble);
+    # 0x0D is not used
+    MAXIMUM_LEVEL = 0x0C
+    LEVEL_SET_OVERLOAD = 0x0E
+    LEVEL_CLEAR_OVERLOAD = 0x0F
+
+    # like Mackie Control hardware, meters fall by one segment every
+    # 300 ms unless the host sends new levels
+    DECAY_INTERVAL = 0.3
+
+    # peaks are held for this time before they fall like meters
+    PEAK_HOLD_TIME = 1.5
+
+    # meters are rendered at most this often per second
+    FRAME_RATE = 30.0
+
+    def __init__(self, callback_update):
+        # "callback_update" is called with meter ID, level, peak level
+        # and overload status for every meter that has changed
+        self._callback_update = callback_update
+        self._callback_wakeup = None
+        self._wakeup_timer = None
+
+        self._frame_interval = 1.0 / self.FRAME_RATE
+        self.reset()
+
+    def reset(self):
+        number_of_meters = self.NUMBER_OF_METERS
+
+        # levels and peaks as sent by the host, and when they were set
+        self._levels = [0] * number_of_meters
+        self._level_times = [0.0] * number_of_meters
+        self._peaks = [0] * number_of_meters
+        self._peak_times = [0.0] * number_of_meters
+        self._overloads = [False] * number_of_meters
+
+        # state of meters as last rendered
+        self._rendered = [(0, 0, False)] * number_of_meters
+        self._next_frame_time = 0.0
+        self._is_dirty = False
+
+    def set_wakeup_callback(self, callback):
+        """
+        "callback" is called from a timer thread while meters are
+        falling; it should trigger a call of "process()" (not needed
+        when "process()" is called regularly anyway)
+        """
+        self._callback_wakeup = callback
+
+    # --- meter levels ---
+    def set_level(self, meter_id, meter_level, timestamp=None):
+        """
+        store meter level sent by the host; meters are rendered by
+        "process()", so floods of meter messages cost next to nothing
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        if meter_level == self.LEVEL_SET_OVERLOAD:
+            self._overloads[meter_id] = True
+        elif meter_level == self.LEVEL_CLEAR_OVERLOAD:
+            self._overloads[meter_id] = False
+        else:
+            meter_level = min(meter_level, self.MAXIMUM_LEVEL)
+
+            self._levels[meter_id] = meter_level
+            self._level_times[meter_id] = timestamp
+
+            if meter_level >= self._get_peak(meter_id, timestamp):
+                self._peaks[meter_id] = meter_level
+                self._peak_times[meter_id] = timestamp
+
+        self._is_dirty = True
+
+    def _get_level(self, meter_id, timestamp):
+        segments_fallen = int((timestamp - self._level_times[meter_id]) / self.DECAY_INTERVAL)
+        return max(self._levels[meter_id] - segments_fallen, 0)
+
+    def _get_peak(self, meter_id, timestamp):
+        time_fallen = timestamp - self._peak_times[meter_id] - self.PEAK_HOLD_TIME
+
+        if time_fallen <= 0.0:
+            return self._peaks[meter_id]
+
+        segments_fallen = int(time_fallen / self.DECAY_INTERVAL)
+        return max(self._peaks[meter_id] - segments_fallen, 0)
+
+    # --- rendering ---
+    def process(self, timestamp=None):
+        """
+        render all meters once per frame and report those that have
+        changed
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        if timestamp < self._next_frame_time:
+            if self._is_dirty:
+                self._schedule_wakeup(self._next_frame_time - timestamp)
+            return
+
+        self._next_frame_time = timestamp + self._frame_interval
+
+        is_falling = False
+        for meter_id in range(self.NUMBER_OF_METERS):
+            level = self._get_level(meter_id, timestamp)
+            peak_level = max(self._get_peak(meter_id, timestamp), level)
+            meter = (level, peak_level, self._overloads[meter_id])
+
+            if peak_level:
+                is_falling = True
+
+            if meter != self._rendered[meter_id]:
+                self._rendered[meter_id] = meter
+                self._callback_update(meter_id, *meter)
+
+        # keep rendering until all meters have fallen to zero
+        self._is_dirty = is_falling
+        if is_falling:
+            self._schedule_wakeup(self._frame_interval)
+
+    def _schedule_wakeup(self, delay):
+        if not self._callback_wakeup:
+            return
+
+        if self._wakeup_timer and self._wakeup_timer.is_alive():
+            return
+
+        self._wakeup_timer = threading.Timer(delay, self._callback_wakeup)
+        self._wakeup_timer.daemon = True
+        self._wakeup_timer.start()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+
+class SurfaceState:
+    __module__ = __name__
+    __doc__ = 'State of a Mackie Control surface as last set by the host'
+
+    NUMBER_OF_LEDS = 128
+    NUMBER_OF_VPOTS = 8
+
+    # channel faders 0 - 7 and master fader
+    NUMBER_OF_FADERS = 9
+
+    # 2 rows of 56 characters
+    LCD_SIZE = 112
+
+    # timecode display (positions 0 - 9) and assignment display
+    # (positions 10 and 11)
+    NUMBER_OF_DIGITS = 12
+
+    def __init__(self):
+        # all values are stored just like the host sends them
+        #
+        # leds: LED status (0: off, 1: on, 2: flashing)
+        # vpot_rings: data byte of V-Pot LED ring messages
+        # faders: 14-bit fader positions
+        # lcd: character codes of LCD
+        # digits: character codes of 7-segment displays
+        self.leds = bytearray(self.NUMBER_OF_LEDS)
+        self.vpot_rings = bytearray(self.NUMBER_OF_VPOTS)
+        self.faders = [0] * self.NUMBER_OF_FADERS
+        self.lcd = bytearray(b' ' * self.LCD_SIZE)
+        self.digits = bytearray(b' ' * self.NUMBER_OF_DIGITS)
+
+    def reset(self):
+        self.leds[:] = bytes(self.NUMBER_OF_LEDS)
+        self.vpot_rings[:] = bytes(self.NUMBER_OF_VPOTS)
+        self.faders[:] = [0] * self.NUMBER_OF_FADERS
+        self.lcd[:] = b' ' * self.LCD_SIZE
+        self.digits[:] = b' ' * self.NUMBER_OF_DIGITS
+
+    @staticmethod
+    def decode_vpot_ring(value):
+        """
+        return center LED, mode and position of V-Pot LED ring
+        """
+        vpot_center_led = (value & 0x40) >> 6
+        vpot_mode = (value & 0x30) >> 4
+        vpot_position = value & 0x0F
+
+        return vpot_center_led, vpot_mode, vpot_position
@@ -25,13 +25,18 @@ Thank you for using free software!
 """
 
 import sys
+import time
 
 if __name__ == "__main__":
     # allow "PythonMcu" package imports when executing this module
     sys.path.append('../../')
 
 from PythonMcu.MackieControl.MackieHostControl import MackieHostControl
+from PythonMcu.McuInterconnector.MiddlewarePipeline import MiddlewarePipeline
+from PythonMcu.Midi.MidiConnection import MidiConnection
+from PythonMcu.Midi.MidiLatencyMonitor import MidiLatencyMonitor
 from PythonMcu.Tools.ApplicationConfiguration import ApplicationConfiguration
+from PythonMcu.Tools.TimerWheel import TimerWheel
 
 # noinspection PyUnresolvedReferences
 from PythonMcu.Hardware import *
@@ -44,6 +49,12 @@ class McuInterconnector:
         0x7F: 'on'
     }
 
+    # LED status as sent by "MackieHostControl"
+    _LED_STATUS_FLASHING = 2
+
+    # flashing LEDs are on and off for this long (in seconds)
+    _LED_FLASH_INTERVAL = 0.25
+
     _MCU_COMMANDS = [
         'function_channel_1',
         'function_channel_2',
@@ -156,36 +167,128 @@ class McuInterconnector:
         'zoom',
     ]
 
+    # MCU commands are addressed by their index in "_MCU_COMMANDS"
+    _MCU_COMMAND_IDS = dict(zip(_MCU_COMMANDS, range(len(_MCU_COMMANDS))))
+
+    # LED IDs of channel strips, indexed by [group][channel]; channels
+    # of each group are listed in order in "_MCU_COMMANDS"
+    _LED_GROUP_RECORD_READY = 0
+    _LED_GROUP_SOLO = 1
+    _LED_GROUP_MUTE = 2
+    _LED_GROUP_SELECT = 3
+    _LED_GROUP_VSELECT = 4
+
+    _CHANNEL_LED_IDS = tuple(map(
+        lambda first_id: tuple(range(first_id, first_id + 8)),
+        (
+            _MCU_COMMAND_IDS['record_ready_channel_1'],
+            _MCU_COMMAND_IDS['solo_channel_1'],
+            _MCU_COMMAND_IDS['mute_channel_1'],
+            _MCU_COMMAND_IDS['select_channel_1'],
+            _MCU_COMMAND_IDS['vselect_channel_1'],
+        )
+    ))
+
     def __init__(self, parent, mcu_model_id, mcu_connection, mcu_midi_input, mcu_midi_output, hardware_controller_class,
-                 controller_midi_input, controller_midi_output, callback_log):
+                 controller_midi_input, controller_midi_output, callback_log,
+                 midi_input_mode=MidiConnection.INPUT_MODE_POLLING, mcu_midi_transport=None,
+                 controller_midi_transport=None, middleware_stages=()):
         self._play_status = False
         self._callback_log = callback_log
         self.parent = parent
 
-        self._hardware_controller = hardware_controller_class(midi_in, midi_out, callback_log)
+        # interconnector of main unit (see "set_main_unit()")
+        self._main_unit = self
 
+        # MIDI transports default to PortMidi / RtMidi (depending on
+        # "midi_input_mode"); pass loopback transports to run the
+        # interconnector without any MIDI hardware
+        self._hardware_controller = hardware_controller_class(
+            controller_midi_input, controller_midi_output, callback_log,
+            controller_midi_transport
+        )
+
+        # both sides use the same input mode, so that MIDI input from
+        # the hardware controller wakes up the application as well
+        # (without polling); either way, all engine logic runs on the
+        # thread calling "process_midi_input()"
+        self._hardware_controller.set_midi_input_mode(midi_input_mode)
 
         # get "Python MCU" version number
         python_mcu_version = ApplicationConfiguration().get_version(False)
 
         self._mackie_host_control = MackieHostControl(
             mcu_model_id, mcu_connection, python_mcu_version,
-            mcu_midi_input, mcu_midi_output, callback_log
+            mcu_midi_input, mcu_midi_output, callback_log,
+            midi_input_mode, mcu_midi_transport
         )
 
+        # traces MIDI output on either side back to the MIDI input
+        # that caused it
+        self._latency_monitor = None
+        self._set_latency_monitor(MidiLatencyMonitor())
+
         # set this here so the hardware controller can notify the user
         # about the connection process
         self._hardware_controller.set_interconnector(self)
         self._mackie_host_control.set_hardware_controller(self)
 
+        # all messages between Mackie Host Control and hardware
+        # controller pass these stages (see "MiddlewarePipeline");
+        # stages cannot be changed later on
+        self._pipeline = MiddlewarePipeline(middleware_stages, self._mackie_host_control, self._hardware_controller)
+
+        # maps hardware switches to LED IDs (see "_MCU_COMMAND_IDS")
         self._led__hardware_to_mcu = {}
-        self._led__mcu_to_hardware = {}
+
+        # state of MCU commands, indexed by LED ID
+        number_of_commands = len(self._MCU_COMMANDS)
+        self._led_midi_switch = [None] * number_of_commands
+        self._led_midi_led = [None] * number_of_commands
+        self._led_value = bytearray(number_of_commands)
+
+        # LED changes are gathered while MIDI input is processed and
+        # sent to the hardware controller in one batch at the end of
+        # the tick; LEDs that end up where they were are not sent at
+        # all
+        self._is_batching_leds = False
+        self._pending_led_ids = []
+        self._led_is_pending = bytearray(number_of_commands)
+        self._led_hardware_value = bytearray(number_of_commands)
+
+        # flashing LEDs are toggled in software unless the hardware
+        # controller can flash LEDs on its own; all of them share a
+        # single timer and are toggled in phase
+        self._is_flashing_in_software = not self._hardware_controller.has_flashing_leds()
+        self._timer_wheel = TimerWheel()
+        self._flashing_led_ids = set()
+        self._led_flash_status = 0
+        self._is_flash_scheduled = False
+
+        # maps hardware switches to MCU switch IDs, so that key presses
+        # need not look up any MCU commands
+        self._switch_id__hardware_to_mcu = {}
 
         self.withdraw_all_controls()
 
     def _log(self, message, repaint=False):
         self._callback_log('[MCU Interconnector   ]  ' + message, repaint)
 
+    def set_main_unit(self, main_unit):
+        """
+        turn this interconnector into an extender of the
+        interconnector "main_unit"; extenders only have channel
+        strips, so all other switches are pressed on the main unit
+        """
+        self._main_unit = main_unit
+
+        # key presses are forwarded to the main unit, so its MIDI
+        # output may well be caused by this unit's MIDI input
+        self._set_latency_monitor(main_unit.get_latency_monitor())
+
+    def is_extender(self):
+        return self._main_unit is not self
+
     # --- initialisation ---
     def connect(self):
         self._hardware_controller.connect()
@@ -203,77 +306,229 @@ class McuInterconnector:
     def go_offline(self):
         self._hardware_controller.go_offline()
 
+    def resync_surface(self):
+        """
+        send complete state of the surface to the hardware controller
+        (e.g. after it has been reconnected); when called while MIDI
+        input is processed, all messages are sent in one burst
+        """
+        self._mackie_host_control.resync_hardware_controller()
+
+        # LEDs of registered controls are only updated on changes
+        for led_id in range(len(self._MCU_COMMANDS)):
+            self._update_led(led_id)
+
+    def _set_latency_monitor(self, latency_monitor):
+        self._latency_monitor = latency_monitor
+        self._hardware_controller.set_latency_monitor(latency_monitor)
+        self._mackie_host_control.set_latency_monitor(latency_monitor)
+
+    def get_latency_monitor(self):
+        return self._latency_monitor
+
+    def set_wakeup_callback(self, callback):
+        # "callback" is called from MIDI reader threads as soon as
+        # there is new MIDI input; it should trigger a call of
+        # "process_midi_input()" on the application's main thread
+        self._hardware_controller.set_wakeup_callback(callback)
+        self._mackie_host_control.set_wakeup_callback(callback)
+        self._timer_wheel.set_wakeup_callback(callback)
+
     def process_midi_input(self):
-        self._hardware_controller.process_midi_input()
-        self._mackie_host_control.process_midi_input()
+        # all MIDI messages caused by this tick are sent in one go
+        # (and superseded fader positions are dropped)
+        self._hardware_controller.begin_output_batch()
+        self._mackie_host_control.begin_output_batch()
+        self._is_batching_leds = True
+
+        try:
+            # return number of events that are still waiting to be
+            # processed
+            backlog_size = self._hardware_controller.process_midi_input() or 0
+            backlog_size += self._mackie_host_control.process_midi_input() or 0
+
+            self._timer_wheel.advance()
+        finally:
+            self._is_batching_leds = False
+            self._flush_leds()
+
+            self._hardware_controller.flush_output()
+            self._mackie_host_control.flush_output()
+
+        return backlog_size
 
     # --- registration of MIDI controls ---
     def register_control(self, mcu_command, midi_switch, midi_led):
         self.withdraw_control(midi_switch)
 
-        self._led__hardware_to_mcu[midi_switch] = mcu_command
-        self._led__mcu_to_hardware[mcu_command]['midi_switch'] = midi_switch
-        self._led__mcu_to_hardware[mcu_command]['midi_led'] = midi_led
+        led_id = self._MCU_COMMAND_IDS[mcu_command]
+
+        self._led__hardware_to_mcu[midi_switch] = led_id
+        self._switch_id__hardware_to_mcu[midi_switch] = MackieHostControl.get_switch_id(mcu_command)
+        self._led_midi_switch[led_id] = midi_switch
+        self._led_midi_led[led_id] = midi_led
 
-        self._update_led(mcu_command)
+        self._update_led(led_id)
 
     def withdraw_control(self, midi_switch):
         if midi_switch in self._led__hardware_to_mcu:
-            mcu_command = self._led__hardware_to_mcu[midi_switch]
-            midi_led = self._led__mcu_to_hardware[mcu_command]['midi_led']
+            led_id = self._led__hardware_to_mcu[midi_switch]
+            midi_led = self._led_midi_led[led_id]
 
             if midi_led:
-                self._hardware_controller.set_led(midi_led, 0)
+                self._pipeline.set_led(midi_led, 0)
+
+            self._led_hardware_value[led_id] = 0
 
             del self._led__hardware_to_mcu[midi_switch]
-            self._led__mcu_to_hardware[mcu_command]['midi_switch'] = None
-            self._led__mcu_to_hardware[mcu_command]['midi_led'] = None
+            del self._switch_id__hardware_to_mcu[midi_switch]
+            self._led_midi_switch[led_id] = None
+            self._led_midi_led[led_id] = None
 
     def withdraw_all_controls(self):
-        for _, mcu_command in self._led__hardware_to_mcu.items():
-            midi_led = self._led__mcu_to_hardware[mcu_command]['midi_led']
+        for led_id in self._led__hardware_to_mcu.values():
+            midi_led = self._led_midi_led[led_id]
 
             if midi_led:
-                self._hardware_controller.set_led(midi_led, 0)
+                self._pipeline.set_led(midi_led, 0)
 
         self._led__hardware_to_mcu = {}
-        self._led__mcu_to_hardware = {}
+        self._switch_id__hardware_to_mcu = {}
 
-        for command in self._MCU_COMMANDS:
-            self._led__mcu_to_hardware[command] = {
-                'midi_switch': None,
-                'midi_led': None,
-                'value': 0
-            }
+        # reset state in place
+        number_of_commands = len(self._MCU_COMMANDS)
+        self._led_midi_switch[:] = [None] * number_of_commands
+        self._led_midi_led[:] = [None] * number_of_commands
+        self._led_value[:] = bytes(number_of_commands)
+
+        del self._pending_led_ids[:]
+        self._led_is_pending[:] = bytes(number_of_commands)
+        self._led_hardware_value[:] = bytes(number_of_commands)
+        self._flashing_led_ids.clear()
 
     # --- MCU Interconnector commands ---
     def keypress(self, internal_id, status):
-        if internal_id in self._led__hardware_to_mcu:
-            mcu_command = self._led__hardware_to_mcu[internal_id]
-            self.keypress_unregistered(mcu_command, status)
+        if internal_id in self._switch_id__hardware_to_mcu:
+            switch_id = self._switch_id__hardware_to_mcu[internal_id]
+
+            # some MCU commands (such as "smpte") only have an LED
+            if switch_id is not None:
+                self._press_switch(status, switch_id)
+
             return True
 
         return False
 
-    @staticmethod
-    def keypress_unregistered(mcu_command, status):
-        command = 'self._mackie_host_control.keypress_%s(%d)' % (mcu_command, status)
-        eval(command)
+    def keypress_unregistered(self, mcu_command, status):
+        switch_id = MackieHostControl.get_switch_id(mcu_command)
+
+        if switch_id is None:
+            self._log('MCU command "%s" has no switch.' % mcu_command)
+        else:
+            self._press_switch(status, switch_id)
+
+    def _press_switch(self, status, switch_id):
+        if self._main_unit is self or MackieHostControl.is_channel_strip_switch(switch_id):
+            self._pipeline.keypress_switch(status, switch_id)
+        else:
+            self._main_unit.keypress_switch(status, switch_id)
+
+    def keypress_switch(self, status, switch_id):
+        self._pipeline.keypress_switch(status, switch_id)
 
     def _set_led(self, mcu_command, status):
-        if self._led__mcu_to_hardware[mcu_command]['value'] != status:
-            self._led__mcu_to_hardware[mcu_command]['value'] = status
+        self._set_led_id(self._MCU_COMMAND_IDS[mcu_command], status)
+
+    def _set_led_id(self, led_id, status):
+        if self._led_value[led_id] != status:
+            self._led_value[led_id] = status
+
+            if status == self._LED_STATUS_FLASHING and self._is_flashing_in_software:
+                self._start_flashing(led_id)
+            else:
+                self._flashing_led_ids.discard(led_id)
+
+            if self._led_midi_switch[led_id]:
+                if self._is_batching_leds:
+                    if not self._led_is_pending[led_id]:
+                        self._led_is_pending[led_id] = 1
+                        self._pending_led_ids.append(led_id)
+                else:
+                    self._update_led(led_id)
+
+    def _update_led(self, led_id):
+        if self._led_midi_switch[led_id]:
+            status = self._get_hardware_led_status(led_id)
+            self._led_hardware_value[led_id] = status
+            self._pipeline.set_led(self._led_midi_led[led_id], status)
+
+    def _flush_leds(self):
+        if not self._pending_led_ids:
+            return
+
+        leds = []
+        for led_id in self._pending_led_ids:
+            self._led_is_pending[led_id] = 0
+            status = self._get_hardware_led_status(led_id)
+
+            # skip LEDs that have been withdrawn or flickered back
+            if self._led_midi_switch[led_id] and self._led_hardware_value[led_id] != status:
+                self._led_hardware_value[led_id] = status
+                leds.append((self._led_midi_led[led_id], status))
+
+        del self._pending_led_ids[:]
+
+        if leds:
+            self._pipeline.set_leds(leds)
+
+    def _get_hardware_led_status(self, led_id):
+        status = self._led_value[led_id]
 
-            if self._led__mcu_to_hardware[mcu_command]['midi_switch']:
-                self._update_led(mcu_command)
+        if status == self._LED_STATUS_FLASHING and self._is_flashing_in_software:
+            return self._led_flash_status
 
-    def _update_led(self, mcu_command):
-        if self._led__mcu_to_hardware[mcu_command]['midi_switch']:
-            status = self._led__mcu_to_hardware[mcu_command]['value']
-            self._hardware_controller.set_led(self._led__mcu_to_hardware[mcu_command]['midi_led'], status)
+        return status
+
+    # --- flashing LEDs ---
+    def _get_flash_delay(self, timestamp):
+        # flashing follows the clock, so that LEDs of all units
+        # (including extenders) are in phase
+        self._led_flash_status = 1 - int(timestamp / self._LED_FLASH_INTERVAL) % 2
+        return self._LED_FLASH_INTERVAL - timestamp % self._LED_FLASH_INTERVAL
+
+    def _start_flashing(self, led_id):
+        self._flashing_led_ids.add(led_id)
+
+        if not self._is_flash_scheduled:
+            timestamp = time.perf_counter()
+            delay = self._get_flash_delay(timestamp)
+
+            self._is_flash_scheduled = True
+            self._timer_wheel.schedule(delay, self._toggle_flashing_leds, timestamp)
+
+    def _toggle_flashing_leds(self, timestamp):
+        if not self._flashing_led_ids:
+            self._is_flash_scheduled = False
+            return
+
+        delay = self._get_flash_delay(timestamp)
+        status = self._led_flash_status
+
+        # send each toggle round in one batch
+        leds = []
+        for led_id in self._flashing_led_ids:
+            if self._led_midi_switch[led_id] and self._led_hardware_value[led_id] != status:
+                self._led_hardware_value[led_id] = status
+                leds.append((self._led_midi_led[led_id], status))
+
+        if leds:
+            self._pipeline.set_leds(leds)
+
+        self._timer_wheel.schedule(delay, self._toggle_flashing_leds, timestamp)
 
     def is_playing(self):
-        return self._play_status
+        # only main units know the transport status
+        return self._main_unit._play_status
 
     # --- hardware controller commands ---
     def has_display_7seg(self):
@@ -291,56 +546,65 @@ class McuInterconnector:
     def has_meter_bridge(self):
         return self._hardware_controller.has_meter_bridge()
 
+    def has_flashing_leds(self):
+        return self._hardware_controller.has_flashing_leds()
+
     def move_fader(self, fader_id, fader_value):
-        self._mackie_host_control.move_fader(fader_id, fader_value)
+        self._pipeline.move_fader(fader_id, fader_value)
 
     def move_fader_7bit(self, fader_id, fader_value):
-        self._mackie_host_control.move_fader_7bit(fader_id, fader_value)
+        self._pipeline.move_fader_7bit(fader_id, fader_value)
 
     def move_vpot(self, vpot_id, direction, number_of_ticks):
-        self._mackie_host_control.move_vpot(vpot_id, direction, number_of_ticks)
+        self._pipeline.move_vpot(vpot_id, direction, number_of_ticks)
 
     def move_vpot_raw(self, vpot_id, vpot_movement):
-        self._mackie_host_control.move_vpot_raw(vpot_id, vpot_movement)
+        self._pipeline.move_vpot_raw(vpot_id, vpot_movement)
 
     # --- Mackie Control Unit commands ---
     def fader_moved(self, fader_id, fader_position):
-        self._hardware_controller.fader_moved(fader_id, fader_position)
+        self._pipeline.fader_moved(fader_id, fader_position)
 
-    def set_peak_level(self, meter_id, meter_level):
-        self._hardware_controller.set_peak_level(meter_id, meter_level)
+    def set_meter(self, meter_id, meter_level, peak_level, overload):
+        self._pipeline.set_meter(meter_id, meter_level, peak_level, overload)
 
     def set_display_7seg(self, position, character_code):
-        self._hardware_controller.set_display_7seg(position, character_code)
+        self._pipeline.set_display_7seg(position, character_code)
 
     def set_display_timecode(self, position, character_code):
-        self._hardware_controller.set_display_timecode(position, character_code)
+        self._pipeline.set_display_timecode(position, character_code)
 
     def set_vpot_led_ring(self, vpot_id, vpot_center_led, vpot_mode, vpot_position):
-        self._hardware_controller.set_vpot_led_ring(vpot_id, vpot_center_led, vpot_mode, vpot_position)
+        self._pipeline.set_vpot_led_ring(vpot_id, vpot_center_led, vpot_mode, vpot_position)
+
+    def set_lcd(self, position, hex_codes, update=True):
+        self._pipeline.set_lcd(position, hex_codes, update)
+
+    def get_lcd_dirty_mask(self):
+        return self._mackie_host_control.get_lcd_dirty_mask()
 
-    def set_lcd(self, position, hex_codes):
-        self._hardware_controller.set_lcd(position, hex_codes)
+    def clear_lcd_dirty_mask(self):
+        self._mackie_host_control.clear_lcd_dirty_mask()
 
     def set_led_channel_record_ready(self, channel, status):
         # channel: 0 - 7
-        self._set_led('record_ready_channel_%d' % (channel + 1), status)
+        self._set_led_id(self._CHANNEL_LED_IDS[self._LED_GROUP_RECORD_READY][channel], status)
 
     def set_led_channel_solo(self, channel, status):
         # channel: 0 - 7
-        self._set_led('solo_channel_%d' % (channel + 1), status)
+        self._set_led_id(self._CHANNEL_LED_IDS[self._LED_GROUP_SOLO][channel], status)
 
     def set_led_channel_mute(self, channel, status):
         # channel: 0 - 7
-        self._set_led('mute_channel_%d' % (channel + 1), status)
+        self._set_led_id(self._CHANNEL_LED_IDS[self._LED_GROUP_MUTE][channel], status)
 
     def set_led_channel_select(self, channel, status):
         # channel: 0 - 7
-        self._set_led('select_channel_%d' % (channel + 1), status)
+        self._set_led_id(self._CHANNEL_LED_IDS[self._LED_GROUP_SELECT][channel], status)
 
     def set_led_channel_vselect(self, channel, status):
         # channel: 0 - 7
-        self._set_led('vselect_channel_%d' % (channel + 1), status)
+        self._set_led_id(self._CHANNEL_LED_IDS[self._LED_GROUP_VSELECT][channel], status)
 
     def set_led_assignment_track(self, status):
         self._set_led('assignment_track', status)
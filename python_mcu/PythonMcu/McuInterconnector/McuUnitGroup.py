@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+
+class McuUnitGroup:
+    __module__ = __name__
+    __doc__ = 'Main Mackie Control unit and its extenders, serviced by a single event loop'
+
+    # every unit has 8 channel strips
+    CHANNELS_PER_UNIT = 8
+
+    def __init__(self, main_unit):
+        # units are instances of "McuInterconnector", each with its own
+        # MIDI ports and hardware controller
+        self._units = [main_unit]
+
+    def add_extender(self, extender):
+        """
+        add interconnector of an extender ("XT") to the right of all
+        units; every unit drives its own hardware controller
+        """
+        extender.set_main_unit(self._units[0])
+        self._units.append(extender)
+
+    def get_main_unit(self):
+        return self._units[0]
+
+    def get_units(self):
+        return list(self._units)
+
+    def get_latency_monitor(self):
+        # shared by all units (see "McuInterconnector.set_main_unit()")
+        return self._units[0].get_latency_monitor()
+
+    def get_number_of_channels(self):
+        return len(self._units) * self.CHANNELS_PER_UNIT
+
+    # --- initialisation ---
+    def connect(self):
+        for unit in self._units:
+            unit.connect()
+
+    def disconnect(self):
+        # extenders go first, as the main unit controls the host
+        for unit in reversed(self._units):
+            unit.disconnect()
+
+    # --- MIDI processing ---
+    def set_wakeup_callback(self, callback):
+        for unit in self._units:
+            unit.set_wakeup_callback(callback)
+
+    def process_midi_input(self):
+        # return number of events that are still waiting to be
+        # processed by any unit
+        backlog_size = 0
+        for unit in self._units:
+            backlog_size += unit.process_midi_input()
+
+        return backlog_size
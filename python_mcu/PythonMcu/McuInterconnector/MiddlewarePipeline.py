@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import functools
+
+
+class MiddlewareStage:
+    __module__ = __name__
+    __doc__ = 'Base class for stages of "MiddlewarePipeline"'
+
+    # A stage handles a message by implementing a method of the same
+    # name (see "MiddlewarePipeline.MESSAGES_TO_HOST" and
+    # "MESSAGES_TO_HARDWARE").  The method is called with the next
+    # stage of the pipeline, followed by the arguments of the message:
+    #
+    #     def move_fader(self, forward, fader_id, fader_value):
+    #         forward(fader_id, 16383 - fader_value)
+    #
+    # Stages may change the arguments, drop messages by not calling
+    # "forward" or call it several times.  Messages a stage does not
+    # handle bypass it at no cost.
+
+    def get_handler(self, message_name):
+        """
+        return handler for message "message_name" or None; called
+        only when the pipeline is compiled
+        """
+        return getattr(self, message_name, None)
+
+
+class MiddlewarePipeline:
+    __module__ = __name__
+    __doc__ = 'Stages between Mackie Host Control and hardware controller, compiled into plain callables'
+
+    # messages from hardware controller to Mackie Host Control
+    MESSAGES_TO_HOST = (
+        'keypress_switch',
+        'move_fader',
+        'move_fader_7bit',
+        'move_vpot',
+        'move_vpot_raw',
+    )
+
+    # messages from Mackie Host Control to hardware controller
+    MESSAGES_TO_HARDWARE = (
+        'fader_moved',
+        'set_display_7seg',
+        'set_display_timecode',
+        'set_lcd',
+        'set_led',
+        'set_leds',
+        'set_meter',
+        'set_vpot_led_ring',
+    )
+
+    def __init__(self, stages, host, hardware):
+        """
+        stages: list of "MiddlewareStage" instances; messages to the
+                host pass them in this order, messages to the hardware
+                controller in reverse order
+
+        host: receives messages to the host (such as
+              "MackieHostControl")
+
+        hardware: receives messages to the hardware controller (such
+                  as "MidiControllerTemplate")
+        """
+        self._stages = list(stages)
+
+        # every message becomes an attribute of the pipeline, such as
+        # "pipeline.move_fader(fader_id, fader_value)"
+        for message_name in self.MESSAGES_TO_HOST:
+            self._compile(message_name, getattr(host, message_name), reversed(self._stages))
+
+        for message_name in self.MESSAGES_TO_HARDWARE:
+            self._compile(message_name, getattr(hardware, message_name), self._stages)
+
+    def get_stages(self):
+        return list(self._stages)
+
+    def _compile(self, message_name, sink, stages):
+        # chain handlers from the sink backwards, so that each stage
+        # costs a single function call and stages that do not handle
+        # the message are not called at all
+        handler = sink
+
+        for stage in stages:
+            stage_handler = stage.get_handler(message_name)
+            if stage_handler:
+                handler = functools.partial(stage_handler, handler)
+
+        setattr(self, message_name, handler)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import functools
+
+from PythonMcu.McuInterconnector.MiddlewarePipeline import MiddlewarePipeline, MiddlewareStage
+
+
+class FaderVpotRemap(MiddlewareStage):
+    __module__ = __name__
+    __doc__ = 'Swaps faders, V-Pots and meters of the channel strips'
+
+    def __init__(self, channels):
+        """
+        channels: list of 8 MCU channels (0 - 7), one for every fader
+                  (and V-Pot) of the hardware controller
+
+        Only faders, V-Pots and meters are remapped.  Channel strip
+        switches, their LEDs and the LCD still follow the MCU channel
+        order, as LED IDs differ between hardware controllers.
+        """
+        assert sorted(channels) == list(range(8))
+
+        # master fader (ID 8) and all other IDs are never remapped
+        self._to_host = list(channels) + list(range(8, 16))
+        self._to_hardware = list(range(16))
+
+        for (hardware_channel, mcu_channel) in enumerate(channels):
+            self._to_hardware[mcu_channel] = hardware_channel
+
+    # --- messages to host ---
+    def move_fader(self, forward, fader_id, fader_value):
+        forward(self._to_host[fader_id], fader_value)
+
+    def move_fader_7bit(self, forward, fader_id, fader_value):
+        forward(self._to_host[fader_id], fader_value)
+
+    def move_vpot(self, forward, vpot_id, direction, number_of_ticks):
+        forward(self._to_host[vpot_id], direction, number_of_ticks)
+
+    def move_vpot_raw(self, forward, vpot_id, vpot_movement):
+        forward(self._to_host[vpot_id], vpot_movement)
+
+    # --- messages to hardware controller ---
+    def fader_moved(self, forward, fader_id, fader_position):
+        forward(self._to_hardware[fader_id], fader_position)
+
+    def set_meter(self, forward, meter_id, meter_level, peak_level, overload):
+        forward(self._to_hardware[meter_id], meter_level, peak_level, overload)
+
+    def set_vpot_led_ring(self, forward, vpot_id, vpot_center_led, vpot_mode, vpot_position):
+        forward(self._to_hardware[vpot_id], vpot_center_led, vpot_mode, vpot_position)
+
+
+class FaderCurve(MiddlewareStage):
+    __module__ = __name__
+    __doc__ = 'Applies a value curve to fader positions'
+
+    def __init__(self, exponent):
+        """
+        exponent: faders send (position ** exponent) to the host, and
+                  positions sent by the host are mapped back; values
+                  above 1.0 give finer control at low fader positions
+        """
+        assert exponent > 0.0
+
+        # look-up tables, so that curves cost no more than an index
+        self._to_host = self._create_table(16383, exponent)
+        self._to_host_7bit = self._create_table(127, exponent)
+        # hardware controllers receive fader positions with 10 bits
+        self._to_hardware = self._create_table(1023, 1.0 / exponent)
+
+    @staticmethod
+    def _create_table(maximum_value, exponent):
+        return [int(round(maximum_value * (value / maximum_value) ** exponent))
+                for value in range(maximum_value + 1)]
+
+    def move_fader(self, forward, fader_id, fader_value):
+        forward(fader_id, self._to_host[fader_value])
+
+    def move_fader_7bit(self, forward, fader_id, fader_value):
+        forward(fader_id, self._to_host_7bit[fader_value])
+
+    def fader_moved(self, forward, fader_id, fader_position):
+        forward(fader_id, self._to_hardware[fader_position])
+
+
+class MessageTap(MiddlewareStage):
+    __module__ = __name__
+    __doc__ = 'Reports messages passing the pipeline without changing them'
+
+    def __init__(self, callback, message_names=None):
+        """
+        callback: called with message name and arguments of every
+                  message
+
+        message_names: names of messages to report (default: all)
+        """
+        if message_names is None:
+            message_names = MiddlewarePipeline.MESSAGES_TO_HOST + MiddlewarePipeline.MESSAGES_TO_HARDWARE
+
+        self._callback = callback
+        self._message_names = frozenset(message_names)
+
+    def get_handler(self, message_name):
+        if message_name not in self._message_names:
+            return None
+
+        return functools.partial(self._tap, message_name)
+
+    def _tap(self, message_name, forward, *args):
+        self._callback(message_name, *args)
+        forward(*args)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import time
+from collections import deque
+
+from PythonMcu.Midi.MidiTransport import MidiTransport
+from PythonMcu.Midi.RunningStatus import RunningStatusDecoder
+
+
+class LoopbackMidiTransport(MidiTransport):
+    __module__ = __name__
+    __doc__ = 'In-process MIDI transport: everything written to one end of a pair is read from the other'
+
+    HAS_INPUT_CALLBACK = True
+    HAS_RAW_OUTPUT = True
+    ERRORS = (IOError,)
+    IS_THREAD_SAFE = True
+
+    def __init__(self, port_name):
+        self._port_name = port_name
+        self._peer = None
+
+        # set to False to emulate an unplugged device
+        self._is_available = True
+
+        self._input_open = False
+        self._output_open = False
+
+        self._input_callback = None
+        self._input_queue = deque()
+
+        # emulates a serial link for "write_raw()"
+        self._raw_decoder = RunningStatusDecoder()
+        self._bytes_written = 0
+
+        # time it takes to send a byte (see "set_baud_rate()")
+        self._byte_time = 0.0
+
+    @staticmethod
+    def create_pair(port_name_1='Loopback 1', port_name_2='Loopback 2'):
+        """
+        return two connected transports, e.g. one for the emulated
+        host and one for "MackieHostControl"
+        """
+        transport_1 = LoopbackMidiTransport(port_name_1)
+        transport_2 = LoopbackMidiTransport(port_name_2)
+
+        transport_1._peer = transport_2
+        transport_2._peer = transport_1
+
+        return transport_1, transport_2
+
+    def get_peer(self):
+        return self._peer
+
+    def set_available(self, is_available):
+        """
+        emulate unplugging (False) and re-connecting (True) the device
+        """
+        self._is_available = is_available
+
+    def _check_available(self):
+        if not self._is_available:
+            raise IOError('Loopback port "%s" is not available.' % self._port_name)
+
+    def set_baud_rate(self, baud_rate):
+        """
+        make writes take as long as on a serial link (e.g. 31250 baud
+        for 5-pin DIN MIDI); pass 0 to write at full speed
+        """
+        # every byte is sent with a start and a stop bit
+        self._byte_time = 10.0 / baud_rate if baud_rate else 0.0
+
+    def _transmit(self, number_of_bytes):
+        self._bytes_written += number_of_bytes
+
+        if self._byte_time:
+            time.sleep(number_of_bytes * self._byte_time)
+
+    def get_bytes_written(self):
+        """
+        return number of bytes written so far (as they would be sent
+        over a serial MIDI link)
+        """
+        return self._bytes_written
+
+    # --- device enumeration ---
+    def get_input_names(self):
+        return [self._port_name]
+
+    def get_output_names(self):
+        return [self._port_name]
+
+    def get_default_input_name(self):
+        return self._port_name
+
+    def get_default_output_name(self):
+        return self._port_name
+
+    def rescan_devices(self):
+        pass
+
+    def has_input(self, device_name):
+        return self._is_available
+
+    def has_output(self, device_name):
+        return self._is_available
+
+    # --- ports ---
+    def open_input(self, device_name):
+        # a loopback transport has exactly one port, so any device
+        # name will do
+        self._input_open = self._is_available
+        return self._input_open
+
+    def open_output(self, device_name):
+        self._output_open = self._is_available
+        return self._output_open
+
+    def close_input(self):
+        self._input_open = False
+        self._input_callback = None
+        self._input_queue.clear()
+
+    def close_output(self):
+        self._output_open = False
+
+    # --- MIDI input ---
+    def set_input_callback(self, callback):
+        self._input_callback = callback
+
+    def poll(self):
+        self._check_available()
+        return bool(self._input_queue)
+
+    def read(self, max_events):
+        events = []
+
+        while self._input_queue and len(events) < max_events:
+            events.append(self._input_queue.popleft())
+
+        return events
+
+    def _receive(self, data):
+        # data sent to an unplugged device is lost
+        if not self._input_open or not self._is_available:
+            return
+
+        event = (data, time.perf_counter())
+
+        # deliver synchronously, so that benchmarks run at full speed
+        if self._input_callback:
+            self._input_callback(event)
+        else:
+            self._input_queue.append(event)
+
+    # --- MIDI output ---
+    def write_short(self, status, data_1=0, data_2=0):
+        self._check_available()
+        message = [status, data_1, data_2]
+
+        # program change and channel pressure have one data byte
+        if 0xC0 <= status < 0xE0:
+            del message[2:]
+
+        self._transmit(len(message))
+
+        if self._output_open and self._peer:
+            self._peer._receive(message)
+
+    def write_sys_ex(self, message):
+        self._check_available()
+        self._transmit(len(message))
+
+        if self._output_open and self._peer:
+            self._peer._receive(list(message))
+
+    def write_raw(self, data):
+        self._check_available()
+        self._transmit(len(data))
+
+        for message in self._raw_decoder.decode(data):
+            if self._output_open and self._peer:
+                self._peer._receive(message)
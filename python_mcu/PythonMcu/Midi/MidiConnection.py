@@ -24,9 +24,18 @@ Thank you for using free software!
 
 """
 
-import pygame.midi
+from collections import namedtuple
 
-pygame.midi.init()
+from PythonMcu.Midi.MidiIoThreads import MidiIoThreads
+from PythonMcu.Midi.MidiLatencyMonitor import MidiLatencyMonitor
+from PythonMcu.Midi.MidiReconnectSupervisor import MidiReconnectSupervisor
+from PythonMcu.Midi.RingBuffer import RingBuffer
+from PythonMcu.Midi.RunningStatus import RunningStatusEncoder
+from PythonMcu.Midi.SysExAssembler import SysExAssembler
+
+# decoded MIDI short message; "data_2" is zero for messages with a
+# single data byte (program change and channel pressure)
+ShortMessage = namedtuple('ShortMessage', ['status_byte', 'data_1', 'data_2'])
 
 
 class MidiConnection:
@@ -42,19 +51,137 @@ class MidiConnection:
     PITCH_WHEEL_CHANGE = 0xE0
     SYSTEM_MESSAGE = 0xF0
 
+    # status -> number of data bytes (system real-time messages have
+    # none, SysEx messages are handled separately)
+    _DATA_BYTES = {
+        NOTE_OFF_EVENT: 2,
+        NOTE_ON_EVENT: 2,
+        POLYPHONIC_KEY_PRESSURE: 2,
+        CONTROL_CHANGE: 2,
+        PROGRAM_CHANGE: 1,
+        CHANNEL_PRESSURE: 1,
+        PITCH_WHEEL_CHANGE: 2,
+        0xF1: 1,
+        0xF2: 2,
+        0xF3: 1,
+    }
+
+    # MIDI input is either polled by the application (PortMidi) or
+    # pushed by a reader thread as soon as it arrives (RtMidi); with
+    # I/O threads, the ports of every connection are polled and
+    # written by background threads (PortMidi), so that slow MIDI
+    # output never delays any MIDI input
+    INPUT_MODE_POLLING = 'Polling'
+    INPUT_MODE_CALLBACK = 'Callback'
+    INPUT_MODE_IO_THREADS = 'I/O threads'
+
+    # MIDI output is either sent as separate messages or, on serial
+    # links, as a byte stream using running status (which saves up to
+    # a third of the bytes for bursts of similar messages)
+    OUTPUT_MODE_MESSAGES = 'Messages'
+    OUTPUT_MODE_RUNNING_STATUS = 'Running status'
+
+    # MIDI library used for the ports; by default, it follows from the
+    # input mode (see "create_transport()"), whereas serial links
+    # (e.g. 5-pin DIN) are driven directly using pyserial
+    TRANSPORT_DEFAULT = ''
+    TRANSPORT_SERIAL = 'Serial'
+
+    # maximum number of events queued by the RtMidi reader thread (or
+    # the input thread)
+    INPUT_QUEUE_SIZE = 4096
+
+    # number of events fetched from PortMidi with a single "read()"
+    # call
+    READ_BATCH_SIZE = 64
+
+    # maximum number of events processed per call of
+    # "process_input_buffer()", so that a burst of MIDI data from the
+    # host cannot starve the GUI timer
+    MAX_EVENTS_PER_TICK = 256
+
+    # short messages sent between "begin_output_batch()" and
+    # "flush_output()" are passed to the transport in one go
+    OUTPUT_QUEUE_SIZE = 1024
+
     # --- initialisation ---
 
-    def __init__(self, callback_log, callback):
+    def __init__(self, callback_log, callback, read_batch_size=READ_BATCH_SIZE,
+                 max_events_per_tick=MAX_EVENTS_PER_TICK, max_sysex_size=SysExAssembler.MAX_SYSEX_SIZE,
+                 input_mode=INPUT_MODE_POLLING, input_queue_size=INPUT_QUEUE_SIZE, transport=None,
+                 output_mode=None, reconnect=True):
         self._callback_log = callback_log
         self._callback = callback
 
+        # transport: instance of "MidiTransport"; by default, PortMidi
+        # is used for polling and RtMidi for callback-driven input
+        # (created on connecting)
+        self._transport = transport
+
+        self._input_mode = input_mode
+        self._dropped_events = 0
+
+        # called from the RtMidi reader thread (or the input thread)
+        # whenever new MIDI input is waiting to be processed
+        self._wakeup_callback = None
+        self._wakeup_pending = False
+
+        self._read_batch_size = read_batch_size
+        self._max_events_per_tick = max_events_per_tick
+
+        # events that have been read from PortMidi (or queued by the
+        # RtMidi reader thread or the input thread), but not yet
+        # processed; the processing thread is its only consumer
+        self._input_backlog = RingBuffer(input_queue_size)
+
+        # read and write the MIDI ports in "INPUT_MODE_IO_THREADS"
+        self._io_threads = None
+
+        # keeps partially received MIDI SysEx messages across calls
+        # of "process_input_buffer()"
+        self._sysex_assembler = SysExAssembler(callback_log, max_sysex_size)
+
+        # system real-time messages that were interleaved with SysEx
+        # data, each stored as (status, message)
+        self._interleaved_messages = []
+
+        # short messages waiting to be written by "flush_output()",
+        # each stored as ((status, data_1, data_2), causing event)
+        self._output_batching = False
+        self._output_queue = []
+
+        # output_mode: by default, running status is only used for
+        # transports of serial links (set on connecting)
+        self._output_mode = output_mode
+        self._running_status_encoder = RunningStatusEncoder()
+        self._use_running_status = False
+
+        # MIDI input received on one connection usually results in
+        # MIDI output on another one, so connections should share
+        # their monitor (see "set_latency_monitor()")
+        self._latency_monitor = MidiLatencyMonitor()
+
         self._midi_input_name = None
         self._midi_output_name = None
 
+        # both point to the transport once the respective port has
+        # been opened
         self._midi_input = None
         self._midi_output = None
 
+        # reconnect: re-open MIDI ports that have failed or vanished
+        # (watched from a background thread)
+        self._reconnect_supervisor = None
+        if reconnect:
+            self._reconnect_supervisor = MidiReconnectSupervisor(self._probe_ports, self._wakeup)
+
+        self._is_lost = False
+        self._reconnect_callback = None
+
     def connect(self, midi_input_name=None, midi_output_name=None):
+        if self._transport is None:
+            self._transport = self.create_transport(self._input_mode)
+
         self._midi_input_name = midi_input_name
         if self._midi_input_name:
             self._midi_input = self._init_input(self._midi_input_name)
@@ -63,198 +190,620 @@ class MidiConnection:
         if self._midi_output_name:
             self._midi_output = self._init_output(self._midi_output_name)
 
+        self._start_io_threads()
+
+        self._is_lost = False
+        if self._reconnect_supervisor:
+            self._reconnect_supervisor.start()
+
     def disconnect(self):
+        if self._reconnect_supervisor:
+            self._reconnect_supervisor.stop()
+        self._is_lost = False
+
+        # MIDI output handed over to the I/O threads is still written
+        self._stop_io_threads()
+
+        self._input_backlog.clear()
+        self._sysex_assembler.reset()
+        self._interleaved_messages = []
+
+        self._output_batching = False
+        self._output_queue = []
+
         if self._midi_input:
             self._log('Closing MIDI input "%s"...' % self._midi_input_name)
-            self._midi_input.close()
+            self._transport.close_input()
+            self._midi_input = None
 
         if self._midi_output:
             self._log('Closing MIDI output "%s"...' % self._midi_output_name)
-            self._midi_output.close()
+            self._transport.close_output()
+            self._midi_output = None
+
+    def set_input_mode(self, input_mode):
+        """
+        change input mode (see "INPUT_MODE_POLLING"); call before
+        "connect()"
+        """
+        self._input_mode = input_mode
+
+    def set_latency_monitor(self, latency_monitor):
+        """
+        trace MIDI output back to MIDI input using "latency_monitor"
+        (an instance of "MidiLatencyMonitor")
+        """
+        self._latency_monitor = latency_monitor
+
+    def get_latency_monitor(self):
+        return self._latency_monitor
+
+    def set_reconnect_callback(self, callback):
+        """
+        "callback" is called (without arguments) on the processing
+        thread after lost MIDI ports have been re-opened, e.g. to
+        repeat a handshake or restore the state of a controller
+        """
+        self._reconnect_callback = callback
+
+    def is_lost(self):
+        return self._is_lost
+
+    # --- reconnection ---
+    def _probe_ports(self):
+        # runs in the supervisor thread; the cached device index does
+        # not notice devices being connected or removed, so enumerate
+        # them again
+        self._transport.rescan_devices()
+
+        if self._midi_input_name and not self._transport.has_input(self._midi_input_name):
+            return False
+
+        if self._midi_output_name and not self._transport.has_output(self._midi_output_name):
+            return False
+
+        return True
+
+    def _connection_lost(self, reason):
+        if self._is_lost:
+            return
+
+        self._log(reason)
+
+        # without a supervisor, there's no way back
+        if not self._reconnect_supervisor:
+            self._log('Please restart the MCU emulation.')
+        else:
+            self._log('Trying to reconnect...')
+
+        self._is_lost = True
+        self._close_lost_ports()
+
+        # the device index is out of date as well (e.g. when a device
+        # has been unplugged), so enumerate devices on next use
+        self._transport.get_device_registry().notify_hotplug()
+
+        if self._reconnect_supervisor:
+            self._reconnect_supervisor.report_lost()
+
+    def _close_lost_ports(self):
+        self._stop_io_threads()
+
+        self._input_backlog.clear()
+        self._sysex_assembler.reset()
+        self._interleaved_messages = []
+        self._output_queue = []
+
+        # the ports are gone anyway, so ignore any errors
+        for close_port in (self._transport.close_input, self._transport.close_output):
+            try:
+                close_port()
+            except self._transport.ERRORS:
+                pass
+
+        self._midi_input = None
+        self._midi_output = None
+
+    def _update_connection_state(self):
+        # runs in the processing thread after the supervisor has
+        # asked for attention
+        supervisor = self._reconnect_supervisor
+        supervisor.attention_required = False
+
+        if not self._is_lost:
+            if supervisor.ports_missing():
+                self._connection_lost('MIDI port has vanished.')
+            return
+
+        if not supervisor.ports_available():
+            return
+
+        if self._midi_input_name:
+            self._midi_input = self._init_input(self._midi_input_name)
+
+        if self._midi_output_name:
+            self._midi_output = self._init_output(self._midi_output_name)
+
+        if (self._midi_input_name and not self._midi_input) or (self._midi_output_name and not self._midi_output):
+            # ports have vanished again, so keep on trying
+            self._close_lost_ports()
+            supervisor.report_lost()
+            return
+
+        self._start_io_threads()
+
+        self._is_lost = False
+        supervisor.report_reconnected()
+        self._log('Reconnected.')
+
+        if self._reconnect_callback:
+            self._reconnect_callback()
 
     def _log(self, message):
         self._callback_log('[MIDI Connection      ]  ' + message, True)
 
+    # --- I/O threads ---
+    def _start_io_threads(self):
+        if self._input_mode != self.INPUT_MODE_IO_THREADS:
+            return
+
+        if not (self._midi_input or self._midi_output):
+            return
+
+        if not self._io_threads:
+            self._io_threads = MidiIoThreads(
+                self._transport, self._input_backlog, self._on_io_thread_input, self._read_batch_size)
+
+        self._io_threads.start(
+            self._midi_input is not None, self._midi_output is not None,
+            self._midi_input_name or self._midi_output_name)
+
+        # all MIDI output is handed over to the output thread
+        if self._midi_output:
+            self._midi_output = self._io_threads
+
+    def _stop_io_threads(self):
+        if not (self._io_threads and self._io_threads.is_running()):
+            return
+
+        self._io_threads.stop()
+
+        if self._midi_output:
+            self._midi_output = self._transport
+
+    def _on_io_thread_input(self, dropped_events):
+        # runs in the input thread (or the output thread, after an
+        # error)
+        if dropped_events:
+            self._dropped_events += dropped_events
+
+        self._wakeup()
+
+    def _check_io_threads(self):
+        if self._io_threads and self._io_threads.error:
+            self._connection_lost('MIDI I/O on "%s" failed: %s' % (
+                self._midi_input_name or self._midi_output_name, self._io_threads.error))
+
     def _init_input(self, device_name):
         if device_name is None:
             return None
 
-        for device_id in range(pygame.midi.get_count()):
-            device = pygame.midi.get_device_info(device_id)
+        if not self._transport.open_input(device_name):
+            self._log('MIDI In \'%s\' not found.\n' % device_name)
+            return None
+
+        self._log('Opening MIDI input "%s"...' % device_name)
 
-            # noinspection PyUnresolvedReferences
-            if device[1].decode('utf-8') == device_name and (device[2] == 1):
-                self._log('Opening MIDI input "%s"...' % device_name)
-                return pygame.midi.Input(device_id)
+        if self._input_mode == self.INPUT_MODE_CALLBACK:
+            if self._transport.HAS_INPUT_CALLBACK:
+                self._transport.set_input_callback(self._on_midi_input)
+            else:
+                # the application does not poll in callback mode, so
+                # poll the MIDI input on an I/O thread instead
+                self._log('MIDI transport cannot push MIDI input, using I/O threads instead.')
+                self._input_mode = self.INPUT_MODE_IO_THREADS
 
-        self._log('MIDI In \'%s\' not found.\n' % device_name)
-        return None
+        return self._transport
 
     def _init_output(self, device_name):
         if device_name is None:
             return None
 
-        for device_id in range(pygame.midi.get_count()):
-            device = pygame.midi.get_device_info(device_id)
+        if not self._transport.open_output(device_name):
+            self._log('MIDI Out \'%s\' not found.\n' % device_name)
+            return None
+
+        self._log('Opening MIDI output "%s"...' % device_name)
 
-            # noinspection PyUnresolvedReferences
-            if device[1].decode('utf-8') == device_name and (device[3] == 1):
-                self._log('Opening MIDI output "%s"...' % device_name)
-                return pygame.midi.Output(device_id, latency=0)
+        output_mode = self._output_mode
+        if output_mode is None:
+            if self._transport.IS_BYTE_STREAM:
+                output_mode = self.OUTPUT_MODE_RUNNING_STATUS
+            else:
+                output_mode = self.OUTPUT_MODE_MESSAGES
 
-        self._log('MIDI Out \'%s\' not found.\n' % device_name)
-        return None
+        self._use_running_status = False
+        if output_mode == self.OUTPUT_MODE_RUNNING_STATUS:
+            if self._transport.HAS_RAW_OUTPUT:
+                self._use_running_status = True
+            else:
+                self._log('MIDI transport cannot write raw MIDI data, running status disabled.')
+
+        # the receiver does not know about any running status yet
+        self._running_status_encoder.reset()
+
+        return self._transport
 
     # --- static methods ---
     @staticmethod
-    def get_midi_inputs():
-        midi_inputs = []
+    def create_transport(input_mode=INPUT_MODE_POLLING, transport_type=TRANSPORT_DEFAULT):
+        # import transports on demand, so that only the MIDI library
+        # that is actually used needs to be installed (the loopback
+        # transport does not need any)
+        if transport_type == MidiConnection.TRANSPORT_SERIAL:
+            from PythonMcu.Midi.SerialMidiTransport import SerialMidiTransport
+            return SerialMidiTransport()
 
-        for dev_id in range(pygame.midi.get_count()):
-            device = pygame.midi.get_device_info(dev_id)
-            print(device)
-            if device[2] == 1:
-                # noinspection PyUnresolvedReferences
-                midi_inputs.append(device[1].decode('utf8'))
+        if input_mode == MidiConnection.INPUT_MODE_CALLBACK:
+            from PythonMcu.Midi.RtMidiTransport import RtMidiTransport
+            return RtMidiTransport()
 
-        return midi_inputs
+        from PythonMcu.Midi.PygameMidiTransport import PygameMidiTransport
+        return PygameMidiTransport()
 
     @staticmethod
-    def get_midi_outputs():
-        midi_outputs = []
-
-        for dev_id in range(pygame.midi.get_count()):
-            device = pygame.midi.get_device_info(dev_id)
-            if device[3] == 1:
-                # noinspection PyUnresolvedReferences
-                midi_outputs.append(device[1].decode('utf8'))
+    def set_recorder(recorder):
+        """
+        record MIDI traffic of all connections with "recorder" (an
+        instance of "MidiRecorder"); pass None to stop recording
+        """
+        global _recorder
+        _recorder = recorder
 
-        return midi_outputs
+    @staticmethod
+    def get_recorder():
+        return _recorder
 
     @staticmethod
-    def get_default_midi_input():
-        device_id = pygame.midi.get_default_input_id()
+    def _get_message_bytes(message):
+        # SysEx messages are already stored as "bytes"
+        if not isinstance(message, tuple):
+            return message
 
-        if device_id < 0:
-            return None
+        # strip unused data bytes
+        data_bytes = _STATUS_TABLE[message[0]][1]
+        return bytes(message[:data_bytes + 1])
 
-        device = pygame.midi.get_device_info(device_id)
-        return device[1]
+    @staticmethod
+    def rescan_midi_devices(input_mode=INPUT_MODE_POLLING, transport_type=TRANSPORT_DEFAULT):
+        """
+        enumerate MIDI devices again (device names are cached until
+        then)
+        """
+        MidiConnection.create_transport(input_mode, transport_type).get_device_registry().rescan()
 
     @staticmethod
-    def get_default_midi_output():
-        device_id = pygame.midi.get_default_output_id()
+    def get_midi_inputs(input_mode=INPUT_MODE_POLLING, transport_type=TRANSPORT_DEFAULT):
+        return MidiConnection.create_transport(input_mode, transport_type).get_input_names()
 
-        if device_id < 0:
-            return None
+    @staticmethod
+    def get_midi_outputs(input_mode=INPUT_MODE_POLLING, transport_type=TRANSPORT_DEFAULT):
+        return MidiConnection.create_transport(input_mode, transport_type).get_output_names()
 
-        device = pygame.midi.get_device_info(device_id)
-        return device[1]
+    @staticmethod
+    def get_default_midi_input(input_mode=INPUT_MODE_POLLING, transport_type=TRANSPORT_DEFAULT):
+        return MidiConnection.create_transport(input_mode, transport_type).get_default_input_name()
+
+    @staticmethod
+    def get_default_midi_output(input_mode=INPUT_MODE_POLLING, transport_type=TRANSPORT_DEFAULT):
+        return MidiConnection.create_transport(input_mode, transport_type).get_default_output_name()
 
     # --- MIDI processing ---
+    def set_wakeup_callback(self, callback):
+        self._wakeup_callback = callback
+
     def buffer_is_empty(self):
+        if self._input_backlog:
+            return False
+
+        if self._input_mode != self.INPUT_MODE_POLLING:
+            return True
+
         return not self._midi_input.poll()
 
-    def process_input_buffer(self, use_callback=True):
-        if not self._midi_output:
-            self._log('MIDI output not connected.')
+    def get_backlog_size(self):
+        return len(self._input_backlog)
+
+    def get_dropped_events(self):
+        return self._dropped_events
+
+    def _on_midi_input(self, event, _data=None):
+        # runs in the RtMidi reader thread; the backlog is a
+        # single-producer/single-consumer queue, so no locking is
+        # needed
+        if not self._input_backlog.append(event):
+            self._dropped_events += 1
             return
 
-        while self._midi_input.poll():
-            (status, message) = self._receive_message()
+        self._wakeup()
+
+    def _wakeup(self):
+        # only notify once until the backlog is processed, so that a
+        # burst of MIDI data does not flood the application's event
+        # queue
+        if self._wakeup_callback and not self._wakeup_pending:
+            self._wakeup_pending = True
+            self._wakeup_callback()
+
+    def _fill_backlog(self):
+        if self._input_mode != self.INPUT_MODE_POLLING:
+            return False
+
+        if not self._midi_input:
+            return False
+
+        # fetch up to "read_batch_size" events with a single PortMidi
+        # call instead of polling for every single event
+        try:
+            if not self._midi_input.poll():
+                return False
+
+            self._input_backlog.extend(self._midi_input.read(self._read_batch_size))
+        except self._transport.ERRORS as error:
+            self._connection_lost('Reading from MIDI input "%s" failed: %s' % (self._midi_input_name, error))
+            return False
+
+        return True
+
+    def process_input_buffer(self, use_callback=True, max_events=None):
+        """
+        process pending MIDI input and return the number of events
+        that are left in the backlog
+
+        max_events: maximum number of events to process (defaults to
+                    "max_events_per_tick")
+        """
+        self._check_io_threads()
+
+        if self._reconnect_supervisor and self._reconnect_supervisor.attention_required:
+            self._update_connection_state()
+
+        if not self._check_output():
+            return 0
+
+        if max_events is None:
+            max_events = self._max_events_per_tick
+
+        # clear before processing, so that any event queued from now
+        # on triggers another wakeup
+        self._wakeup_pending = False
+
+        processed_events = 0
+        while processed_events < max_events:
+            if not self._input_backlog and not self._fill_backlog():
+                break
+
+            event = self._input_backlog.popleft()
+            (status, message) = self._receive_message(event[0])
+            processed_events += 1
+
+            # system real-time messages interleaved with SysEx data
+            # were received before the rest of this event
+            if self._interleaved_messages:
+                interleaved_messages = self._interleaved_messages
+                self._interleaved_messages = []
+
+                if use_callback:
+                    for (interleaved_status, interleaved_message) in interleaved_messages:
+                        self._deliver_message(interleaved_status, interleaved_message, event[1])
+
+            # incomplete MIDI SysEx messages are finished on one of
+            # the next calls (stray data bytes are dropped)
+            if status is None:
+                continue
 
             if use_callback:
-                self._callback(status, message)
-
-    def _receive_message(self):
-        message = self._midi_input.read(1)[0][0]
-        status_byte = message[0] & 0xF0
-
-        if message[0] == 0xF0:
-            while 0xF7 not in message:
-                message.extend(self._midi_input.read(1)[0][0])
-            while message[-1] != 0xF7:
-                del message[-1]
-
-        status = None
-        if status_byte == self.NOTE_OFF_EVENT:
-            status = self.NOTE_OFF_EVENT
-            del message[3]
-        elif status_byte == self.NOTE_ON_EVENT:
-            status = self.NOTE_ON_EVENT
-            del message[3]
-        elif status_byte == self.POLYPHONIC_KEY_PRESSURE:
-            status = self.POLYPHONIC_KEY_PRESSURE
-            del message[3]
-        elif status_byte == self.CONTROL_CHANGE:
-            status = self.CONTROL_CHANGE
-            del message[3]
-        elif status_byte == self.PROGRAM_CHANGE:
-            status = self.PROGRAM_CHANGE
-            del message[2:3]
-        elif status_byte == self.CHANNEL_PRESSURE:
-            status = self.CHANNEL_PRESSURE
-            del message[2:3]
-        elif status_byte == self.PITCH_WHEEL_CHANGE:
-            status = self.PITCH_WHEEL_CHANGE
-            del message[3]
-        elif status_byte == self.SYSTEM_MESSAGE:
-            status = self.SYSTEM_MESSAGE
-
-        return status, message
+                self._deliver_message(status, message, event[1])
+
+        # event budget exhausted: make sure that the remaining events
+        # are processed on the next iteration of the event loop
+        if self._input_backlog:
+            self._wakeup()
+
+        return len(self._input_backlog)
+
+    def _deliver_message(self, status, message, timestamp):
+        if _recorder:
+            _recorder.record(self._midi_input_name, False, self._get_message_bytes(message), timestamp)
+
+        # all MIDI output sent by the callback is traced back to this
+        # event
+        self._latency_monitor.begin_event(self._midi_input_name, timestamp)
+        try:
+            self._callback(status, message)
+        finally:
+            self._latency_monitor.end_event()
+
+    def _receive_message(self, data):
+        status_byte = data[0]
+
+        # system real-time messages may be interleaved with SysEx data
+        if status_byte == 0xF0 or (self._sysex_assembler.is_active() and status_byte < 0xF8):
+            message = self._sysex_assembler.feed(data)
+
+            for realtime_byte in self._sysex_assembler.pop_realtime_bytes():
+                self._interleaved_messages.append(
+                    (self.SYSTEM_MESSAGE, ShortMessage(realtime_byte, 0, 0)))
+
+            if message is None:
+                return None, None
+            elif message is not SysExAssembler.ABORTED:
+                return self.SYSTEM_MESSAGE, message
+            elif status_byte == 0xF0:
+                # SysEx message aborted within its first event
+                return None, None
+
+            # PortMidi and RtMidi start a new event with the status
+            # byte that has aborted the SysEx message, so decode this
+            # event as usual
+
+        # PortMidi pads all messages to four bytes, whereas RtMidi
+        # passes them unpadded
+        (status, data_bytes) = _STATUS_TABLE[status_byte]
+
+        if data_bytes == 2:
+            return status, ShortMessage(status_byte, data[1], data[2])
+        elif data_bytes == 1:
+            return status, ShortMessage(status_byte, data[1], 0)
+        elif status is None:
+            # stray data byte
+            return None, None
+
+        # system real-time message
+        return status, ShortMessage(status_byte, 0, 0)
+
+    # --- output coalescing ---
+    def begin_output_batch(self):
+        """
+        queue all short messages until "flush_output()" is called,
+        e.g. while processing one tick of MIDI input
+        """
+        self._output_batching = True
+
+    def flush_output(self):
+        """
+        write all queued short messages and stop queueing
+        """
+        self._output_batching = False
+        self._write_output_queue()
+
+    def _write_output_queue(self):
+        if not self._output_queue:
+            return
 
-    def send(self, status, data_1, data_2):
-        if not self._midi_output:
-            self._log('MIDI output not connected.')
+        output_queue = self._output_queue
+        self._output_queue = []
+
+        if not self._check_output():
             return
 
-        self._midi_output.write_short(status, data_1, data_2)
+        output_queue = self._coalesce(output_queue)
+        messages = [message for (message, _) in output_queue]
 
-    def send_note_on(self, key, velocity):
-        if not self._midi_output:
-            self._log('MIDI output not connected.')
+        try:
+            if self._use_running_status:
+                self._midi_output.write_raw(self._running_status_encoder.encode(messages))
+            else:
+                self._midi_output.write(messages)
+        except self._transport.ERRORS as error:
+            self._output_failed(error)
             return
 
-        #        self._log('%02X %02X %02X' % (self.NOTE_ON_EVENT, key, velocity))
-        self._midi_output.write_short(self.NOTE_ON_EVENT, key, velocity)
+        if _recorder:
+            for message in messages:
+                _recorder.record(self._midi_output_name, True, self._get_message_bytes(message))
 
-    def send_note_off(self, key, velocity):
-        if not self._midi_output:
+        for (_, event) in output_queue:
+            if event:
+                self._latency_monitor.record_output(event, self._midi_output_name)
+
+    def _coalesce(self, output_queue):
+        # a pitch wheel message sets an absolute (fader) position, so
+        # it supersedes all earlier ones on the same MIDI channel;
+        # everything else (key presses, relative V-Pot movements,
+        # ...) has to be sent as is
+        pitch_wheel_statuses = set()
+        coalesced = []
+
+        for entry in reversed(output_queue):
+            status = entry[0][0]
+
+            if (status & 0xF0) == self.PITCH_WHEEL_CHANGE:
+                if status in pitch_wheel_statuses:
+                    continue
+                pitch_wheel_statuses.add(status)
+
+            coalesced.append(entry)
+
+        coalesced.reverse()
+        return coalesced
+
+    # --- MIDI output ---
+    def _check_output(self):
+        if self._midi_output:
+            return True
+
+        # no need to complain about every single message while lost
+        # ports are being re-opened
+        if not self._is_lost:
             self._log('MIDI output not connected.')
+
+        return False
+
+    def _output_failed(self, error):
+        self._connection_lost('Writing to MIDI output "%s" failed: %s' % (self._midi_output_name, error))
+
+    def _write_short(self, status, data_1, data_2):
+        event = self._latency_monitor.get_current_event()
+
+        if self._output_batching:
+            self._output_queue.append(((status, data_1, data_2), event))
+
+            # keep memory (and latency) bounded during long batches
+            if len(self._output_queue) >= self.OUTPUT_QUEUE_SIZE:
+                self._write_output_queue()
             return
 
-        #        self._log('%02X %02X %02X' % (self.NOTE_OFF_EVENT, key, velocity))
-        self._midi_output.write_short(self.NOTE_OFF_EVENT, key, velocity)
+        if not self._check_output():
+            return
 
-    def send_control_change(self, channel, cc_number, cc_value):
-        if not self._midi_output:
-            self._log('MIDI output not connected.')
+        try:
+            if self._use_running_status:
+                buffer = bytearray()
+                self._running_status_encoder.encode_short(buffer, status, data_1, data_2)
+                self._midi_output.write_raw(buffer)
+            else:
+                self._midi_output.write_short(status, data_1, data_2)
+        except self._transport.ERRORS as error:
+            self._output_failed(error)
             return
 
+        if _recorder:
+            _recorder.record(self._midi_output_name, True, self._get_message_bytes((status, data_1, data_2)))
+
+        if event:
+            self._latency_monitor.record_output(event, self._midi_output_name)
+
+    def send(self, status, data_1, data_2):
+        self._write_short(status, data_1, data_2)
+
+    def send_note_on(self, key, velocity):
+        #        self._log('%02X %02X %02X' % (self.NOTE_ON_EVENT, key, velocity))
+        self._write_short(self.NOTE_ON_EVENT, key, velocity)
+
+    def send_note_off(self, key, velocity):
+        #        self._log('%02X %02X %02X' % (self.NOTE_OFF_EVENT, key, velocity))
+        self._write_short(self.NOTE_OFF_EVENT, key, velocity)
+
+    def send_control_change(self, channel, cc_number, cc_value):
         #         self._log('%02X %02X %02X' % (self.CONTROL_CHANGE + channel, cc_number, cc_value))
-        self._midi_output.write_short(self.CONTROL_CHANGE + channel, cc_number, cc_value)
+        self._write_short(self.CONTROL_CHANGE + channel, cc_number, cc_value)
 
     def send_pitch_wheel_change(self, channel, pitch):
-        if not self._midi_output:
-            self._log('MIDI output not connected.')
-            return
-
         pitch_high = pitch >> 7
         pitch_low = pitch & 0x7F
         #         self._log('%02X %02X %02X' % (self.PITCH_WHEEL_CHANGE + channel, pitch_low, pitch_high))
-        self._midi_output.write_short(self.PITCH_WHEEL_CHANGE + channel, pitch_low, pitch_high)
+        self._write_short(self.PITCH_WHEEL_CHANGE + channel, pitch_low, pitch_high)
 
     def send_pitch_wheel_change_7bit(self, channel, pitch):
-        if not self._midi_output:
-            self._log('MIDI output not connected.')
-            return
-
         #         self._log('%02X %02X %02X' % (self.PITCH_WHEEL_CHANGE + channel, pitch, pitch))
-        self._midi_output.write_short(self.PITCH_WHEEL_CHANGE + channel, pitch, pitch)
+        self._write_short(self.PITCH_WHEEL_CHANGE + channel, pitch, pitch)
 
     def send_sysex(self, header, data):
-        if not self._midi_output:
-            self._log('MIDI output not connected.')
+        # keep the order of queued short messages and SysEx messages
+        self._write_output_queue()
+
+        if not self._check_output():
             return
 
         assert isinstance(header, list)
@@ -265,7 +814,44 @@ class MidiConnection:
         sysex.extend(data)
         sysex.append(0xF7)
 
-        self._midi_output.write_sys_ex(0, sysex)
+        try:
+            if self._use_running_status:
+                buffer = bytearray()
+                self._running_status_encoder.encode_sys_ex(buffer, sysex)
+                self._midi_output.write_raw(buffer)
+            else:
+                self._midi_output.write_sys_ex(sysex)
+        except self._transport.ERRORS as error:
+            self._output_failed(error)
+            return
+
+        if _recorder:
+            _recorder.record(self._midi_output_name, True, sysex)
+
+        event = self._latency_monitor.get_current_event()
+        if event:
+            self._latency_monitor.record_output(event, self._midi_output_name)
+
+
+def _create_status_table():
+    # status byte -> (status, number of data bytes); data bytes are no
+    # valid status and thus map to (None, 0)
+    status_table = [(None, 0)] * 0x80
+
+    for status_byte in range(0x80, 0xF0):
+        status = status_byte & 0xF0
+        status_table.append((status, MidiConnection._DATA_BYTES[status]))
+
+    for status_byte in range(0xF0, 0x100):
+        status_table.append((MidiConnection.SYSTEM_MESSAGE, MidiConnection._DATA_BYTES.get(status_byte, 0)))
+
+    return tuple(status_table)
+
+
+_STATUS_TABLE = _create_status_table()
+
+# shared by all connections (see "MidiConnection.set_recorder()")
+_recorder = None
 
 
 if __name__ == "__main__":
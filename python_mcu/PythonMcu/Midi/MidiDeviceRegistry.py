@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import threading
+
+
+class MidiDeviceRegistry:
+    __module__ = __name__
+    __doc__ = 'Cached index of MIDI input and output devices'
+
+    def __init__(self, callback_scan):
+        # "callback_scan" enumerates all devices and returns a tuple
+        # of (inputs, outputs, default input name, default output
+        # name); inputs and outputs are dictionaries that map device
+        # names to device IDs
+        self._callback_scan = callback_scan
+
+        self._inputs = {}
+        self._outputs = {}
+        self._default_input_name = None
+        self._default_output_name = None
+
+        # devices are enumerated on first use
+        self._is_stale = True
+
+        # reconnect supervisors rescan from their own threads
+        self._scan_lock = threading.Lock()
+
+    def rescan(self):
+        with self._scan_lock:
+            (self._inputs, self._outputs, self._default_input_name, self._default_output_name) = self._callback_scan()
+            self._is_stale = False
+
+    def notify_hotplug(self):
+        """
+        call when a MIDI device has been connected or removed; devices
+        are enumerated again on next use
+        """
+        self._is_stale = True
+
+    def _update(self):
+        if self._is_stale:
+            self.rescan()
+
+    # --- device names ---
+    def get_input_names(self):
+        self._update()
+        return list(self._inputs)
+
+    def get_output_names(self):
+        self._update()
+        return list(self._outputs)
+
+    def get_default_input_name(self):
+        self._update()
+        return self._default_input_name
+
+    def get_default_output_name(self):
+        self._update()
+        return self._default_output_name
+
+    # --- device IDs ---
+    def find_input(self, device_name):
+        self._update()
+        return self._inputs.get(device_name)
+
+    def find_output(self, device_name):
+        self._update()
+        return self._outputs.get(device_name)
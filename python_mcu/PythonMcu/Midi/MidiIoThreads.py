@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import threading
+
+from PythonMcu.Midi.RingBuffer import RingBuffer
+
+
+class MidiIoThreads:
+    __module__ = __name__
+    __doc__ = 'Reads and writes the MIDI ports of a connection in background threads'
+
+    # MIDI input is polled this often right after receiving data (in
+    # seconds); the interval is doubled for every poll that comes up
+    # empty, so that an idle connection does not keep the CPU busy
+    POLLING_INTERVAL = 0.001
+    MAXIMUM_POLLING_INTERVAL = 0.004
+
+    # maximum number of MIDI messages waiting to be written
+    OUTPUT_QUEUE_SIZE = 1024
+
+    def __init__(self, transport, input_buffer, callback_input, read_batch_size):
+        # "input_buffer" (a "RingBuffer") receives MIDI input as
+        # [data, timestamp]; "callback_input" is called from the input
+        # thread with the number of events that did not fit
+        self._transport = transport
+        self._input_buffer = input_buffer
+        self._callback_input = callback_input
+        self._read_batch_size = read_batch_size
+
+        # PortMidi must not be used by several threads at once, and
+        # the I/O threads of all connections share the library
+        self._io_lock = transport.get_io_lock()
+
+        # filled by the processing thread; MIDI input and output have
+        # separate threads, so that slow MIDI output (such as a long
+        # SysEx message on a serial link) neither stalls the
+        # processing thread nor delays MIDI input
+        self._output_buffer = RingBuffer(self.OUTPUT_QUEUE_SIZE)
+
+        # MIDI library error of an I/O thread, handed over to the
+        # processing thread
+        self.error = None
+
+        self._output_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    # --- processing thread ---
+    def start(self, has_input, has_output, name):
+        if self._threads:
+            return
+
+        self.error = None
+        self._stop_event.clear()
+
+        if has_input:
+            self._threads.append(threading.Thread(
+                target=self._run_input, name='MIDI input (%s)' % name, daemon=True))
+
+        if has_output:
+            self._threads.append(threading.Thread(
+                target=self._run_output, name='MIDI output (%s)' % name, daemon=True))
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """
+        stop I/O threads after writing all pending MIDI output
+        """
+        self._stop_event.set()
+        self._output_event.set()
+
+        for thread in self._threads:
+            thread.join()
+
+        self._threads = []
+        self._output_buffer.clear()
+
+    def is_running(self):
+        return bool(self._threads)
+
+    # these mirror the output methods of "MidiTransport", so that the
+    # output thread can stand in for the transport
+    def write_short(self, status, data_1=0, data_2=0):
+        self._queue_output(self._transport.write_short, (status, data_1, data_2))
+
+    def write(self, messages):
+        self._queue_output(self._transport.write, (messages,))
+
+    def write_sys_ex(self, message):
+        self._queue_output(self._transport.write_sys_ex, (message,))
+
+    def write_raw(self, data):
+        self._queue_output(self._transport.write_raw, (data,))
+
+    def _queue_output(self, write, arguments):
+        # wait for the output thread instead of dropping MIDI output
+        while not self._output_buffer.append((write, arguments)):
+            if self.error or self._stop_event.is_set():
+                return
+
+            self._output_event.set()
+            self._stop_event.wait(self.POLLING_INTERVAL)
+
+        self._output_event.set()
+
+    def _fail(self, error):
+        # the processing thread closes the ports and restarts the I/O
+        # threads once they have been re-opened
+        self.error = error
+        self._callback_input(0)
+
+    # --- input thread ---
+    def _run_input(self):
+        transport = self._transport
+        interval = self.POLLING_INTERVAL
+
+        while not self._stop_event.is_set():
+            try:
+                with self._io_lock:
+                    events = transport.read(self._read_batch_size) if transport.poll() else None
+            except transport.ERRORS as error:
+                self._fail(error)
+                return
+
+            if events:
+                self._callback_input(self._input_buffer.extend(events))
+                interval = self.POLLING_INTERVAL
+                continue
+
+            self._stop_event.wait(interval)
+            interval = min(interval * 2.0, self.MAXIMUM_POLLING_INTERVAL)
+
+    # --- output thread ---
+    def _run_output(self):
+        output_buffer = self._output_buffer
+
+        while True:
+            # clear before looking for work, so that no wakeup is lost
+            self._output_event.clear()
+
+            try:
+                while output_buffer:
+                    (write, arguments) = output_buffer.popleft()
+
+                    with self._io_lock:
+                        write(*arguments)
+            except self._transport.ERRORS as error:
+                self._fail(error)
+                return
+
+            if self._stop_event.is_set():
+                return
+
+            self._output_event.wait()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import time
+
+
+class MidiLatencyMonitor:
+    __module__ = __name__
+    __doc__ = 'Statistics on the latency between receiving MIDI input and sending the resulting MIDI output'
+
+    def __init__(self):
+        # (MIDI input name, receive timestamp) of the event that is
+        # currently being processed; timestamps are given in seconds
+        # of "time.perf_counter()"
+        self._current_event = None
+
+        # MIDI input name -> [count, total delay, maximum delay]
+        self._dispatch_statistics = {}
+
+        # (MIDI input name, MIDI output name) -> [count, total
+        # latency, maximum latency]
+        self._output_statistics = {}
+
+    def reset(self):
+        self._current_event = None
+        self._dispatch_statistics = {}
+        self._output_statistics = {}
+
+    @staticmethod
+    def _add(statistics, key, value):
+        entry = statistics.get(key)
+
+        if entry is None:
+            statistics[key] = [1, value, value]
+            return
+
+        entry[0] += 1
+        entry[1] += value
+        if value > entry[2]:
+            entry[2] = value
+
+    # --- event processing ---
+    def begin_event(self, input_name, timestamp):
+        """
+        call before an event is handed to the application; the time
+        spent in between (waiting in the backlog, e.g. for the Qt
+        timer) is recorded as dispatch delay
+        """
+        self._current_event = (input_name, timestamp)
+        self._add(self._dispatch_statistics, input_name, time.perf_counter() - timestamp)
+
+    def end_event(self):
+        self._current_event = None
+
+    def get_current_event(self):
+        """
+        return (MIDI input name, receive timestamp) of the event that
+        is being processed, or None
+        """
+        return self._current_event
+
+    def record_output(self, event, output_name, timestamp=None):
+        """
+        record latency of MIDI output caused by "event" (as returned
+        by "get_current_event()") and sent at "timestamp"
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        (input_name, receive_timestamp) = event
+        self._add(self._output_statistics, (input_name, output_name), timestamp - receive_timestamp)
+
+    # --- statistics ---
+    def get_dispatch_statistics(self):
+        """
+        return dictionary of MIDI input name -> (number of events,
+        mean delay, maximum delay); delays are given in seconds
+        """
+        return {key: (count, total / count, maximum)
+                for key, (count, total, maximum) in self._dispatch_statistics.items()}
+
+    def get_output_statistics(self):
+        """
+        return dictionary of (MIDI input name, MIDI output name) ->
+        (number of messages, mean latency, maximum latency); latencies
+        are given in seconds
+        """
+        return {key: (count, total / count, maximum)
+                for key, (count, total, maximum) in self._output_statistics.items()}
+
+    def get_report(self):
+        """
+        return statistics as list of human-readable lines
+        """
+        report = []
+
+        for (input_name, (count, mean, maximum)) in sorted(self.get_dispatch_statistics().items()):
+            report.append('%s: %d events, dispatched after %.2f ms on average (max. %.2f ms)' % (
+                input_name, count, mean * 1000.0, maximum * 1000.0))
+
+        for ((input_name, output_name), (count, mean, maximum)) in sorted(
+                self.get_output_statistics().items()):
+            report.append('%s -> %s: %d messages, latency %.2f ms on average (max. %.2f ms)' % (
+                input_name, output_name, count, mean * 1000.0, maximum * 1000.0))
+
+        return report
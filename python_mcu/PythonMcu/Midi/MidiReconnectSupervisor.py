@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import threading
+
+
+class MidiReconnectSupervisor:
+    __module__ = __name__
+    __doc__ = 'Watches MIDI ports from a background thread and schedules reconnection attempts'
+
+    # interval for checking whether connected MIDI ports still exist
+    # (in seconds)
+    WATCHDOG_INTERVAL = 2.0
+
+    # intervals for checking whether lost MIDI ports have re-appeared;
+    # doubled after every unsuccessful attempt (in seconds)
+    INITIAL_BACKOFF = 0.05
+    MAXIMUM_BACKOFF = 5.0
+
+    def __init__(self, callback_probe, callback_notify):
+        # "callback_probe" returns True if all MIDI ports can be
+        # opened; it runs in the supervisor thread and must not touch
+        # any open port
+        self._callback_probe = callback_probe
+
+        # "callback_notify" is called from the supervisor thread
+        # whenever "attention_required" has been set, and should make
+        # the application's processing thread look at this supervisor
+        # soon
+        self._callback_notify = callback_notify
+
+        # set by the supervisor thread and cleared by the processing
+        # thread before it looks at the state below
+        self.attention_required = False
+
+        # state is changed by both threads, so guard it with a lock;
+        # "_version" is incremented whenever the processing thread
+        # reports a change, so that results of probes that were
+        # running in the meantime can be discarded
+        self._lock = threading.Lock()
+        self._version = 0
+        self._is_lost = False
+        self._ports_missing = False
+        self._ports_available = False
+
+        self._backoff = self.INITIAL_BACKOFF
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # --- processing thread ---
+    def start(self):
+        if self._thread:
+            return
+
+        with self._lock:
+            self._version += 1
+            self._is_lost = False
+            self._ports_missing = False
+            self._ports_available = False
+            self.attention_required = False
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='MIDI reconnect supervisor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+
+        self._stop_event.set()
+        self._wake_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def report_lost(self):
+        """
+        MIDI ports have been closed after an error; look for them with
+        exponential backoff
+        """
+        with self._lock:
+            self._version += 1
+            self._ports_available = False
+            self._is_lost = True
+
+        self._wake_event.set()
+
+    def report_reconnected(self):
+        with self._lock:
+            self._version += 1
+            self._is_lost = False
+            self._ports_missing = False
+            self._backoff = self.INITIAL_BACKOFF
+
+        self._wake_event.set()
+
+    def ports_missing(self):
+        """
+        return True if the watchdog could not find connected MIDI
+        ports anymore
+        """
+        return self._ports_missing
+
+    def ports_available(self):
+        """
+        return True if lost MIDI ports can be opened again
+        """
+        return self._ports_available
+
+    # --- supervisor thread ---
+    def _probe(self):
+        # never let an exception from a MIDI library kill this thread
+        try:
+            return self._callback_probe()
+        except Exception:
+            return False
+
+    def _notify(self):
+        self.attention_required = True
+        self._callback_notify()
+
+    def _update_state(self, version, flag_name):
+        # results of probes are outdated when the processing thread
+        # has reported a change in the meantime
+        with self._lock:
+            if self._version != version:
+                return
+
+            setattr(self, flag_name, True)
+
+        self._notify()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            # probes take a while, so do not hold the lock meanwhile
+            with self._lock:
+                version = self._version
+                is_lost = self._is_lost
+                ports_missing = self._ports_missing
+                ports_available = self._ports_available
+
+                if is_lost and not ports_available:
+                    interval = self._backoff
+                    self._backoff = min(self._backoff * 2.0, self.MAXIMUM_BACKOFF)
+
+            if not is_lost:
+                interval = self.WATCHDOG_INTERVAL
+
+                if not ports_missing and not self._probe():
+                    self._update_state(version, '_ports_missing')
+            elif not ports_available:
+                if self._probe():
+                    self._update_state(version, '_ports_available')
+            else:
+                # waiting for processing thread to re-open ports
+                interval = self.WATCHDOG_INTERVAL
+
+            self._wake_event.wait(interval)
+            self._wake_event.clear()
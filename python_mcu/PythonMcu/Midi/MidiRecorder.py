@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import time
+
+
+class MidiRecorder:
+    __module__ = __name__
+    __doc__ = 'Records MIDI traffic of all MIDI connections to a binary capture'
+
+    # capture format:
+    #
+    # * header: "MAGIC"
+    # * records: time since previous record in microseconds (varint),
+    #   port ID (one byte), length of data (varint), data
+    #
+    # Port IDs are assigned on first use; the first record of a port
+    # uses the port ID "PORT_DEFINITION" and contains the new port ID,
+    # its direction (0: input, 1: output) and its name (UTF-8).
+    MAGIC = b'PyMCU capture\x01'
+    PORT_DEFINITION = 0xFF
+
+    def __init__(self, stream):
+        # "stream" is a binary file object opened for writing
+        self._stream = stream
+        self._stream.write(self.MAGIC)
+
+        self._ports = {}
+        self._previous_timestamp = None
+        self._number_of_records = 0
+
+    def close(self):
+        self._stream.close()
+
+    def get_number_of_records(self):
+        return self._number_of_records
+
+    # --- recording ---
+    def record(self, port_name, is_output, data, timestamp=None):
+        """
+        record MIDI message "data" (bytes, bytearray or list of
+        integers) that has been received from or sent to a port;
+        timestamps are given in seconds of "time.perf_counter()"
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        port_id = self._ports.get((port_name, is_output))
+        if port_id is None:
+            port_id = self._define_port(port_name, is_output, timestamp)
+
+        self._write_record(port_id, data, timestamp)
+        self._number_of_records += 1
+
+    def _define_port(self, port_name, is_output, timestamp):
+        port_id = len(self._ports)
+        if port_id >= self.PORT_DEFINITION:
+            raise ValueError('too many MIDI ports in capture')
+
+        self._ports[(port_name, is_output)] = port_id
+
+        definition = bytearray([port_id, 1 if is_output else 0])
+        definition.extend(str(port_name).encode('utf-8'))
+        self._write_record(self.PORT_DEFINITION, definition, timestamp)
+
+        return port_id
+
+    def _write_record(self, port_id, data, timestamp):
+        if self._previous_timestamp is None:
+            self._previous_timestamp = timestamp
+
+        # timestamps of different ports may be slightly out of order
+        delta = max(int(round((timestamp - self._previous_timestamp) * 1e6)), 0)
+        self._previous_timestamp = max(timestamp, self._previous_timestamp)
+
+        record = bytearray()
+        self._encode_varint(record, delta)
+        record.append(port_id)
+        self._encode_varint(record, len(data))
+        record.extend(data)
+
+        self._stream.write(record)
+
+    @staticmethod
+    def _encode_varint(buffer, value):
+        # unsigned LEB128: 7 bits per byte, least significant first
+        while value > 0x7F:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+
+        buffer.append(value)
+
+    # --- reading ---
+    @staticmethod
+    def read_capture(stream):
+        """
+        return list of records of a capture as (timestamp in seconds
+        since start, port name, is_output, data as bytes)
+        """
+        content = stream.read()
+        if not content.startswith(MidiRecorder.MAGIC):
+            raise ValueError('not a MIDI capture')
+
+        ports = {}
+        records = []
+        timestamp = 0
+        offset = len(MidiRecorder.MAGIC)
+
+        while offset < len(content):
+            (delta, offset) = MidiRecorder._decode_varint(content, offset)
+            port_id = content[offset]
+            (length, offset) = MidiRecorder._decode_varint(content, offset + 1)
+            data = content[offset:offset + length]
+            offset += length
+
+            if len(data) < length:
+                raise ValueError('MIDI capture is truncated')
+
+            timestamp += delta
+            if port_id == MidiRecorder.PORT_DEFINITION:
+                ports[data[0]] = (data[2:].decode('utf-8'), data[1] == 1)
+            else:
+                (port_name, is_output) = ports[port_id]
+                records.append((timestamp / 1e6, port_name, is_output, data))
+
+        return records
+
+    @staticmethod
+    def _decode_varint(content, offset):
+        value = 0
+        shift = 0
+
+        while True:
+            byte = content[offset]
+            offset += 1
+
+            value |= (byte & 0x7F) << shift
+            shift += 7
+
+            if byte < 0x80:
+                return value, offset
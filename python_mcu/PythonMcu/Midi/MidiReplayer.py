@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import time
+
+from PythonMcu.Midi.MidiRecorder import MidiRecorder
+
+
+class MidiReplayer:
+    __module__ = __name__
+    __doc__ = 'Replays MIDI input of a capture made by "MidiRecorder"'
+
+    # replay as fast as possible
+    MAXIMUM_SPEED = None
+
+    def __init__(self, records, ports, callback_process):
+        """
+        records: records as returned by "MidiRecorder.read_capture()"
+
+        ports: dictionary mapping names of recorded MIDI input ports
+               to transports that inject MIDI input (e.g. the peers of
+               "LoopbackMidiTransport" instances used by the replayed
+               MIDI connections); input of other ports is skipped
+
+        callback_process: processes injected MIDI input (e.g.
+                          "McuInterconnector.process_midi_input()")
+                          and returns the size of its backlog
+        """
+        self._records = [record for record in records if (not record[2]) and (record[1] in ports)]
+        self._ports = ports
+        self._callback_process = callback_process
+
+    @staticmethod
+    def from_file(filename, ports, callback_process):
+        with open(filename, 'rb') as stream:
+            records = MidiRecorder.read_capture(stream)
+
+        return MidiReplayer(records, ports, callback_process)
+
+    def get_number_of_events(self):
+        return len(self._records)
+
+    def get_duration(self):
+        if not self._records:
+            return 0.0
+
+        return self._records[-1][0] - self._records[0][0]
+
+    def replay(self, speed=1.0):
+        """
+        replay all input events at "speed" times the recorded speed
+        (or as fast as possible for "MAXIMUM_SPEED") and return the
+        time it took in seconds
+        """
+        if not self._records:
+            return 0.0
+
+        first_timestamp = self._records[0][0]
+        start = time.perf_counter()
+
+        for (timestamp, port_name, _, data) in self._records:
+            if speed is not self.MAXIMUM_SPEED:
+                due_time = start + (timestamp - first_timestamp) / speed
+
+                # keep on processing while waiting for the next event
+                while time.perf_counter() < due_time:
+                    if not self._callback_process():
+                        delay = due_time - time.perf_counter()
+                        if delay > 0.002:
+                            time.sleep(delay - 0.001)
+
+            port = self._ports[port_name]
+            if data[0] == 0xF0:
+                port.write_sys_ex(list(data))
+            else:
+                port.write_short(*data)
+
+            self._callback_process()
+
+        # process what is left
+        while self._callback_process():
+            pass
+
+        return time.perf_counter() - start
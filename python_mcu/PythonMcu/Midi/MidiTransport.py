@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import contextlib
+import threading
+
+from PythonMcu.Midi.MidiDeviceRegistry import MidiDeviceRegistry
+
+
+class MidiTransport:
+    __module__ = __name__
+    __doc__ = 'Base class for MIDI transports used by "MidiConnection"'
+
+    # transports that can push MIDI input from a reader thread
+    # support "set_input_callback()"
+    HAS_INPUT_CALLBACK = False
+
+    # transports that can write a plain MIDI byte stream support
+    # "write_raw()"
+    HAS_RAW_OUTPUT = False
+
+    # transports for serial links (e.g. 5-pin DIN at 31,250 baud),
+    # where every byte counts and "MidiConnection" should use running
+    # status by default
+    IS_BYTE_STREAM = False
+
+    # exceptions raised by the backend when a port fails (e.g. because
+    # the device has been unplugged)
+    ERRORS = ()
+
+    # backends whose ports may be read and written by several threads
+    # at once; otherwise, threads take turns (see "get_io_lock()")
+    IS_THREAD_SAFE = False
+
+    @classmethod
+    def get_io_lock(cls):
+        """
+        return lock that serialises access to this backend from
+        background threads, which is shared by all its instances
+        """
+        if cls.IS_THREAD_SAFE:
+            return contextlib.nullcontext()
+
+        # look up attribute in the class itself, as backends must not
+        # share their locks
+        if '_io_lock' not in cls.__dict__:
+            cls._io_lock = threading.Lock()
+
+        return cls._io_lock
+
+    # --- device enumeration ---
+    @classmethod
+    def get_device_registry(cls):
+        """
+        return device index of this backend, which is shared by all
+        its instances
+        """
+        # look up attribute in the class itself, as backends must not
+        # share their registries
+        if '_device_registry' not in cls.__dict__:
+            cls._device_registry = MidiDeviceRegistry(cls._scan_devices)
+
+        return cls._device_registry
+
+    @classmethod
+    def _scan_devices(cls):
+        """
+        enumerate devices and return (inputs, outputs, default input
+        name, default output name) as expected by "MidiDeviceRegistry"
+        """
+        raise NotImplementedError
+
+    def get_input_names(self):
+        return self.get_device_registry().get_input_names()
+
+    def get_output_names(self):
+        return self.get_device_registry().get_output_names()
+
+    def get_default_input_name(self):
+        return self.get_device_registry().get_default_input_name()
+
+    def get_default_output_name(self):
+        return self.get_device_registry().get_default_output_name()
+
+    def rescan_devices(self):
+        """
+        enumerate devices again, bypassing the cached device index; may
+        be called from any thread
+        """
+        self.get_device_registry().rescan()
+
+    def has_input(self, device_name):
+        """
+        return True if MIDI input port exists; may be called from any
+        thread
+        """
+        return self.get_device_registry().find_input(device_name) is not None
+
+    def has_output(self, device_name):
+        """
+        return True if MIDI output port exists; may be called from any
+        thread
+        """
+        return self.get_device_registry().find_output(device_name) is not None
+
+    # --- ports ---
+    def open_input(self, device_name):
+        """
+        open MIDI input port and return True on success
+        """
+        raise NotImplementedError
+
+    def open_output(self, device_name):
+        """
+        open MIDI output port and return True on success
+        """
+        raise NotImplementedError
+
+    def close_input(self):
+        raise NotImplementedError
+
+    def close_output(self):
+        raise NotImplementedError
+
+    # --- MIDI input ---
+    #
+    # timestamps of received events are given in seconds of
+    # "time.perf_counter()", so that they can be compared across
+    # transports and to the time MIDI output is sent
+
+    def set_input_callback(self, callback):
+        """
+        push MIDI input to "callback" as soon as it arrives
+
+        "callback" is called with a single argument, [data,
+        timestamp], and may run in a reader thread.
+        """
+        raise NotImplementedError
+
+    def poll(self):
+        raise NotImplementedError
+
+    def read(self, max_events):
+        """
+        return up to "max_events" events as list of [data, timestamp]
+        """
+        raise NotImplementedError
+
+    # --- MIDI output ---
+    def write_short(self, status, data_1=0, data_2=0):
+        raise NotImplementedError
+
+    def write(self, messages):
+        """
+        write a list of short messages, each given as "(status,
+        data_1, data_2)"; override if the backend can send them with
+        a single call
+        """
+        for (status, data_1, data_2) in messages:
+            self.write_short(status, data_1, data_2)
+
+    def write_sys_ex(self, message):
+        raise NotImplementedError
+
+    def write_raw(self, data):
+        """
+        write MIDI byte stream as is (bytes or bytearray)
+        """
+        raise NotImplementedError
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import time
+
+import pygame.midi
+
+from PythonMcu.Midi.MidiTransport import MidiTransport
+
+pygame.midi.init()
+
+
+class PygameMidiTransport(MidiTransport):
+    __module__ = __name__
+    __doc__ = 'MIDI transport using pygame (PortMidi)'
+
+    ERRORS = (pygame.midi.MidiException,)
+
+    # maximum number of events accepted by "Output.write()"
+    MAX_EVENTS_PER_WRITE = 1024
+
+    # number of ports opened by all instances
+    _open_ports = 0
+
+    def __init__(self):
+        self._midi_input = None
+        self._midi_output = None
+
+    # --- device enumeration ---
+    @classmethod
+    def _scan_devices(cls):
+        # devices are also enumerated by reconnect supervisors, so
+        # keep other threads from opening or using ports meanwhile
+        with cls.get_io_lock():
+            return cls._scan_devices_locked()
+
+    @classmethod
+    def _scan_devices_locked(cls):
+        # PortMidi enumerates devices only once on initialisation, so
+        # re-initialise to detect new devices; this would invalidate
+        # all open ports, so new devices only show up while no port
+        # is open
+        if cls._open_ports == 0:
+            pygame.midi.quit()
+            pygame.midi.init()
+
+        inputs = {}
+        outputs = {}
+        default_input_name = None
+        default_output_name = None
+
+        default_input_id = pygame.midi.get_default_input_id()
+        default_output_id = pygame.midi.get_default_output_id()
+
+        for device_id in range(pygame.midi.get_count()):
+            device = pygame.midi.get_device_info(device_id)
+
+            # noinspection PyUnresolvedReferences
+            device_name = device[1].decode('utf-8')
+
+            # the first of several devices with the same name wins
+            if device[2] == 1:
+                inputs.setdefault(device_name, device_id)
+
+                if device_id == default_input_id:
+                    default_input_name = device_name
+
+            if device[3] == 1:
+                outputs.setdefault(device_name, device_id)
+
+                if device_id == default_output_id:
+                    default_output_name = device_name
+
+        return inputs, outputs, default_input_name, default_output_name
+
+    # --- ports ---
+    def open_input(self, device_name):
+        device_id = self.get_device_registry().find_input(device_name)
+
+        if device_id is None:
+            return False
+
+        with self.get_io_lock():
+            self._midi_input = pygame.midi.Input(device_id)
+            PygameMidiTransport._open_ports += 1
+
+        return True
+
+    def open_output(self, device_name):
+        device_id = self.get_device_registry().find_output(device_name)
+
+        if device_id is None:
+            return False
+
+        with self.get_io_lock():
+            self._midi_output = pygame.midi.Output(device_id, latency=0)
+            PygameMidiTransport._open_ports += 1
+
+        return True
+
+    def close_input(self):
+        if self._midi_input:
+            with self.get_io_lock():
+                self._midi_input.close()
+                self._midi_input = None
+                PygameMidiTransport._open_ports -= 1
+
+    def close_output(self):
+        if self._midi_output:
+            with self.get_io_lock():
+                self._midi_output.close()
+                self._midi_output = None
+                PygameMidiTransport._open_ports -= 1
+
+    # --- MIDI input ---
+    def poll(self):
+        return self._midi_input.poll()
+
+    def read(self, max_events):
+        events = self._midi_input.read(max_events)
+
+        # convert PortMidi timestamps (milliseconds since
+        # initialisation) to "time.perf_counter()"
+        offset = time.perf_counter() - pygame.midi.time() / 1000.0
+        for event in events:
+            event[1] = event[1] / 1000.0 + offset
+
+        return events
+
+    # --- MIDI output ---
+    def write_short(self, status, data_1=0, data_2=0):
+        self._midi_output.write_short(status, data_1, data_2)
+
+    def write(self, messages):
+        # as the output has been opened with a latency of zero, the
+        # timestamp is ignored and all events are sent immediately
+        timestamp = pygame.midi.time()
+
+        for start in range(0, len(messages), self.MAX_EVENTS_PER_WRITE):
+            self._midi_output.write(
+                [[list(message), timestamp] for message in messages[start:start + self.MAX_EVENTS_PER_WRITE]])
+
+    def write_sys_ex(self, message):
+        self._midi_output.write_sys_ex(0, message)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+
+class RingBuffer:
+    __module__ = __name__
+    __doc__ = 'Bounded queue for exactly one producer and one consumer thread'
+
+    # Only the producer advances "_tail" and only the consumer
+    # advances "_head".  A slot is written before "_tail" is advanced
+    # past it, and single assignments are atomic in CPython, so no
+    # locking is needed.  Both indices grow without bounds and are
+    # wrapped with a bit mask.
+
+    def __init__(self, capacity):
+        # round capacity up to a power of two
+        size = 1
+        while size < capacity:
+            size <<= 1
+
+        self._slots = [None] * size
+        self._mask = size - 1
+        self._head = 0
+        self._tail = 0
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def __bool__(self):
+        return self._tail != self._head
+
+    def get_capacity(self):
+        return len(self._slots)
+
+    # --- producer ---
+    def append(self, item):
+        """
+        add item and return True, or return False if the buffer is
+        full
+        """
+        tail = self._tail
+        if tail - self._head > self._mask:
+            return False
+
+        self._slots[tail & self._mask] = item
+        self._tail = tail + 1
+
+        return True
+
+    def extend(self, items):
+        """
+        add items and return the number of items that did not fit
+        """
+        dropped_items = 0
+
+        for item in items:
+            if not self.append(item):
+                dropped_items += 1
+
+        return dropped_items
+
+    # --- consumer ---
+    def popleft(self):
+        head = self._head
+        if head == self._tail:
+            raise IndexError('pop from an empty ring buffer')
+
+        slot = head & self._mask
+        item = self._slots[slot]
+
+        # do not keep processed items alive
+        self._slots[slot] = None
+        self._head = head + 1
+
+        return item
+
+    def clear(self):
+        while self._head != self._tail:
+            self.popleft()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import time
+
+import rtmidi
+
+from PythonMcu.Midi.MidiTransport import MidiTransport
+
+
+class RtMidiTransport(MidiTransport):
+    __module__ = __name__
+    __doc__ = 'MIDI transport using python-rtmidi'
+
+    HAS_INPUT_CALLBACK = True
+    ERRORS = (rtmidi.RtMidiError,)
+    IS_THREAD_SAFE = True
+
+    def __init__(self):
+        self._midi_input = None
+        self._midi_output = None
+
+        # message fetched by "poll()", but not yet returned by "read()"
+        self._polled_event = None
+
+    # --- device enumeration ---
+    @classmethod
+    def _scan_devices(cls):
+        inputs = {}
+        outputs = {}
+
+        midi_input = rtmidi.MidiIn()
+        for port_id, port_name in enumerate(midi_input.get_ports()):
+            inputs.setdefault(port_name, port_id)
+        midi_input.delete()
+
+        midi_output = rtmidi.MidiOut()
+        for port_id, port_name in enumerate(midi_output.get_ports()):
+            outputs.setdefault(port_name, port_id)
+        midi_output.delete()
+
+        # RtMidi does not know about default ports
+        return inputs, outputs, None, None
+
+    @classmethod
+    def _find_port(cls, device_name, is_input):
+        registry = cls.get_device_registry()
+
+        if is_input:
+            port_id = registry.find_input(device_name)
+        else:
+            port_id = registry.find_output(device_name)
+
+        if port_id is not None:
+            return port_id
+
+        if is_input:
+            port_names = registry.get_input_names()
+        else:
+            port_names = registry.get_output_names()
+
+        # RtMidi appends client and port numbers to the device name
+        for port_name in port_names:
+            if device_name in port_name:
+                return cls._find_port(port_name, is_input)
+
+        return None
+
+    def has_input(self, device_name):
+        return self._find_port(device_name, True) is not None
+
+    def has_output(self, device_name):
+        return self._find_port(device_name, False) is not None
+
+    def _open_port(self, midi_port, device_name, is_input):
+        # port IDs change when devices are connected or removed, so
+        # check the cached ID and enumerate devices again if it is
+        # out of date
+        for _ in range(2):
+            port_id = self._find_port(device_name, is_input)
+
+            if port_id is None:
+                return False
+
+            if device_name in (midi_port.get_port_name(port_id) or ''):
+                midi_port.open_port(port_id)
+                return True
+
+            self.get_device_registry().rescan()
+
+        return False
+
+    # --- ports ---
+    def open_input(self, device_name):
+        midi_input = rtmidi.MidiIn()
+
+        if not self._open_port(midi_input, device_name, True):
+            midi_input.delete()
+            return False
+
+        midi_input.ignore_types(sysex=False, timing=True, active_sense=True)
+
+        self._midi_input = midi_input
+        return True
+
+    def open_output(self, device_name):
+        midi_output = rtmidi.MidiOut()
+
+        if not self._open_port(midi_output, device_name, False):
+            midi_output.delete()
+            return False
+
+        self._midi_output = midi_output
+        return True
+
+    def close_input(self):
+        if self._midi_input:
+            self._midi_input.cancel_callback()
+            self._midi_input.close_port()
+            self._midi_input.delete()
+            self._midi_input = None
+
+    def close_output(self):
+        if self._midi_output:
+            self._midi_output.close_port()
+            self._midi_output.delete()
+            self._midi_output = None
+
+    # --- MIDI input ---
+    def set_input_callback(self, callback):
+        # RtMidi calls back with (event, data), where "event" is a
+        # tuple of (message, delta time); as the callback is called
+        # on reception, use the current time instead of the delta
+        self._midi_input.set_callback(lambda event, _data: callback((event[0], time.perf_counter())))
+
+    def poll(self):
+        if self._polled_event is None:
+            self._polled_event = self._get_message()
+
+        return self._polled_event is not None
+
+    def read(self, max_events):
+        events = []
+
+        if self._polled_event is not None:
+            events.append(self._polled_event)
+            self._polled_event = None
+
+        while len(events) < max_events:
+            event = self._get_message()
+
+            if event is None:
+                break
+
+            events.append(event)
+
+        return events
+
+    def _get_message(self):
+        event = self._midi_input.get_message()
+
+        # RtMidi only knows the time since the previous message, so
+        # use the time of fetching the message
+        if event is not None:
+            event = (event[0], time.perf_counter())
+
+        return event
+
+    # --- MIDI output ---
+    def write_short(self, status, data_1=0, data_2=0):
+        message = [status, data_1, data_2]
+
+        # program change and channel pressure have one data byte;
+        # RtMidi sends messages as they are
+        if 0xC0 <= status < 0xE0:
+            del message[2:]
+
+        self._midi_output.send_message(message)
+
+    def write_sys_ex(self, message):
+        self._midi_output.send_message(message)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+
+def _get_number_of_data_bytes(status_byte):
+    # program change and channel pressure have a single data byte,
+    # all other channel messages have two
+    if 0xC0 <= status_byte < 0xE0:
+        return 1
+    if status_byte < 0xF0:
+        return 2
+
+    return {0xF1: 1, 0xF2: 2, 0xF3: 1}.get(status_byte, 0)
+
+
+class RunningStatusEncoder:
+    __module__ = __name__
+    __doc__ = 'Encodes MIDI messages into a byte stream using MIDI running status'
+
+    def __init__(self):
+        # status byte of the last channel message written, or None
+        self._running_status = None
+
+    def reset(self):
+        """
+        call whenever the receiver may have lost track of the running
+        status (e.g. after reconnecting)
+        """
+        self._running_status = None
+
+    def encode_short(self, buffer, status, data_1, data_2):
+        """
+        append short message to "buffer" (a bytearray)
+        """
+        if status >= 0xF8:
+            # system real-time messages neither use nor cancel running
+            # status
+            buffer.append(status)
+            return
+
+        if status != self._running_status:
+            buffer.append(status)
+
+            # system common messages cancel running status
+            if status < 0xF0:
+                self._running_status = status
+            else:
+                self._running_status = None
+
+        number_of_data_bytes = _get_number_of_data_bytes(status)
+
+        if number_of_data_bytes == 2:
+            buffer.append(data_1)
+            buffer.append(data_2)
+        elif number_of_data_bytes == 1:
+            buffer.append(data_1)
+
+    def encode_sys_ex(self, buffer, message):
+        """
+        append SysEx message (including leading 0xF0 and trailing
+        0xF7) to "buffer"
+        """
+        buffer.extend(message)
+        self._running_status = None
+
+    def encode(self, messages):
+        """
+        return list of short messages, each given as "(status, data_1,
+        data_2)", as bytes
+        """
+        buffer = bytearray()
+
+        for (status, data_1, data_2) in messages:
+            self.encode_short(buffer, status, data_1, data_2)
+
+        return bytes(buffer)
+
+
+class RunningStatusDecoder:
+    __module__ = __name__
+    __doc__ = 'Splits a MIDI byte stream (possibly using running status) into MIDI messages'
+
+    def __init__(self):
+        self._running_status = None
+
+        # message that is currently being received, and its expected
+        # length
+        self._message = []
+        self._message_length = 0
+
+        self._sysex_message = None
+
+    def reset(self):
+        self._running_status = None
+        self._message = []
+        self._message_length = 0
+        self._sysex_message = None
+
+    def decode(self, data):
+        """
+        feed bytes and return list of all MIDI messages that have
+        been completed; SysEx messages include leading 0xF0 and
+        trailing 0xF7
+        """
+        messages = []
+
+        for byte in data:
+            if byte >= 0xF8:
+                # system real-time messages may appear anywhere
+                messages.append([byte])
+            elif byte == 0xF0:
+                self._sysex_message = [byte]
+                self._running_status = None
+                self._message = []
+            elif byte == 0xF7:
+                if self._sysex_message is not None:
+                    self._sysex_message.append(byte)
+                    messages.append(self._sysex_message)
+
+                self._sysex_message = None
+            elif byte & 0x80:
+                # any other status byte terminates SysEx messages
+                self._sysex_message = None
+
+                if byte < 0xF0:
+                    self._running_status = byte
+                else:
+                    self._running_status = None
+
+                self._message = [byte]
+                self._message_length = 1 + _get_number_of_data_bytes(byte)
+
+                if self._message_length == 1:
+                    messages.append(self._message)
+                    self._message = []
+            elif self._sysex_message is not None:
+                self._sysex_message.append(byte)
+            else:
+                if not self._message:
+                    # data byte without status byte
+                    if self._running_status is None:
+                        continue
+
+                    self._message = [self._running_status]
+                    self._message_length = 1 + _get_number_of_data_bytes(self._running_status)
+
+                self._message.append(byte)
+
+                if len(self._message) == self._message_length:
+                    messages.append(self._message)
+                    self._message = []
+
+        return messages
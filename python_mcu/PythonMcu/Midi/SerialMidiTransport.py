@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import time
+
+import serial
+import serial.tools.list_ports
+
+from PythonMcu.Midi.MidiTransport import MidiTransport
+from PythonMcu.Midi.RunningStatus import RunningStatusDecoder, RunningStatusEncoder
+
+
+class SerialMidiTransport(MidiTransport):
+    __module__ = __name__
+    __doc__ = 'MIDI transport for serial links (5-pin DIN) using pyserial'
+
+    HAS_RAW_OUTPUT = True
+    IS_BYTE_STREAM = True
+    ERRORS = (serial.SerialException, OSError)
+
+    # pyserial reads and writes a port in parallel
+    IS_THREAD_SAFE = True
+
+    BAUD_RATE = 31250
+
+    # maximum number of bytes fetched from the serial port at once
+    READ_SIZE = 1024
+
+    def __init__(self):
+        # MIDI input and output share a single serial port
+        self._serial_port = None
+        self._input_open = False
+        self._output_open = False
+
+        self._decoder = RunningStatusDecoder()
+
+        # decoded messages that have not been read yet
+        self._pending_events = []
+
+    # --- device enumeration ---
+    @classmethod
+    def _scan_devices(cls):
+        devices = {}
+        for port in serial.tools.list_ports.comports():
+            devices.setdefault(port.device, port.device)
+
+        # serial ports work in both directions
+        return devices, dict(devices), None, None
+
+    # --- ports ---
+    def _open_serial_port(self, device_name):
+        if self._serial_port:
+            return self._serial_port.port == device_name
+
+        device = self.get_device_registry().find_input(device_name)
+        if device is None:
+            return False
+
+        self._serial_port = serial.Serial(device, self.BAUD_RATE, timeout=0)
+        self._decoder.reset()
+        return True
+
+    def _close_serial_port(self):
+        if self._serial_port and not self._input_open and not self._output_open:
+            self._serial_port.close()
+            self._serial_port = None
+
+    def open_input(self, device_name):
+        self._input_open = self._open_serial_port(device_name)
+        return self._input_open
+
+    def open_output(self, device_name):
+        self._output_open = self._open_serial_port(device_name)
+        return self._output_open
+
+    def close_input(self):
+        self._input_open = False
+        self._pending_events = []
+        self._close_serial_port()
+
+    def close_output(self):
+        self._output_open = False
+        self._close_serial_port()
+
+    # --- MIDI input ---
+    def poll(self):
+        if not self._input_open:
+            return False
+
+        if not self._pending_events and self._serial_port.in_waiting:
+            timestamp = time.perf_counter()
+
+            for message in self._decoder.decode(self._serial_port.read(self.READ_SIZE)):
+                self._pending_events.append([message, timestamp])
+
+        return bool(self._pending_events)
+
+    def read(self, max_events):
+        self.poll()
+
+        events = self._pending_events[:max_events]
+        del self._pending_events[:max_events]
+
+        return events
+
+    # --- MIDI output ---
+    def write_short(self, status, data_1=0, data_2=0):
+        # running status is left to "MidiConnection" (see
+        # "write_raw()"), so always send the status byte
+        buffer = bytearray()
+        RunningStatusEncoder().encode_short(buffer, status, data_1, data_2)
+
+        self.write_raw(buffer)
+
+    def write_sys_ex(self, message):
+        self.write_raw(bytes(message))
+
+    def write_raw(self, data):
+        self._serial_port.write(data)
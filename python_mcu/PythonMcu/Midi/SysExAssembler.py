@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+
+class SysExAssembler:
+    __module__ = __name__
+    __doc__ = 'Incremental assembler for fragmented MIDI SysEx messages'
+
+    # PortMidi splits a SysEx message into events of four bytes each,
+    # which are assembled in a buffer of this size; a complete MCU LCD
+    # update has 120 bytes, so this leaves plenty of room for other
+    # messages (longer messages are discarded)
+    MAX_SYSEX_SIZE = 4096
+
+    # returned by "feed()" when a status byte has aborted the SysEx
+    # message, as that byte starts a new message
+    ABORTED = 'aborted'
+
+    _STATE_IDLE = 0
+    _STATE_RECEIVING = 1
+    _STATE_DISCARDING = 2
+
+    def __init__(self, callback_log, max_size=MAX_SYSEX_SIZE):
+        self._callback_log = callback_log
+
+        self._max_size = max_size
+        self._buffer = bytearray(max_size)
+        self._length = 0
+        self._state = self._STATE_IDLE
+
+        # system real-time messages interleaved with SysEx data
+        self._realtime_bytes = bytearray()
+
+    def _log(self, message):
+        self._callback_log('[SysEx Assembler      ]  ' + message, True)
+
+    def is_active(self):
+        return self._state != self._STATE_IDLE
+
+    def reset(self):
+        self._finish()
+        self._realtime_bytes.clear()
+
+    def _finish(self):
+        self._length = 0
+        self._state = self._STATE_IDLE
+
+    def pop_realtime_bytes(self):
+        """
+        return system real-time messages (single status bytes) that
+        were interleaved with SysEx data passed to "feed()" since the
+        last call, in order of reception
+        """
+        realtime_bytes = bytes(self._realtime_bytes)
+        self._realtime_bytes.clear()
+
+        return realtime_bytes
+
+    def feed(self, data):
+        """
+        feed a fragment of MIDI data
+
+        Returns the complete SysEx message (including leading 0xF0
+        and trailing 0xF7) as "bytes" as soon as its terminator has
+        been received, "ABORTED" if any other status byte has
+        interrupted the message, and None otherwise.  Data following
+        the terminator within the same fragment (PortMidi padding) is
+        ignored.
+        """
+        for byte in data:
+            if byte == 0xF0:
+                if self._state == self._STATE_RECEIVING:
+                    self._log('Incomplete MIDI SysEx message discarded.')
+
+                self._buffer[0] = byte
+                self._length = 1
+                self._state = self._STATE_RECEIVING
+            elif self._state == self._STATE_IDLE:
+                return None
+            elif byte >= 0xF8:
+                # system real-time messages may be interleaved with
+                # SysEx data and do not terminate it
+                self._realtime_bytes.append(byte)
+            elif byte == 0xF7:
+                if self._state == self._STATE_DISCARDING:
+                    self._finish()
+                    return None
+
+                self._buffer[self._length] = byte
+                message = bytes(self._buffer[:self._length + 1])
+
+                self._finish()
+                return message
+            elif byte & 0x80:
+                self._log('MIDI SysEx message aborted by status byte 0x%02X.' % byte)
+                self._finish()
+                return self.ABORTED
+            elif self._state == self._STATE_DISCARDING:
+                continue
+            elif self._length >= self._max_size - 1:
+                self._log('MIDI SysEx message exceeds %d bytes, discarding.' % self._max_size)
+                self._state = self._STATE_DISCARDING
+            else:
+                self._buffer[self._length] = byte
+                self._length += 1
+
+        return None
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""
+PythonMcu
+=========
+Mackie Host Controller written in Python
+Copyright (c) 2011 Martin Zuther (http://www.mzuther.de/)
+Copyright (c) 2021 Raphaël Doursenaud <rdoursenaud@free.fr>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Thank you for using free software!
+
+"""
+
+import math
+import threading
+import time
+
+
+class TimerWheel:
+    __module__ = __name__
+    __doc__ = 'Hashed timer wheel that runs callbacks after a delay'
+
+    # timers are rounded up to multiples of this interval (in seconds)
+    RESOLUTION = 0.01
+
+    # timers further away than "RESOLUTION * NUMBER_OF_SLOTS" simply
+    # stay in their slot for more than one turn of the wheel
+    NUMBER_OF_SLOTS = 128
+
+    def __init__(self, resolution=RESOLUTION, number_of_slots=NUMBER_OF_SLOTS):
+        self._resolution = resolution
+        self._number_of_slots = number_of_slots
+        self._callback_wakeup = None
+        self._wakeup_timer = None
+        self._wakeup_tick = None
+
+        self.reset()
+
+    def reset(self):
+        self._slots = [[] for _ in range(self._number_of_slots)]
+        self._current_tick = self._get_tick(time.perf_counter())
+        self._number_of_timers = 0
+
+        # tick of the timer that expires first (or None)
+        self._next_tick = None
+
+    def set_wakeup_callback(self, callback):
+        """
+        "callback" is called from a timer thread as soon as a timer
+        has expired; it should trigger a call of "advance()" (not
+        needed when "advance()" is called regularly anyway)
+        """
+        self._callback_wakeup = callback
+
+    def get_number_of_timers(self):
+        return self._number_of_timers
+
+    def _get_tick(self, timestamp):
+        return int(timestamp / self._resolution)
+
+    # --- timers ---
+    def schedule(self, delay, callback, timestamp=None):
+        """
+        call "callback" with the current timestamp when "delay"
+        seconds have passed; timestamps are given in seconds of
+        "time.perf_counter()"
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        tick = max(int(math.ceil((timestamp + delay) / self._resolution)), self._current_tick + 1)
+
+        self._slots[tick % self._number_of_slots].append((tick, callback))
+        self._number_of_timers += 1
+
+        if (self._next_tick is None) or (tick < self._next_tick):
+            self._next_tick = tick
+            self._schedule_wakeup()
+
+    def advance(self, timestamp=None):
+        """
+        run all timers that have expired; costs next to nothing while
+        no timer is due
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        now_tick = self._get_tick(timestamp)
+        previous_tick = self._current_tick
+
+        if now_tick <= previous_tick:
+            return
+
+        self._current_tick = now_tick
+
+        if (self._next_tick is None) or (now_tick < self._next_tick):
+            return
+
+        # visit every slot at most once, even after long pauses
+        expired_timers = []
+        last_tick = min(now_tick, previous_tick + self._number_of_slots)
+
+        for tick in range(previous_tick + 1, last_tick + 1):
+            slot = self._slots[tick % self._number_of_slots]
+            if not slot:
+                continue
+
+            remaining_timers = [timer for timer in slot if timer[0] > now_tick]
+            if len(remaining_timers) < len(slot):
+                expired_timers.extend(timer for timer in slot if timer[0] <= now_tick)
+                slot[:] = remaining_timers
+
+        self._number_of_timers -= len(expired_timers)
+        self._next_tick = self._find_next_tick()
+
+        # timers expire in order; their callbacks may schedule new
+        # timers
+        expired_timers.sort(key=lambda timer: timer[0])
+        for (_, callback) in expired_timers:
+            callback(timestamp)
+
+        self._schedule_wakeup()
+
+    def _find_next_tick(self):
+        if not self._number_of_timers:
+            return None
+
+        return min(timer[0] for slot in self._slots for timer in slot)
+
+    def _schedule_wakeup(self):
+        if (not self._callback_wakeup) or (self._next_tick is None):
+            return
+
+        if self._wakeup_timer and self._wakeup_timer.is_alive():
+            if self._wakeup_tick <= self._next_tick:
+                return
+
+            self._wakeup_timer.cancel()
+
+        # wake up a little late, so that the timer has surely expired
+        delay = max(self._next_tick * self._resolution - time.perf_counter(), 0.0) + 0.001
+
+        self._wakeup_tick = self._next_tick
+        self._wakeup_timer = threading.Timer(delay, self._callback_wakeup)
+        self._wakeup_timer.daemon = True
+        self._wakeup_timer.start()
@@ -0,0 +1,486 @@
+# Benchmarks for PythonMcu
+#
+# All MIDI ports are replaced by in-process loopback transports, so
+# these run at full CPU speed without any MIDI hardware (or ALSA).
+#
+# Usage: python benchmarks.py [capture_file mcu_midi_input_name]
+#
+# Captures are recorded by "Python MCU" when the option
+# "midi_capture_file" is set in its configuration file; their MIDI
+# input is replayed as fast as possible, with all input that was
+# received on "mcu_midi_input_name" being sent by the emulated host
+# and all other input by the emulated hardware controller.
+
+import sys
+import threading
+import time
+import types
+
+from PythonMcu.Hardware.NovationZeROSLMkII import NovationZeROSLMkII
+from PythonMcu.MackieControl.FaderFilter import FaderFilter
+from PythonMcu.MackieControl.MackieHostControl import MackieHostControl
+from PythonMcu.MackieControl.MeterEngine import MeterEngine
+from PythonMcu.McuInterconnector.McuInterconnector import McuInterconnector
+from PythonMcu.McuInterconnector.McuUnitGroup import McuUnitGroup
+from PythonMcu.McuInterconnector.MiddlewareStages import FaderCurve, FaderVpotRemap, MessageTap
+from PythonMcu.Midi.LoopbackMidiTransport import LoopbackMidiTransport
+from PythonMcu.Midi.MidiConnection import MidiConnection, ShortMessage
+from PythonMcu.Midi.MidiRecorder import MidiRecorder
+from PythonMcu.Midi.MidiReplayer import MidiReplayer
+
+NUMBER_OF_EVENTS = 20000
+
+
+def log_callback(message, repaint=False):
+    pass
+
+
+class NullController(object):
+    # accepts any call from "MackieHostControl" and does nothing
+    def __getattr__(self, name):
+        return lambda *args: False
+
+
+class Counter(object):
+    def __init__(self):
+        self.events = 0
+
+    def __call__(self, event):
+        self.events += 1
+
+
+def create_interconnector(mcu_model_id=None, middleware_stages=(), midi_input_mode=MidiConnection.INPUT_MODE_POLLING):
+    """
+    return interconnector, the transports of emulated host and
+    hardware controller and the counters of events they received
+    """
+    if mcu_model_id is None:
+        mcu_model_id = MackieHostControl.get_preferred_mcu_model_id()
+
+    (host, mcu_port) = LoopbackMidiTransport.create_pair('Host', 'MCU')
+    (hardware, controller_port) = LoopbackMidiTransport.create_pair('Hardware', 'Controller')
+
+    counters = []
+    for transport in (host, hardware):
+        transport.open_input('')
+        transport.open_output('')
+
+        counter = Counter()
+        transport.set_input_callback(counter)
+        counters.append(counter)
+
+    interconnector = McuInterconnector(
+        None, mcu_model_id, MackieHostControl.ASSUME_SUCCESSFUL_CONNECTION,
+        'MCU', 'MCU', NovationZeROSLMkII, 'Controller', 'Controller', log_callback,
+        midi_input_mode=midi_input_mode, mcu_midi_transport=mcu_port, controller_midi_transport=controller_port,
+        middleware_stages=middleware_stages
+    )
+
+    return interconnector, host, hardware, counters
+
+
+def process_all(interconnector, ports):
+    while interconnector.process_midi_input() or any(port.poll() for port in ports):
+        pass
+
+
+def report(name, number_of_events, elapsed):
+    print('%-40s %9.0f events/s  %7.2f us/event' % (
+        name, number_of_events / elapsed, elapsed * 1e6 / number_of_events))
+
+
+def benchmark_host_to_hardware():
+    (interconnector, host, hardware, counters) = create_interconnector()
+    interconnector.connect()
+
+    # toggle "mute" LEDs of all channels
+    for event in range(NUMBER_OF_EVENTS):
+        host.write_short(0x90, 0x10 + event % 8, 0x00 if (event // 8) % 2 else 0x7F)
+
+    start = time.perf_counter()
+    process_all(interconnector, [host.get_peer()])
+    report('host to hardware (LEDs)', NUMBER_OF_EVENTS, time.perf_counter() - start)
+
+    interconnector.disconnect()
+
+
+def benchmark_hardware_to_host():
+    (interconnector, host, hardware, counters) = create_interconnector()
+    interconnector.connect()
+
+    # move all faders
+    for event in range(NUMBER_OF_EVENTS):
+        hardware.write_short(0xB0, 0x10 + event % 8, event % 128)
+
+    start = time.perf_counter()
+    process_all(interconnector, [hardware.get_peer()])
+    report('hardware to host (faders)', NUMBER_OF_EVENTS, time.perf_counter() - start)
+
+    interconnector.disconnect()
+
+
+def benchmark_round_trip_latency():
+    (interconnector, host, hardware, counters) = create_interconnector()
+    interconnector.connect()
+    counter = counters[1]
+
+    start = time.perf_counter()
+    for event in range(NUMBER_OF_EVENTS):
+        host.write_short(0x90, 0x10 + event % 8, 0x00 if (event // 8) % 2 else 0x7F)
+
+        expected_events = counter.events + 1
+        while counter.events < expected_events:
+            interconnector.process_midi_input()
+
+    report('host to hardware (single event)', NUMBER_OF_EVENTS, time.perf_counter() - start)
+
+    interconnector.disconnect()
+
+
+def benchmark_extenders():
+    for number_of_extenders in (0, 1, 3):
+        (main_unit, host, hardware, counters) = create_interconnector()
+        unit_group = McuUnitGroup(main_unit)
+        hosts = [host]
+
+        for _ in range(number_of_extenders):
+            (extender, host, hardware, counters) = create_interconnector(
+                MackieHostControl.get_extender_model_id(MackieHostControl.get_preferred_mcu_model_id()))
+            unit_group.add_extender(extender)
+            hosts.append(host)
+
+        unit_group.connect()
+
+        # toggle "mute" LEDs of all channels on all units
+        for event in range(NUMBER_OF_EVENTS):
+            hosts[event % len(hosts)].write_short(0x90, 0x10 + event % 8, 0x00 if (event // 8) % 2 else 0x7F)
+
+        start = time.perf_counter()
+        process_all(unit_group, [host.get_peer() for host in hosts])
+        report('host to hardware (%d channels)' % unit_group.get_number_of_channels(),
+               NUMBER_OF_EVENTS, time.perf_counter() - start)
+
+        unit_group.disconnect()
+
+
+def _create_eval_led_sources():
+    # (name of LED ID constant, offset, source code) for every LED
+    sources = []
+
+    for method in ('record_ready', 'solo', 'mute', 'select', 'vselect'):
+        for channel in range(8):
+            sources.append(('_LED_SWITCH_CHANNEL_' + method.upper(), channel,
+                            'self._hardware_controller.set_led_channel_%s(%d, status)' % (method, channel)))
+
+    for name in sorted(vars(MackieHostControl)):
+        if name.startswith('_LED_') and not name.startswith('_LED_SWITCH_CHANNEL_'):
+            method = name.replace('_LED_SWITCH_', '').replace('_LED_', '').lower()
+            sources.append((name, 0, 'self._hardware_controller.set_led_%s(status)' % method))
+
+    return sources
+
+
+_EVAL_LED_SOURCES = _create_eval_led_sources()
+
+
+def set_led_using_eval(self, led_id, status):
+    # LED dispatch as formerly done by "MackieHostControl._set_led()":
+    # a dictionary of source strings was rebuilt for every LED update
+    # and the matching one evaluated
+    if self.is_offline():
+        return
+
+    selector = {getattr(self, name) + offset: source for (name, offset, source) in _EVAL_LED_SOURCES}
+
+    if led_id in selector:
+        eval(selector[led_id])
+    else:
+        self._log('LED 0x%02X NOT implemented.' % led_id)
+
+
+def benchmark_led_dispatch():
+    # LEDs of channel strips, assignment and automation buttons
+    messages = [ShortMessage(0x90, led_id, 0x7F) for led_id in range(0x00, 0x50)]
+
+    for (name, use_eval) in (('eval, baseline', True), ('dispatch table', False)):
+        mackie_host_control = MackieHostControl(
+            MackieHostControl.get_preferred_mcu_model_id(), MackieHostControl.ASSUME_SUCCESSFUL_CONNECTION, 'bench',
+            'MCU', 'MCU', log_callback, midi_transport=LoopbackMidiTransport('MCU'))
+        mackie_host_control.set_hardware_controller(NullController())
+        mackie_host_control.go_online()
+
+        if use_eval:
+            mackie_host_control._set_led = types.MethodType(set_led_using_eval, mackie_host_control)
+
+        start = time.perf_counter()
+        for event in range(NUMBER_OF_EVENTS):
+            mackie_host_control.receive_midi(MidiConnection.NOTE_ON_EVENT, messages[event % len(messages)])
+        report('LED dispatch (%s)' % name, NUMBER_OF_EVENTS, time.perf_counter() - start)
+
+
+def benchmark_interconnector_leds():
+    (interconnector, host, hardware, counters) = create_interconnector()
+    interconnector.connect()
+
+    # toggle "solo" LEDs of all channels
+    start = time.perf_counter()
+    for event in range(NUMBER_OF_EVENTS):
+        interconnector.set_led_channel_solo(event % 8, (event // 8) % 2)
+    report('LED state (MCU Interconnector)', NUMBER_OF_EVENTS, time.perf_counter() - start)
+
+    interconnector.disconnect()
+
+
+def benchmark_bank_change():
+    (interconnector, host, hardware, counters) = create_interconnector()
+    interconnector.connect()
+    process_all(interconnector, [host.get_peer(), hardware.get_peer()])
+    counter = counters[1]
+
+    # on bank changes, hosts clear all LEDs of the channel strips and
+    # then light up those of the new bank
+    number_of_banks = 100
+    number_of_messages = 0
+    expected_events = counter.events
+
+    for bank in range(number_of_banks):
+        for led_id in range(0x00, 0x20):
+            host.write_short(0x90, led_id, 0x00)
+        for led_id in range(0x00, 0x20):
+            host.write_short(0x90, led_id, 0x7F if (led_id + bank) % 3 else 0x00)
+        number_of_messages += 64
+
+        # process each bank change in a single tick
+        interconnector.process_midi_input()
+
+    print('%-40s %5d -> %4d LED messages' % (
+        'bank changes', number_of_messages, counter.events - expected_events))
+
+    interconnector.disconnect()
+
+
+def benchmark_flashing_leds():
+    (interconnector, host, hardware, counters) = create_interconnector()
+    interconnector.connect()
+
+    # let the LEDs of all channel strips flash
+    for led_id in range(0x00, 0x20):
+        host.write_short(0x90, led_id, 0x01)
+    process_all(interconnector, [host.get_peer(), hardware.get_peer()])
+
+    # idle ticks (flashing LEDs are toggled only every 250 ms)
+    start = time.perf_counter()
+    for _ in range(NUMBER_OF_EVENTS):
+        interconnector.process_midi_input()
+    report('idle ticks (32 flashing LEDs)', NUMBER_OF_EVENTS, time.perf_counter() - start)
+
+    interconnector.disconnect()
+
+
+def benchmark_middleware():
+    # reversed channel strips, fader curve and a tap that only counts
+    # messages
+    tapped_messages = Counter()
+    stages = [
+        FaderVpotRemap([7, 6, 5, 4, 3, 2, 1, 0]),
+        FaderCurve(2.0),
+        MessageTap(lambda message_name, *args: tapped_messages(message_name)),
+    ]
+
+    for number_of_stages in (0, len(stages)):
+        (interconnector, host, hardware, counters) = create_interconnector(
+            middleware_stages=stages[:number_of_stages])
+        interconnector.connect()
+        process_all(interconnector, [host.get_peer(), hardware.get_peer()])
+
+        # move all faders
+        start = time.perf_counter()
+        for event in range(NUMBER_OF_EVENTS):
+            interconnector.move_fader(event % 8, event % 16384)
+        report('middleware (%d stages)' % number_of_stages, NUMBER_OF_EVENTS, time.perf_counter() - start)
+
+        interconnector.disconnect()
+
+
+def benchmark_io_threads():
+    mcu_model_id = MackieHostControl.get_preferred_mcu_model_id()
+    number_of_moves = 20
+
+    for midi_input_mode in (MidiConnection.INPUT_MODE_POLLING, MidiConnection.INPUT_MODE_IO_THREADS):
+        (interconnector, host, hardware, counters) = create_interconnector(midi_input_mode=midi_input_mode)
+
+        # the controller is connected by a 5-pin DIN link, so updating
+        # its LCD takes a while
+        hardware.get_peer().set_baud_rate(31250)
+
+        wakeup = threading.Event()
+        interconnector.set_wakeup_callback(wakeup.set)
+        interconnector.connect()
+
+        # fader movements arrive at the host as pitch wheel changes
+        fader_times = []
+        host.set_input_callback(lambda event: fader_times.append(time.perf_counter()) if event[0][0] == 0xE0 else None)
+
+        latencies = []
+        for move in range(number_of_moves):
+            # the host updates the LCD, and the user moves a fader
+            # while it is being updated
+            character = 0x41 + move % 26
+            host.write_sys_ex([0xF0, 0x00, 0x00, 0x66, mcu_model_id, 0x12, 0x00] + [character] * 56 + [0xF7])
+
+            move_time = []
+            user = threading.Timer(
+                0.005, lambda: move_time.append(time.perf_counter()) or hardware.write_short(0xB0, 0x10, 0x00 if move % 2 else 0x7F))
+            user.start()
+
+            # this thread runs the engine; without wakeups, it polls
+            # every millisecond
+            expected_moves = len(fader_times) + 1
+            while len(fader_times) < expected_moves:
+                wakeup.wait(0.001)
+                wakeup.clear()
+                interconnector.process_midi_input()
+
+            user.join()
+            latencies.append(fader_times[-1] - move_time[0])
+
+        print('%-40s %7.2f ms mean  %7.2f ms maximum' % (
+            'fader during LCD update (%s)' % midi_input_mode,
+            sum(latencies) * 1e3 / number_of_moves, max(latencies) * 1e3))
+
+        interconnector.disconnect()
+
+
+def benchmark_fader_filter():
+    sent_messages = []
+    fader_filter = FaderFilter(lambda fader_id, value: sent_messages.append(value))
+
+    # a 7-bit fader that reports 1,000 positions per second, slowly
+    # moves up for one second and jitters by one step afterwards
+    number_of_messages = 0
+    for millisecond in range(2000):
+        value = min(millisecond, 1000) * 127 // 1000
+        if millisecond % 3 == 1:
+            value = max(value - 1, 0)
+
+        fader_filter.move(0, value + (value << 7), millisecond / 1000.0)
+        fader_filter.process(millisecond / 1000.0)
+        number_of_messages += 1
+
+    fader_filter.process(10.0)
+    print('%-40s %4d -> %4d messages (%d dropped, resting value %d)' % (
+        'noisy 7-bit fader', number_of_messages, len(sent_messages),
+        fader_filter.get_dropped_messages(0), sent_messages[-1] >> 7))
+
+
+def benchmark_meter_engine():
+    updates = []
+    meter_engine = MeterEngine(lambda *meter: updates.append(meter))
+
+    # the host sends levels of all 8 channels 100 times per second,
+    # while MIDI input is processed every millisecond
+    number_of_messages = 0
+    start = time.perf_counter()
+    for millisecond in range(2000):
+        timestamp = millisecond / 1000.0
+
+        if millisecond % 10 == 0:
+            for meter_id in range(8):
+                meter_engine.set_level(meter_id, (millisecond // 10 + meter_id) % 13, timestamp)
+                number_of_messages += 1
+
+        meter_engine.process(timestamp)
+
+    elapsed = time.perf_counter() - start
+    print('%-40s %4d -> %4d meter updates (%.2f us per tick)' % (
+        'meters of 8 channels at 100 Hz', number_of_messages, len(updates), elapsed * 1e6 / 2000))
+
+
+def count_bytes_written(output_mode, send_messages):
+    (transport, receiver) = LoopbackMidiTransport.create_pair()
+    receiver.open_input('')
+
+    midi_connection = MidiConnection(log_callback, None, transport=transport, output_mode=output_mode)
+    midi_connection.connect(None, 'Loopback 1')
+
+    midi_connection.begin_output_batch()
+    send_messages(midi_connection)
+    midi_connection.flush_output()
+
+    midi_connection.disconnect()
+    return transport.get_bytes_written()
+
+
+def restore_vpots(midi_connection):
+    # same messages as "NovationZeROSLMkII._restore_vpots()"
+    for vpot_id in range(8):
+        midi_connection.send_control_change(
+            NovationZeROSLMkII._MIDI_DEVICE_CHANNEL, NovationZeROSLMkII._MIDI_CC_ENCODER_MODE + vpot_id, 0x00)
+        midi_connection.send_control_change(
+            NovationZeROSLMkII._MIDI_DEVICE_CHANNEL, NovationZeROSLMkII._MIDI_CC_ENCODER_LIGHTS + vpot_id, 0x00)
+
+
+def zero_faders(midi_connection):
+    # same messages as "NektarPanoramaTSeries.initialize_controls()"
+    faders = list(range(0x00, 0x08)) + list(range(0x30, 0x38)) + [0x6A] + \
+        list(range(0x10, 0x18)) + list(range(0x38, 0x40))
+
+    for fader in faders:
+        midi_connection.send_control_change(0, fader, 0x00)
+
+
+def benchmark_running_status():
+    for (name, send_messages) in (('restore V-Pots (ZeRO SL MkII)', restore_vpots),
+                                  ('zero faders (Panorama T-Series)', zero_faders)):
+        bytes_messages = count_bytes_written(MidiConnection.OUTPUT_MODE_MESSAGES, send_messages)
+        bytes_running_status = count_bytes_written(MidiConnection.OUTPUT_MODE_RUNNING_STATUS, send_messages)
+
+        # a serial MIDI link (31,250 baud) transfers a byte in 320 us
+        print('%-40s %4d -> %4d bytes (%4.1f%% saved, %5.2f ms on a serial link)' % (
+            name, bytes_messages, bytes_running_status,
+            100.0 * (bytes_messages - bytes_running_status) / bytes_messages,
+            bytes_running_status * 0.32))
+
+
+def benchmark_replay(filename, mcu_midi_input_name):
+    (interconnector, host, hardware, counters) = create_interconnector()
+    interconnector.connect()
+
+    with open(filename, 'rb') as stream:
+        records = MidiRecorder.read_capture(stream)
+
+    ports = {}
+    for (_, port_name, is_output, _) in records:
+        if not is_output:
+            ports[port_name] = host if port_name == mcu_midi_input_name else hardware
+
+    peers = [host.get_peer(), hardware.get_peer()]
+    replayer = MidiReplayer(
+        records, ports, lambda: interconnector.process_midi_input() or any(peer.poll() for peer in peers))
+
+    number_of_events = replayer.get_number_of_events()
+    if number_of_events:
+        elapsed = replayer.replay(MidiReplayer.MAXIMUM_SPEED)
+        report('replay (%.1f s captured)' % replayer.get_duration(), number_of_events, elapsed)
+
+    interconnector.disconnect()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        benchmark_replay(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+
+    benchmark_host_to_hardware()
+    benchmark_hardware_to_host()
+    benchmark_round_trip_latency()
+    benchmark_extenders()
+    benchmark_led_dispatch()
+    benchmark_interconnector_leds()
+    benchmark_bank_change()
+    benchmark_flashing_leds()
+    benchmark_middleware()
+    benchmark_io_threads()
+    benchmark_running_status()
+    benchmark_fader_filter()
+    benchmark_meter_engine()
@@ -30,7 +30,7 @@ import sys
 
 import PySide2
 import pygame.version
-from PySide2.QtCore import QTimer, Qt
+from PySide2.QtCore import QTimer, Qt, Signal
 from PySide2.QtGui import QFont, QFontMetrics, QTextCharFormat, QTextCursor
 from PySide2.QtWidgets import QFrame, QApplication, QPlainTextEdit, QStyle, QHBoxLayout, QVBoxLayout, QGridLayout, \
     QLabel, QComboBox, QPushButton
@@ -39,7 +39,9 @@ from PySide2.QtWidgets import QFrame, QApplication, QPlainTextEdit, QStyle, QHBo
 from PythonMcu import Hardware
 from PythonMcu.MackieControl.MackieHostControl import MackieHostControl
 from PythonMcu.McuInterconnector.McuInterconnector import McuInterconnector
+from PythonMcu.McuInterconnector.McuUnitGroup import McuUnitGroup
 from PythonMcu.Midi.MidiConnection import MidiConnection
+from PythonMcu.Midi.MidiRecorder import MidiRecorder
 from PythonMcu.Tools.AboutDialog import AboutDialog
 from PythonMcu.Tools.ApplicationConfiguration import ApplicationConfiguration
 
@@ -55,6 +57,10 @@ HARDWARE_CONTROLLERS = {
 
 # noinspection PyArgumentList
 class PythonMcuApp(QFrame):
+    # emitted from MIDI reader threads when using callback-driven MIDI
+    # input
+    midi_input_available = Signal()
+
     # noinspection PyUnresolvedReferences
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -156,12 +162,12 @@ class PythonMcuApp(QFrame):
 
         self._combo_mcu_midi_input = self._create_combo_box(
             self.grid_layout_mcu, self._mcu_midi_input,
-            'MIDI In:', MidiConnection.get_midi_inputs()
+            'MIDI In:', MidiConnection.get_midi_inputs(self._midi_input_mode)
         )
 
         self._combo_mcu_midi_output = self._create_combo_box(
             self.grid_layout_mcu, self._mcu_midi_output,
-            'MIDI Out:', MidiConnection.get_midi_outputs()
+            'MIDI Out:', MidiConnection.get_midi_outputs(self._midi_input_mode)
         )
 
         self._combo_hardware_controller = self._create_combo_box(
@@ -171,12 +177,12 @@ class PythonMcuApp(QFrame):
 
         self._combo_controller_midi_input = self._create_combo_box(
             self.grid_layout_controller, self._controller_midi_input,
-            'MIDI In:', MidiConnection.get_midi_inputs()
+            'MIDI In:', MidiConnection.get_midi_inputs(self._midi_input_mode, self._controller_midi_transport)
         )
 
         self._combo_controller_midi_output = self._create_combo_box(
             self.grid_layout_controller, self._controller_midi_output,
-            'MIDI Out:', MidiConnection.get_midi_outputs()
+            'MIDI Out:', MidiConnection.get_midi_outputs(self._midi_input_mode, self._controller_midi_transport)
         )
 
         self.grid_layout_controller.addWidget(
@@ -209,6 +215,10 @@ class PythonMcuApp(QFrame):
         self._timer.setInterval(int(self._midi_latency))
         self._timer.timeout.connect(self.process_midi_input)
 
+        # queued connection, so that MIDI input is always processed on
+        # the GUI thread
+        self.midi_input_available.connect(self.process_midi_input, Qt.QueuedConnection)
+
     def _read_configuration(self):
         # initialise defaults for MCU and hardware controller
         mcu_emulated_model_default = MackieHostControl.get_preferred_mcu_model()
@@ -222,6 +232,8 @@ class PythonMcuApp(QFrame):
             'Python MCU', 'controller_hardware', hardware_controller_default)
         self._midi_latency = configuration.get_option(
             'Python MCU', 'midi_latency', midi_latency_default)
+        self._midi_input_mode = configuration.get_option(
+            'Python MCU', 'midi_input_mode', MidiConnection.INPUT_MODE_POLLING)
 
         # calculate MCU model ID from its name
         self._mcu_model_id = MackieHostControl.get_mcu_id_from_model(self._mcu_emulated_model)
@@ -265,6 +277,43 @@ class PythonMcuApp(QFrame):
             controller_midi_output_default
         )
 
+        # hardware controllers on serial links (e.g. 5-pin DIN) are
+        # connected using "Serial", where the MIDI ports are serial
+        # ports; leave empty to use the same MIDI library as the host
+        self._controller_midi_transport = configuration.get_option(
+            'Python MCU', 'controller_midi_transport', MidiConnection.TRANSPORT_DEFAULT)
+
+        # record all MIDI traffic to this file (for replaying it in
+        # "benchmarks.py"); leave empty to turn off recording
+        self._midi_capture_file = configuration.get_option(
+            'Python MCU', 'midi_capture_file', '')
+
+        # extenders can only be set up in the configuration file
+        # (sections "Extender 1", "Extender 2" and so on); each one
+        # has its own MIDI ports and hardware controller
+        number_of_extenders = int(configuration.get_option(
+            'Python MCU', 'mcu_extenders', '0'))
+
+        self._extenders = []
+        for extender in range(1, number_of_extenders + 1):
+            section = 'Extender %d' % extender
+            hardware_controller = configuration.get_option(
+                section, 'controller_hardware', self._hardware_controller)
+
+            self._extenders.append({
+                'mcu_midi_input': configuration.get_option(
+                    section, 'mcu_midi_input', '%s XT %d' % (mcu_midi_input_default, extender)),
+                'mcu_midi_output': configuration.get_option(
+                    section, 'mcu_midi_output', '%s XT %d' % (mcu_midi_output_default, extender)),
+                'controller_hardware': hardware_controller,
+                'controller_midi_transport': configuration.get_option(
+                    section, 'controller_midi_transport', self._controller_midi_transport),
+                'controller_midi_input': configuration.get_option(
+                    section, 'controller_midi_input', controller_midi_input_default),
+                'controller_midi_output': configuration.get_option(
+                    section, 'controller_midi_output', controller_midi_output_default)
+            })
+
     def _create_combo_box(self, layout, selection, label_text, choices):
         row = layout.rowCount()
 
@@ -382,7 +431,10 @@ class PythonMcuApp(QFrame):
             self.callback_log('QComboBox not handled ("%s").' % selected_text)
 
     def process_midi_input(self):
-        self._interconnector.process_midi_input()
+        # queued wakeups may arrive after the emulation has been
+        # stopped
+        if self._interconnector:
+            self._interconnector.process_midi_input()
 
     def display_about(self):
         AboutDialog(self).show()
@@ -403,7 +455,14 @@ class PythonMcuApp(QFrame):
             self.callback_log('MIDI input:     %s' % self._controller_midi_input)
             self.callback_log('MIDI output:    %s' % self._controller_midi_output)
             self.callback_log('')
-            self.callback_log('MIDI latency:   %s ms' % self._midi_latency)
+            for (extender, settings) in enumerate(self._extenders):
+                self.callback_log('Extender %d:     %s' % (extender + 1, settings['controller_hardware']))
+                self.callback_log('MIDI input:     %s' % settings['mcu_midi_input'])
+                self.callback_log('MIDI output:    %s' % settings['mcu_midi_output'])
+                self.callback_log('')
+            self.callback_log('MIDI input:     %s' % self._midi_input_mode)
+            if self._midi_input_mode == MidiConnection.INPUT_MODE_POLLING:
+                self.callback_log('MIDI latency:   %s ms' % self._midi_latency)
             self.callback_log('')
             self.callback_log('')
 
@@ -414,10 +473,14 @@ class PythonMcuApp(QFrame):
             self.callback_log('Starting MCU emulation...')
             self.callback_log('', True)
 
+            if self._midi_capture_file:
+                self.callback_log('Recording MIDI traffic to "%s"...' % self._midi_capture_file)
+                MidiConnection.set_recorder(MidiRecorder(open(self._midi_capture_file, 'wb')))
+
             # the "interconnector" is the brain of this application -- it
             # interconnects Mackie Control Host and MIDI controller while
             # handling the complete MIDI translation between those two
-            self._interconnector = McuInterconnector(
+            self._interconnector = McuUnitGroup(McuInterconnector(
                 self,
                 self._mcu_model_id,
                 self._mcu_connection,
@@ -426,16 +489,48 @@ class PythonMcuApp(QFrame):
                 self._hardware_controller_class,
                 self._controller_midi_input,
                 self._controller_midi_output,
-                self.callback_log
-            )
-            self._interconnector.connect()
-
-            self._timer.start()
+                self.callback_log,
+                self._midi_input_mode,
+                controller_midi_transport=self._create_controller_midi_transport(self._controller_midi_transport)
+            ))
+
+            # all units are serviced by the same event loop
+            for settings in self._extenders:
+                self._interconnector.add_extender(McuInterconnector(
+                    self,
+                    MackieHostControl.get_extender_model_id(self._mcu_model_id),
+                    self._mcu_connection,
+                    settings['mcu_midi_input'],
+                    settings['mcu_midi_output'],
+                    HARDWARE_CONTROLLERS[settings['controller_hardware']],
+                    settings['controller_midi_input'],
+                    settings['controller_midi_output'],
+                    self.callback_log,
+                    self._midi_input_mode,
+                    controller_midi_transport=self._create_controller_midi_transport(
+                        settings['controller_midi_transport'])
+                ))
+
+            if self._midi_input_mode != MidiConnection.INPUT_MODE_POLLING:
+                # process MIDI input only when it arrives instead of
+                # polling the MIDI ports
+                self._interconnector.set_wakeup_callback(self.midi_input_available.emit)
+                self._interconnector.connect()
+            else:
+                self._interconnector.connect()
+                self._timer.start()
         else:
             self._enable_controls(True)
             self.button_start_stop.setText('&Start')
             self._interconnector_stop()
 
+    def _create_controller_midi_transport(self, transport_type):
+        # None selects the MIDI library matching the input mode
+        if transport_type == MidiConnection.TRANSPORT_DEFAULT:
+            return None
+
+        return MidiConnection.create_transport(self._midi_input_mode, transport_type)
+
     def _interconnector_stop(self):
         self._timer.stop()
 
@@ -444,8 +539,25 @@ class PythonMcuApp(QFrame):
         self.callback_log('')
 
         self._interconnector.disconnect()
+        latency_monitor = self._interconnector.get_latency_monitor()
         self._interconnector = None
 
+        recorder = MidiConnection.get_recorder()
+        if recorder:
+            MidiConnection.set_recorder(None)
+            recorder.close()
+
+            self.callback_log('Recorded %d MIDI messages.' % recorder.get_number_of_records())
+
+        latency_report = latency_monitor.get_report()
+        if latency_report:
+            self.callback_log('')
+            self.callback_log('MIDI latency')
+            self.callback_log('============')
+
+            for line in latency_report:
+                self.callback_log(line)
+
         self.callback_log('', True)
 
     def close_application(self):
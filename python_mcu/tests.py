@@ -1,10 +1,687 @@
 from PythonMcu.Hardware import NektarPanoramaTSeries
+from PythonMcu.Hardware.MidiControllerTemplate import MidiControllerTemplate
+from PythonMcu.MackieControl.FaderFilter import FaderFilter
+from PythonMcu.MackieControl.MackieHostControl import MackieHostControl
+from PythonMcu.MackieControl.MeterEngine import MeterEngine
+from PythonMcu.McuInterconnector.McuInterconnector import McuInterconnector
+from PythonMcu.Midi.LoopbackMidiTransport import LoopbackMidiTransport
+from PythonMcu.Midi.MidiConnection import MidiConnection, ShortMessage
+from PythonMcu.Midi.MidiRecorder import MidiRecorder
+from PythonMcu.Midi.MidiReconnectSupervisor import MidiReconnectSupervisor
+from PythonMcu.Midi.MidiReplayer import MidiReplayer
+from PythonMcu.Midi.RingBuffer import RingBuffer
+from PythonMcu.Midi.RtMidiTransport import RtMidiTransport
+from PythonMcu.Midi.RunningStatus import RunningStatusEncoder, RunningStatusDecoder
+from PythonMcu.Midi.SysExAssembler import SysExAssembler
+from PythonMcu.Tools.TimerWheel import TimerWheel
+import io
 import logging
+import rtmidi
+import threading
+import time
 
 logger = logging.getLogger("PythonMcu")
-def log_wrapper(message, discard):
+def log_wrapper(message, discard=False):
     logger.debug(message)
 
+##################
+# running status
+##################
+
+encoder = RunningStatusEncoder()
+
+# control change burst: status byte is only sent once
+output = encoder.encode([(0xB0, 0x00, 0x00), (0xB0, 0x01, 0x00), (0xB0, 0x02, 0x7F)])
+assert(output == bytes([0xB0, 0x00, 0x00, 0x01, 0x00, 0x02, 0x7F]))
+print(".", end=" ")
+
+# running status is kept across calls, and changes with the status
+output = encoder.encode([(0xB0, 0x03, 0x00), (0x90, 0x10, 0x7F), (0x90, 0x11, 0x00)])
+assert(output == bytes([0x03, 0x00, 0x90, 0x10, 0x7F, 0x11, 0x00]))
+print(".", end=" ")
+
+# program change has a single data byte
+output = encoder.encode([(0xC0, 0x05, 0x00), (0xC0, 0x06, 0x00)])
+assert(output == bytes([0xC0, 0x05, 0x06]))
+print(".", end=" ")
+
+# system real-time messages do not cancel running status
+output = encoder.encode([(0xC0, 0x07, 0x00), (0xF8, 0x00, 0x00), (0xC0, 0x08, 0x00)])
+assert(output == bytes([0x07, 0xF8, 0x08]))
+print(".", end=" ")
+
+# SysEx messages do
+output = bytearray()
+encoder.encode_sys_ex(output, [0xF0, 0x00, 0x20, 0x29, 0xF7])
+encoder.encode_short(output, 0xC0, 0x09, 0x00)
+assert(output == bytes([0xF0, 0x00, 0x20, 0x29, 0xF7, 0xC0, 0x09]))
+print(".", end=" ")
+
+# so does resetting the encoder
+encoder.reset()
+output = encoder.encode([(0xC0, 0x0A, 0x00)])
+assert(output == bytes([0xC0, 0x0A]))
+print(".", end=" ")
+
+# decoding restores the original messages
+decoder = RunningStatusDecoder()
+messages = [(0xB0, 0x10, 0x01), (0xB0, 0x11, 0x02), (0xD0, 0x33, 0x00), (0xF0, 0x7E, 0xF7), (0xE1, 0x00, 0x40)]
+
+encoder.reset()
+output = bytearray()
+for (status, data_1, data_2) in messages:
+    if status == 0xF0:
+        encoder.encode_sys_ex(output, [status, data_1, data_2])
+    else:
+        encoder.encode_short(output, status, data_1, data_2)
+
+output = decoder.decode(output[:5]) + decoder.decode(output[5:])
+assert(output == [[0xB0, 0x10, 0x01], [0xB0, 0x11, 0x02], [0xD0, 0x33], [0xF0, 0x7E, 0xF7], [0xE1, 0x00, 0x40]])
+print(".", end=" ")
+
+##################
+# SysEx assembler
+##################
+
+assembler = SysExAssembler(log_wrapper, 16)
+
+# PortMidi delivers SysEx messages in fragments of four bytes
+output = [assembler.feed(fragment) for fragment in ([0xF0, 0x00, 0x00, 0x66], [0x14, 0x12, 0x00, 0x41], [0xF7, 0, 0, 0])]
+assert(output == [None, None, bytes([0xF0, 0x00, 0x00, 0x66, 0x14, 0x12, 0x00, 0x41, 0xF7])])
+assert(not assembler.is_active())
+print(".", end=" ")
+
+# system real-time messages may be interleaved with SysEx data and
+# are kept for delivery
+output = assembler.feed([0xF0, 0x01, 0xF8, 0x02]), assembler.feed([0xFE, 0xF7])
+assert(output == (None, bytes([0xF0, 0x01, 0x02, 0xF7])))
+assert(assembler.pop_realtime_bytes() == bytes([0xF8, 0xFE]))
+assert(assembler.pop_realtime_bytes() == b'')
+print(".", end=" ")
+
+# any other status byte aborts the message
+output = assembler.feed([0xF0, 0x01, 0x02]), assembler.feed([0x90, 0x03, 0x7F]), assembler.feed([0x04, 0xF7])
+assert(output == (None, SysExAssembler.ABORTED, None))
+assert(not assembler.is_active())
+print(".", end=" ")
+
+# a new SysEx message replaces an incomplete one
+output = assembler.feed([0xF0, 0x01, 0x02]), assembler.feed([0xF0, 0x03, 0xF7])
+assert(output == (None, bytes([0xF0, 0x03, 0xF7])))
+print(".", end=" ")
+
+# messages exceeding the maximum size are discarded up to their end
+output = assembler.feed([0xF0] + [0x01] * 20)
+assert((output is None) and assembler.is_active())
+output = assembler.feed([0x02, 0xF7])
+assert((output is None) and not assembler.is_active())
+output = assembler.feed([0xF0, 0x04, 0xF7])
+assert(output == bytes([0xF0, 0x04, 0xF7]))
+print(".", end=" ")
+
+# data bytes outside of SysEx messages are ignored
+output = assembler.feed([0x01, 0x02, 0xF7])
+assert((output is None) and not assembler.is_active())
+print(".", end=" ")
+
+# MIDI connections deliver real-time messages interleaved with SysEx
+# data as well as short messages that abort a SysEx message
+(host, mcu_port) = LoopbackMidiTransport.create_pair('Host', 'MCU')
+received = []
+midi_connection = MidiConnection(log_wrapper, lambda status, message: received.append(bytes(message)),
+                                 transport=mcu_port)
+midi_connection.connect('MCU', 'MCU')
+host.open_output('')
+
+host.write_sys_ex([0xF0, 0x01, 0xF8, 0x02])
+host.write_sys_ex([0x03, 0xF7])
+host.write_sys_ex([0xF0, 0x04, 0x05, 0x06])
+host.write_short(0x90, 0x10, 0x7F)
+midi_connection.process_input_buffer()
+assert(received == [bytes([0xF8, 0x00, 0x00]), bytes([0xF0, 0x01, 0x02, 0x03, 0xF7]), bytes([0x90, 0x10, 0x7F])])
+print(".", end=" ")
+
+midi_connection.disconnect()
+
+##################
+# RtMidi transport
+##################
+
+class RecordingMidiPort(object):
+    # stands in for "rtmidi.MidiIn" and "rtmidi.MidiOut" and records
+    # the messages sent
+    messages = []
+
+    def get_ports(self):
+        return ['Test Port']
+
+    def get_port_name(self, port_id):
+        return 'Test Port'
+
+    def open_port(self, port_id):
+        pass
+
+    def close_port(self):
+        pass
+
+    def send_message(self, message):
+        self.messages.append(list(message))
+
+    def delete(self):
+        pass
+
+
+(rtmidi_input, rtmidi_output) = (rtmidi.MidiIn, rtmidi.MidiOut)
+rtmidi.MidiIn = rtmidi.MidiOut = RecordingMidiPort
+
+rtmidi_transport = RtMidiTransport()
+rtmidi_transport.rescan_devices()
+assert(rtmidi_transport.open_output('Test Port'))
+
+# program change and channel pressure are sent with one data byte
+rtmidi_transport.write_short(0xC1, 0x05, 0x00)
+rtmidi_transport.write_short(0xD0, 0x40, 0x00)
+rtmidi_transport.write_short(0xB0, 0x10, 0x01)
+assert(RecordingMidiPort.messages == [[0xC1, 0x05], [0xD0, 0x40], [0xB0, 0x10, 0x01]])
+print(".", end=" ")
+
+rtmidi_transport.close_output()
+(rtmidi.MidiIn, rtmidi.MidiOut) = (rtmidi_input, rtmidi_output)
+
+##################
+# LCD updates
+##################
+
+class RecordingController(object):
+    # records calls of "set_lcd()" and supports every other feature
+    # without doing anything
+    def __init__(self):
+        self.lcd_updates = []
+
+    def __getattr__(self, name):
+        return lambda *args: True
+
+    def set_lcd(self, position, hex_codes, update):
+        self.lcd_updates.append((position, bytes(hex_codes), update))
+
+
+def send_lcd(position, text):
+    sysex = bytes([0xF0, 0x00, 0x00, 0x66, mcu_model_id, 0x12, position]) + text + b'\xF7'
+    mackie_host_control.receive_midi(MidiConnection.SYSTEM_MESSAGE, sysex)
+
+
+mcu_model_id = MackieHostControl.get_preferred_mcu_model_id()
+controller = RecordingController()
+mackie_host_control = MackieHostControl(
+    mcu_model_id, MackieHostControl.ASSUME_SUCCESSFUL_CONNECTION, 'tests',
+    'MCU', 'MCU', log_wrapper, midi_transport=LoopbackMidiTransport('MCU'))
+mackie_host_control.set_hardware_controller(controller)
+mackie_host_control.go_online()
+
+# new text is forwarded and marks its LCD cell as dirty
+send_lcd(0, b'Hallo')
+assert(controller.lcd_updates == [(0, b'Hallo', True)])
+assert(mackie_host_control.get_lcd_dirty_mask() == 0x0001)
+print(".", end=" ")
+
+# unchanged text is not forwarded
+del controller.lcd_updates[:]
+mackie_host_control.clear_lcd_dirty_mask()
+send_lcd(0, b'Hallo')
+assert(controller.lcd_updates == [])
+assert(mackie_host_control.get_lcd_dirty_mask() == 0)
+print(".", end=" ")
+
+# only changed ranges are forwarded, and the LCD is repainted once
+send_lcd(0, b'HeLlO')
+assert(controller.lcd_updates == [(1, b'eL', False), (4, b'O', True)])
+print(".", end=" ")
+
+# bit "row * 8 + cell" stands for a cell of 7 characters
+mackie_host_control.clear_lcd_dirty_mask()
+send_lcd(56 + 13, b'ab')
+assert(mackie_host_control.get_lcd_dirty_mask() == (1 << 9) | (1 << 10))
+print(".", end=" ")
+
+##################
+# fader filter
+##################
+
+sent = []
+fader_filter = FaderFilter(lambda fader_id, value: sent.append((fader_id, value)), hysteresis=192, maximum_rate=100.0)
+
+# unchanged values are dropped
+fader_filter.move(0, 1000, 1.0)
+fader_filter.move(0, 1000, 2.0)
+assert(sent == [(0, 1000)])
+print(".", end=" ")
+
+# jitter against the direction of movement is dropped ...
+fader_filter.move(0, 2000, 3.0)
+fader_filter.move(0, 1900, 4.0)
+assert(sent == [(0, 1000), (0, 2000)])
+print(".", end=" ")
+
+# ... whereas real movements are not
+fader_filter.move(0, 1500, 5.0)
+assert(sent == [(0, 1000), (0, 2000), (0, 1500)])
+print(".", end=" ")
+
+# fast movements are held back, and only the latest value is sent
+del sent[:]
+fader_filter.move(1, 100, 10.0)
+fader_filter.move(1, 200, 10.001)
+fader_filter.move(1, 300, 10.002)
+fader_filter.process(10.005)
+assert(sent == [(1, 100)])
+fader_filter.process(10.010)
+assert(sent == [(1, 100), (1, 300)])
+print(".", end=" ")
+
+# faders moved by the host are not sent back
+del sent[:]
+fader_filter.set_host_value(2, 5000)
+fader_filter.move(2, 5000, 20.0)
+fader_filter.move(2, 5300, 21.0)
+assert(sent == [(2, 5300)])
+print(".", end=" ")
+
+# small steps are sent as long as the fader has no direction
+del sent[:]
+fader_filter.set_host_value(3, 8000)
+fader_filter.move(3, 8128, 30.0)
+assert(sent == [(3, 8128)])
+print(".", end=" ")
+
+# dropped messages are counted per fader
+assert(fader_filter.get_dropped_messages(0) == 2)
+assert(fader_filter.get_dropped_messages(1) == 1)
+assert(fader_filter.get_dropped_messages(2) == 1)
+print(".", end=" ")
+
+##################
+# meter engine
+##################
+
+updates = []
+meter_engine = MeterEngine(lambda *meter: updates.append(meter))
+
+# new levels are rendered with their peaks
+meter_engine.set_level(0, 10, 10.0)
+meter_engine.process(10.0)
+assert(updates == [(0, 10, 10, False)])
+print(".", end=" ")
+
+# meters are rendered once per frame, however many levels arrive
+del updates[:]
+meter_engine.set_level(0, 8, 10.01)
+meter_engine.set_level(0, 9, 10.02)
+meter_engine.process(10.02)
+assert(updates == [])
+meter_engine.process(10.04)
+assert(updates == [(0, 9, 10, False)])
+print(".", end=" ")
+
+# meters fall by one segment every 300 ms, while peaks are held ...
+del updates[:]
+meter_engine.process(10.35)
+assert(updates == [(0, 8, 10, False)])
+print(".", end=" ")
+
+# ... for 1.5 seconds before falling as well
+del updates[:]
+meter_engine.process(11.81)
+assert(updates == [(0, 4, 9, False)])
+print(".", end=" ")
+
+# overload is set and cleared separately from the level
+del updates[:]
+meter_engine.set_level(1, MeterEngine.LEVEL_SET_OVERLOAD, 12.0)
+meter_engine.process(12.0)
+assert([meter for meter in updates if meter[0] == 1] == [(1, 0, 0, True)])
+meter_engine.set_level(1, MeterEngine.LEVEL_CLEAR_OVERLOAD, 12.1)
+meter_engine.process(12.1)
+assert([meter for meter in updates if meter[0] == 1] == [(1, 0, 0, True), (1, 0, 0, False)])
+print(".", end=" ")
+
+# levels above the maximum are clipped
+del updates[:]
+meter_engine.reset()
+meter_engine.set_level(2, 0x0D, 20.0)
+meter_engine.process(20.0)
+assert(updates == [(2, MeterEngine.MAXIMUM_LEVEL, MeterEngine.MAXIMUM_LEVEL, False)])
+print(".", end=" ")
+
+##################
+# surface state
+##################
+
+class SurfaceRecorder(object):
+    # records every call and supports every feature
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith('has_'):
+            return lambda: True
+
+        return lambda *args: self.calls.append((name,) + args)
+
+
+controller = SurfaceRecorder()
+mackie_host_control = MackieHostControl(
+    mcu_model_id, MackieHostControl.ASSUME_SUCCESSFUL_CONNECTION, 'tests',
+    'MCU', 'MCU', log_wrapper, midi_transport=LoopbackMidiTransport('MCU'))
+mackie_host_control.set_hardware_controller(controller)
+mackie_host_control.go_online()
+
+# mute LED of channel 1 on, "Play" LED flashing, V-Pot ring of
+# channel 1, fader 1 at center, LCD text and assignment display
+mackie_host_control.receive_midi(MidiConnection.NOTE_ON_EVENT, ShortMessage(0x90, 0x10, 0x7F))
+mackie_host_control.receive_midi(MidiConnection.NOTE_ON_EVENT, ShortMessage(0x90, 0x5E, 0x01))
+mackie_host_control.receive_midi(MidiConnection.CONTROL_CHANGE, ShortMessage(0xB0, 0x30, 0x55))
+mackie_host_control.receive_midi(MidiConnection.PITCH_WHEEL_CHANGE, ShortMessage(0xE0, 0x00, 0x40))
+mackie_host_control.receive_midi(MidiConnection.CONTROL_CHANGE, ShortMessage(0xB0, 0x4B, 0x31))
+send_lcd(0, b'Hi')
+
+# a resync sends the complete surface to the hardware controller
+del controller.calls[:]
+mackie_host_control.resync_hardware_controller()
+assert(('set_led_channel_mute', 0, 1) in controller.calls)
+assert(('set_led_channel_mute', 1, 0) in controller.calls)
+assert(('set_led_play', 2) in controller.calls)
+assert(('set_vpot_led_ring', 0, 1, 1, 5) in controller.calls)
+assert(('fader_moved', 0, 512) in controller.calls)
+assert(('set_display_7seg', 11, 0x31) in controller.calls)
+assert(('set_lcd', 0, b'Hi' + b' ' * 110) in controller.calls)
+print(".", end=" ")
+
+# a new hardware controller starts with a blank surface
+mackie_host_control.set_hardware_controller(controller)
+del controller.calls[:]
+mackie_host_control.resync_hardware_controller()
+assert(('set_led_channel_mute', 0, 0) in controller.calls)
+assert(('fader_moved', 0, 0) in controller.calls)
+assert(('set_lcd', 0, b' ' * 112) in controller.calls)
+print(".", end=" ")
+
+##################
+# record and replay
+##################
+
+stream = io.BytesIO()
+recorder = MidiRecorder(stream)
+
+lcd_update = [0xF0, 0x00, 0x00, 0x66, 0x14, 0x12, 0x00] + [0x41] * 200 + [0xF7]
+recorder.record('Host', False, [0x90, 0x10, 0x7F], 10.0)
+recorder.record('Hardware', True, bytes([0xB0, 0x30, 0x01]), 10.0005)
+recorder.record('Host', False, lcd_update, 10.25)
+recorder.record('Controller', False, bytearray([0xE0, 0x00, 0x40]), 310.25)
+
+# port definitions are not counted
+assert(recorder.get_number_of_records() == 4)
+print(".", end=" ")
+
+# records keep port, direction, data and (relative) timestamp
+records = MidiRecorder.read_capture(io.BytesIO(stream.getvalue()))
+assert([record[1:] for record in records] == [
+    ('Host', False, bytes([0x90, 0x10, 0x7F])),
+    ('Hardware', True, bytes([0xB0, 0x30, 0x01])),
+    ('Host', False, bytes(lcd_update)),
+    ('Controller', False, bytes([0xE0, 0x00, 0x40])),
+])
+assert([round(record[0], 6) for record in records] == [0.0, 0.0005, 0.25, 300.25])
+print(".", end=" ")
+
+# only input of known ports is replayed
+(host, mcu_port) = LoopbackMidiTransport.create_pair('Host', 'MCU')
+received = []
+host.open_output('')
+mcu_port.open_input('')
+mcu_port.set_input_callback(lambda event: received.append(event[0]))
+
+replayer = MidiReplayer(records, {'Host': host}, lambda: 0)
+assert(replayer.get_number_of_events() == 2)
+replayer.replay(MidiReplayer.MAXIMUM_SPEED)
+assert(received == [[0x90, 0x10, 0x7F], lcd_update])
+print(".", end=" ")
+
+# other files are rejected
+try:
+    MidiRecorder.read_capture(io.BytesIO(b'MThd'))
+    assert(False)
+except ValueError:
+    print(".", end=" ")
+
+##################
+# LED state
+##################
+
+class LedController(MidiControllerTemplate):
+    # records LED messages, one list for each call of "set_led()" or
+    # "set_leds()"
+    led_messages = []
+
+    def set_led(self, internal_id, led_status):
+        self.led_messages.append([(internal_id, led_status)])
+
+    def set_leds(self, leds):
+        self.led_messages.append(list(leds))
+
+
+(host, mcu_port) = LoopbackMidiTransport.create_pair('Host', 'MCU')
+(hardware, controller_port) = LoopbackMidiTransport.create_pair('Hardware', 'Controller')
+received = []
+for transport in (host, hardware):
+    transport.open_input('')
+    transport.open_output('')
+host.set_input_callback(lambda event: received.append(event[0]))
+
+interconnector = McuInterconnector(
+    None, mcu_model_id, MackieHostControl.ASSUME_SUCCESSFUL_CONNECTION,
+    'MCU', 'MCU', LedController, 'Controller', 'Controller', log_wrapper,
+    mcu_midi_transport=mcu_port, controller_midi_transport=controller_port)
+interconnector.connect()
+led_messages = LedController.led_messages
+
+# LED states are kept for unregistered controls and sent on
+# registration
+interconnector.set_led_channel_mute(0, 2)
+interconnector.set_led_channel_mute(1, 1)
+assert(led_messages == [])
+interconnector.register_control('mute_channel_2', 0x11, 0x51)
+assert(led_messages == [[(0x51, 1)]])
+print(".", end=" ")
+
+# only changes are sent to the hardware controller
+del led_messages[:]
+interconnector.set_led_channel_mute(1, 1)
+interconnector.set_led_channel_mute(1, 0)
+assert(led_messages == [[(0x51, 0)]])
+print(".", end=" ")
+
+# registered switches are mapped to MCU switches
+assert(interconnector.keypress(0x11, MackieHostControl.SWITCH_PRESSED))
+assert(not interconnector.keypress(0x12, MackieHostControl.SWITCH_PRESSED))
+host.poll()
+assert(received[-1] == [0x90, 0x11, 0x7F])
+print(".", end=" ")
+
+# withdrawn controls switch their LED off
+interconnector.set_led_channel_mute(1, 1)
+del led_messages[:]
+interconnector.withdraw_control(0x11)
+assert(led_messages == [[(0x51, 0)]])
+assert(not interconnector.keypress(0x11, MackieHostControl.SWITCH_PRESSED))
+print(".", end=" ")
+
+##################
+# LED batching
+##################
+
+for channel in range(2, 5):
+    interconnector.register_control('mute_channel_%d' % (channel + 1), 0x10 + channel, 0x50 + channel)
+
+# LED changes of one tick are sent in a single batch
+del led_messages[:]
+for channel in range(2, 5):
+    host.write_short(0x90, 0x10 + channel, 0x7F)
+interconnector.process_midi_input()
+assert(led_messages == [[(0x52, 1), (0x53, 1), (0x54, 1)]])
+print(".", end=" ")
+
+# LEDs that are switched back within a tick are not sent
+del led_messages[:]
+host.write_short(0x90, 0x12, 0x00)
+host.write_short(0x90, 0x12, 0x7F)
+host.write_short(0x90, 0x13, 0x00)
+interconnector.process_midi_input()
+assert(led_messages == [[(0x53, 0)]])
+print(".", end=" ")
+
+# ticks without LED changes send nothing
+del led_messages[:]
+host.write_short(0x90, 0x14, 0x7F)
+interconnector.process_midi_input()
+assert(led_messages == [])
+print(".", end=" ")
+
+##################
+# timer wheel
+##################
+
+fired = []
+wheel = TimerWheel()
+now = time.perf_counter()
+
+# timers run once they have expired, in order of expiry
+wheel.schedule(0.05, lambda timestamp: fired.append('late'), now)
+wheel.schedule(0.02, lambda timestamp: fired.append('early'), now)
+wheel.advance(now + 0.01)
+assert(fired == [])
+wheel.advance(now + 0.1)
+assert(fired == ['early', 'late'])
+assert(wheel.get_number_of_timers() == 0)
+print(".", end=" ")
+
+# timers may stay in their slot for more than one turn of the wheel
+del fired[:]
+wheel.schedule(2.0, lambda timestamp: fired.append(timestamp), now + 0.1)
+wheel.advance(now + 1.5)
+assert(fired == [])
+wheel.advance(now + 2.2)
+assert(fired == [now + 2.2])
+print(".", end=" ")
+
+# reset drops all timers
+wheel.schedule(0.01, lambda timestamp: fired.append(timestamp), now + 2.2)
+wheel.reset()
+assert(wheel.get_number_of_timers() == 0)
+print(".", end=" ")
+
+def wait_for_flash_toggle():
+    # flashing LEDs toggle every 250 ms, in phase with the clock
+    time.sleep(0.25 - time.perf_counter() % 0.25 + 0.05)
+    interconnector.process_midi_input()
+
+
+# without help from the hardware controller, flashing LEDs are
+# toggled in software
+interconnector.set_led_channel_mute(0, 0)
+host.write_short(0x90, 0x12, 0x01)
+interconnector.process_midi_input()
+
+del led_messages[:]
+wait_for_flash_toggle()
+wait_for_flash_toggle()
+assert(len(led_messages) == 2)
+assert(led_messages[0][0][0] == led_messages[1][0][0] == 0x52)
+assert(led_messages[0][0][1] == 1 - led_messages[1][0][1])
+print(".", end=" ")
+
+# LEDs stop flashing when switched off
+host.write_short(0x90, 0x12, 0x00)
+interconnector.process_midi_input()
+del led_messages[:]
+wait_for_flash_toggle()
+assert(led_messages == [])
+print(".", end=" ")
+
+##################
+# ring buffer
+##################
+
+ring_buffer = RingBuffer(3)
+
+# capacity is rounded up to a power of two
+assert(ring_buffer.get_capacity() == 4)
+assert(len(ring_buffer) == 0 and not ring_buffer)
+print(".", end=" ")
+
+# items that do not fit are dropped and counted
+assert(ring_buffer.extend(range(3)) == 0)
+assert(ring_buffer.append(3))
+assert(not ring_buffer.append(4))
+assert(ring_buffer.extend([5, 6]) == 2)
+assert(len(ring_buffer) == 4)
+print(".", end=" ")
+
+# items keep their order when indices wrap around
+output = []
+for item in range(4, 10):
+    output.append(ring_buffer.popleft())
+    assert(ring_buffer.append(item))
+assert(output == [0, 1, 2, 3, 4, 5])
+assert([ring_buffer.popleft() for _ in range(len(ring_buffer))] == [6, 7, 8, 9])
+print(".", end=" ")
+
+# empty buffers raise an exception
+try:
+    ring_buffer.popleft()
+    assert(False)
+except IndexError:
+    print(".", end=" ")
+
+# clear empties the buffer, which can be filled again
+ring_buffer.extend('abc')
+ring_buffer.clear()
+assert(not ring_buffer)
+assert(ring_buffer.extend('wxyz') == 0)
+assert(ring_buffer.popleft() == 'w')
+print(".", end=" ")
+
+##################
+# reconnect supervisor
+##################
+
+probes = []
+probes_done = threading.Event()
+
+
+def probe_ports():
+    probes.append(len(probes))
+
+    if len(probes) == 1:
+        # ports are reconnected and lost again while probing, so
+        # this result is outdated
+        supervisor.report_reconnected()
+        supervisor.report_lost()
+        return True
+
+    probes_done.set()
+    return False
+
+
+supervisor = MidiReconnectSupervisor(probe_ports, lambda: None)
+supervisor.start()
+supervisor.report_lost()
+assert(probes_done.wait(5.0))
+supervisor.stop()
+
+assert(not supervisor.ports_available())
+assert(not supervisor.attention_required)
+print(".", end=" ")
+
 patch = "hammond"
 
 hardware = NektarPanoramaTSeries("PANORAMA T6 Mixer", "PANORAMA T6 Mixer", log_wrapper, patch)